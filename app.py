@@ -1,8 +1,7 @@
 import os
 from flask import Flask
 from flask_login import LoginManager
-from inventario.database import db
-from sqlalchemy.exc import OperationalError
+from inventario.database import db, configurar_motor
 from conexion.conexion import configurar_app
 
 login_manager = LoginManager()
@@ -12,18 +11,51 @@ login_manager.login_message = 'Por favor inicie sesión para acceder a esta pág
 
 @login_manager.user_loader
 def load_user(user_id):
-    from inventario.usuarios import Usuario
-    return Usuario.query.get(int(user_id))
+    # Sin consulta por petición salvo SESION_MODO='consulta' (ver inventario/sesion.py)
+    from inventario.sesion import cargar_usuario
+    return cargar_usuario(user_id)
 
 
 def create_app():
-    app = Flask(__name__)
+    # La carpeta instance es la del proyecto (la misma de la base SQLite), también
+    # con "flask --app app", que importa el módulo como package.app
+    app = Flask(__name__, instance_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance'))
     configurar_app(app)
     app.secret_key = 'tu_clave_secreta_aqui_2026'
 
     db.init_app(app)
+    configurar_motor(app)
     login_manager.init_app(app)
 
+    from inventario.metricas import registrar_instrumentacion
+    registrar_instrumentacion(app)
+
+    from services.resumen_service import ResumenService, resumen_cli
+    ResumenService.registrar_eventos()
+    app.cli.add_command(resumen_cli)
+
+    from services.version_service import VersionService
+    VersionService.registrar_eventos()
+
+    from services.sincronizacion_service import SincronizacionService, sincronizacion_cli
+    SincronizacionService.registrar_eventos()
+    app.cli.add_command(sincronizacion_cli)
+
+    from services.ingesta_service import iniciar_ingesta, ingesta_cli
+    app.cli.add_command(ingesta_cli)
+    iniciar_ingesta(app)  # facturas que quedaron en la cola antes de reiniciar
+
+    from services.acumulado_service import AcumuladoService, acumulados_cli
+    AcumuladoService.registrar_eventos()
+    app.cli.add_command(acumulados_cli)
+
+    from services.reposicion_service import ReposicionService, reposicion_cli
+    ReposicionService.registrar_eventos()
+    app.cli.add_command(reposicion_cli)
+
+    from conexion.esquema import bd_cli
+    app.cli.add_command(bd_cli)
+
     # Registrar blueprints
     from routes.auth import auth_bp
     from routes.main import main_bp
@@ -32,6 +64,7 @@ def create_app():
     from routes.facturas import facturas_bp
     from routes.usuarios import usuarios_bp
     from routes.datos import datos_bp
+    from routes.api import api_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
@@ -40,6 +73,7 @@ def create_app():
     app.register_blueprint(facturas_bp)
     app.register_blueprint(usuarios_bp)
     app.register_blueprint(datos_bp)
+    app.register_blueprint(api_bp)
 
     return app
 
@@ -52,16 +86,20 @@ from inventario.clientes import Cliente
 from inventario.usuarios import Usuario
 from inventario.inventario import Inventario
 from models.factura import Factura, FacturaDetalle  # noqa: registra modelos con SQLAlchemy
+from models.resumen import ResumenCategoria  # noqa
+from models.cambio import CambioProducto  # noqa
+from models.ingesta import FacturaIngestada  # noqa
+from models.acumulado import VentaDiaria  # noqa
+from models.reposicion import ReposicionProducto  # noqa
 
-with app.app_context():
-    try:
-        db.create_all()
-        print('Tablas verificadas en la base de datos.')
-    except OperationalError as e:
-        print(f'Error al crear tablas: {e}')
+# El esquema ya no se crea al importar: ejecutar `flask --app app bd inicializar`
 
-inventario = Inventario(app, db, Producto, Cliente, Usuario=Usuario)
+inventario = Inventario(app, db, Producto, Cliente, Usuario=Usuario, Factura=Factura)
 
 if __name__ == '__main__':
+    # En desarrollo (python app.py) se verifica el esquema antes de servir
+    from conexion.esquema import inicializar_esquema
+    with app.app_context():
+        inicializar_esquema()
     port = int(os.environ.get('PORT', 5001))
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,79 @@
+"""
+Mide el tiempo de arranque en frío de la aplicación (lo que paga cada worker de gunicorn).
+
+Cada repetición lanza un intérprete nuevo que importa app.py y, opcionalmente,
+atiende una primera petición. Se informa el tiempo de importación y el tiempo
+total del proceso.
+
+Uso:
+    python -m benchmarks.arranque --repeticiones 10 --presupuesto 1.5
+    DB_BACKEND=auto python -m benchmarks.arranque   # comparar con la prueba de MySQL
+
+Con --presupuesto el script termina con código 1 si el p95 de importación lo supera.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from benchmarks.comun import resumir
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT_HIJO = """
+import json, time
+inicio = time.perf_counter()
+import app
+importacion = time.perf_counter() - inicio
+primera = None
+if {primera_peticion}:
+    inicio = time.perf_counter()
+    app.app.test_client().get('/login')
+    primera = time.perf_counter() - inicio
+print(json.dumps({{'importacion': importacion, 'primera_peticion': primera}}))
+"""
+
+
+def medir(repeticiones, primera_peticion=False):
+    codigo = SCRIPT_HIJO.format(primera_peticion=primera_peticion)
+    importacion, primera, total = [], [], []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        salida = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, env=os.environ.copy(),
+                                capture_output=True, text=True, check=True)
+        total.append(time.perf_counter() - inicio)
+        datos = json.loads(salida.stdout.strip().splitlines()[-1])
+        importacion.append(datos['importacion'])
+        if datos['primera_peticion'] is not None:
+            primera.append(datos['primera_peticion'])
+    resultado = {'repeticiones': repeticiones,
+                 'backend': os.environ.get('DATABASE_URL') and 'DATABASE_URL'
+                 or os.environ.get('DB_BACKEND', 'mysql'),
+                 'importacion': resumir(importacion),
+                 'proceso': resumir(total)}
+    if primera:
+        resultado['primera_peticion'] = resumir(primera)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=10)
+    parser.add_argument('--primera-peticion', action='store_true',
+                        help='además mide la primera petición (GET /login)')
+    parser.add_argument('--presupuesto', type=float,
+                        help='segundos máximos para el p95 de importación')
+    args = parser.parse_args()
+
+    resultado = medir(args.repeticiones, args.primera_peticion)
+    print(json.dumps(resultado, indent=2))
+    if args.presupuesto is not None and resultado['importacion']['p95'] > args.presupuesto:
+        print(f"p95 de importación {resultado['importacion']['p95']} s supera el presupuesto "
+              f"de {args.presupuesto} s", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
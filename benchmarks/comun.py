@@ -0,0 +1,19 @@
+"""Utilidades compartidas por los benchmarks."""
+
+import statistics
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por el método del rango más cercano."""
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def resumir(valores, decimales=4):
+    return {
+        'min': round(min(valores), decimales),
+        'p50': round(statistics.median(valores), decimales),
+        'p95': round(percentil(valores, 95), decimales),
+        'max': round(max(valores), decimales)
+    }
@@ -0,0 +1,100 @@
+"""
+Rendimiento de facturas.nueva: registro sincrónico contra ingesta en segundo plano.
+
+Varios hilos envían el mismo conjunto de facturas por POST con el test
+client, primero con FACTURAS_INGESTA desactivado (una transacción por
+petición) y luego activado (la petición solo encola; el trabajador registra
+por lotes). Para cada modo informa la latencia de las peticiones y las
+facturas por segundo hasta que todas quedaron registradas.
+
+Uso:
+    python -m benchmarks.ingesta --facturas 500 --hilos 8 --tamano-lote 50
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.comun import resumir
+from benchmarks.sembrar import ESCALAS, tamanos
+from benchmarks.suite import preparar_app, _cliente_autenticado
+
+
+def _facturas(cantidad, n, semilla=11):
+    azar = random.Random(semilla)
+    return [{'cliente_id': str(azar.randint(1, n['clientes'])),
+             'producto_id[]': [str(azar.randint(1, n['productos'])) for _ in range(3)],
+             'cantidad[]': ['1', '1', '1']} for _ in range(cantidad)]
+
+
+def ejecutar_modo(app, facturas, hilos, ingesta):
+    from inventario.database import db
+    from models.factura import Factura
+    from services.ingesta_service import IngestaService
+
+    app.config['FACTURAS_INGESTA'] = ingesta
+    with app.app_context():
+        antes = db.session.query(Factura.id).count()
+    clientes = [_cliente_autenticado(app) for _ in range(hilos)]
+
+    def enviar(indice):
+        inicio = time.perf_counter()
+        respuesta = clientes[indice % hilos].post('/facturas/nueva', data=facturas[indice])
+        if respuesta.status_code != 302:
+            raise RuntimeError(f'POST /facturas/nueva respondió {respuesta.status_code}')
+        return (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        latencias = list(ejecutor.map(enviar, range(len(facturas))))
+    respondidas = time.perf_counter() - inicio
+    if ingesta:
+        # Terminado = la cola quedó vacía
+        with app.app_context():
+            while IngestaService.cola().resumen().get('pendiente', 0):
+                time.sleep(0.01)
+                db.session.remove()
+    total = time.perf_counter() - inicio
+    with app.app_context():
+        registradas = db.session.query(Factura.id).count() - antes
+        rechazadas = IngestaService.cola().resumen().get('rechazada', 0) if ingesta else 0
+    return {'ms_peticion': resumir(latencias, 2), 'segundos_respuestas': round(respondidas, 3),
+            'segundos_total': round(total, 3), 'facturas_registradas': registradas,
+            'rechazadas_acumuladas': rechazadas,
+            'facturas_por_segundo': round(registradas / total, 1) if total else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', choices=list(ESCALAS), default='1k')
+    parser.add_argument('--facturas', type=int, default=500)
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--tamano-lote', type=int, default=50)
+    parser.add_argument('--bd', help='archivo SQLite a usar (por defecto el de la escala en el directorio temporal)')
+    args = parser.parse_args()
+
+    ruta_bd = args.bd or os.path.join(tempfile.gettempdir(), f'inventario-benchmark-{args.escala}.db')
+    app, _ = preparar_app(args.escala, os.path.abspath(ruta_bd))
+    app.config['INGESTA_TAMANO_LOTE'] = args.tamano_lote
+    app.config['INGESTA_RUTA'] = os.path.join(os.path.dirname(os.path.abspath(ruta_bd)),
+                                              f'ingesta-benchmark-{args.escala}.db')
+    facturas = _facturas(args.facturas, tamanos(ESCALAS[args.escala]))
+
+    resultado = {'escala': args.escala, 'facturas': args.facturas, 'hilos': args.hilos,
+                 'tamano_lote': args.tamano_lote, 'modos': {}}
+    for nombre, ingesta in (('sincrono', False), ('ingesta', True)):
+        print(f'· {nombre}', file=sys.stderr)
+        resultado['modos'][nombre] = ejecutar_modo(app, facturas, args.hilos, ingesta)
+    sincrono, ingesta = resultado['modos']['sincrono'], resultado['modos']['ingesta']
+    resultado['mejora_facturas_por_segundo'] = (
+        round(ingesta['facturas_por_segundo'] / sincrono['facturas_por_segundo'], 2)
+        if sincrono['facturas_por_segundo'] else None)
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Datos sintéticos reproducibles para los benchmarks.
+
+Para una escala de N productos se crean N productos, N/10 clientes (mínimo
+10) y N facturas de 1 a 4 líneas cada una, con fechas repartidas en los
+últimos dos años. La semilla es fija, así que dos ejecuciones con la misma
+escala generan exactamente los mismos datos.
+
+Las inserciones usan executemany por lotes con Core; al final se
+reconstruyen el resumen por categoría, los puntos de reorden y el índice de
+búsqueda, y el registro de cambios queda con un alta por producto.
+"""
+
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert, func
+from inventario.database import db
+from inventario.productos import Producto
+from inventario.clientes import Cliente
+from models.factura import Factura, FacturaDetalle
+from models.cambio import CambioProducto
+
+ESCALAS = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+SEMILLA = 20260101
+TAMANO_LOTE = 10_000
+
+CATEGORIAS = ['Herramientas Manuales', 'Herramientas Eléctricas', 'Materiales de Construcción',
+              'Plomería', 'Electricidad', 'Pinturas', 'Ferretería General', 'Jardinería',
+              'Seguridad Industrial', 'Adhesivos']
+NOMBRES = ['Martillo', 'Taladro', 'Tornillo', 'Clavo', 'Tubo', 'Cable', 'Pintura', 'Brocha',
+           'Llave', 'Destornillador', 'Sierra', 'Cinta', 'Guante', 'Casco', 'Manguera', 'Pegamento']
+ADJETIVOS = ['galvanizado', 'inoxidable', 'reforzado', 'industrial', 'económico', 'profesional',
+             'mediano', 'grande', 'pequeño', 'eléctrico']
+TIPOS_CLIENTE = ['Particular', 'Empresa']
+ESTADOS = ['Pendiente', 'Pagada', 'Anulada']
+
+
+def _por_lotes(filas, tamano=TAMANO_LOTE):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def tamanos(productos):
+    return {'productos': productos, 'clientes': max(productos // 10, 10), 'facturas': productos}
+
+
+def sembrado(productos):
+    """True si la base ya tiene exactamente los datos de esta escala."""
+    esperado = tamanos(productos)
+    return (db.session.query(func.count(Producto.id)).scalar() == esperado['productos']
+            and db.session.query(func.count(Cliente.id)).scalar() == esperado['clientes']
+            and db.session.query(func.count(Factura.id)).scalar() >= esperado['facturas'])
+
+
+def sembrar(productos, progreso=print):
+    """Vacía las tablas de negocio y las llena con datos sintéticos. Requiere app context."""
+    from inventario.busqueda import obtener_motor
+    from services.resumen_service import ResumenService
+    from services.reposicion_service import ReposicionService
+    from services.sincronizacion_service import registrar_cambios_desde
+
+    azar = random.Random(SEMILLA)
+    n = tamanos(productos)
+    conexion = db.session.connection()
+    for modelo in (FacturaDetalle, Factura, Cliente, Producto, CambioProducto):
+        conexion.execute(modelo.__table__.delete())
+
+    precios = []
+
+    def filas_productos():
+        for i in range(1, n['productos'] + 1):
+            precio = round(azar.uniform(0.5, 300), 2)
+            precios.append(precio)
+            yield {'id': i, 'nombre': f"{azar.choice(NOMBRES)} {azar.choice(ADJETIVOS)} {i}",
+                   'categoria': CATEGORIAS[i % len(CATEGORIAS)],
+                   'descripcion': f"Producto sintético número {i}",
+                   'precio': precio, 'stock': azar.randint(1_000, 5_000),
+                   'fecha_creacion': datetime(2024, 1, 1)}
+
+    for lote in _por_lotes(filas_productos()):
+        conexion.execute(insert(Producto), lote)
+    registrar_cambios_desde(conexion, datetime.min)
+    progreso(f"  {n['productos']} productos")
+
+    def filas_clientes():
+        for i in range(1, n['clientes'] + 1):
+            yield {'id': i, 'nombre': f'Cliente {i}', 'telefono': f'09{i:08d}'[:10],
+                   'email': f'cliente{i}@ejemplo.com', 'tipo': TIPOS_CLIENTE[i % 2]}
+
+    for lote in _por_lotes(filas_clientes()):
+        conexion.execute(insert(Cliente), lote)
+    progreso(f"  {n['clientes']} clientes")
+
+    inicio = datetime(2026, 1, 1) - timedelta(days=730)
+    detalle_id = 0
+    lote_facturas, lote_detalles = [], []
+    for i in range(1, n['facturas'] + 1):
+        total = 0.0
+        for _ in range(azar.randint(1, 4)):
+            detalle_id += 1
+            producto_id = azar.randint(1, n['productos'])
+            cantidad = azar.randint(1, 5)
+            subtotal = round(precios[producto_id - 1] * cantidad, 2)
+            total += subtotal
+            lote_detalles.append({'id': detalle_id, 'factura_id': i, 'producto_id': producto_id,
+                                  'cantidad': cantidad, 'precio_unitario': precios[producto_id - 1],
+                                  'subtotal': subtotal})
+        lote_facturas.append({'id': i, 'cliente_id': azar.randint(1, n['clientes']),
+                              'fecha': inicio + timedelta(seconds=azar.randint(0, 730 * 86400)),
+                              'estado': azar.choice(ESTADOS), 'total': round(total, 2)})
+        if len(lote_facturas) >= TAMANO_LOTE:
+            conexion.execute(insert(Factura), lote_facturas)
+            conexion.execute(insert(FacturaDetalle), lote_detalles)
+            lote_facturas, lote_detalles = [], []
+    if lote_facturas:
+        conexion.execute(insert(Factura), lote_facturas)
+        conexion.execute(insert(FacturaDetalle), lote_detalles)
+    progreso(f"  {n['facturas']} facturas, {detalle_id} líneas")
+
+    ResumenService.reconstruir(commit=False)
+    db.session.commit()
+    ReposicionService.recalcular()
+    obtener_motor(db, Producto).sincronizar(None)
+    return n
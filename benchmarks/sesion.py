@@ -0,0 +1,76 @@
+"""
+Consultas por petición del user_loader de Flask-Login en cada SESION_MODO.
+
+Inicia sesión con el usuario del benchmark y mide, para 'consulta', 'cache'
+y 'firmada', las consultas totales y las que leen la tabla usuarios en
+peticiones autenticadas: /login (redirige sin otra consulta, así que mide
+solo la carga del usuario) y el panel principal.
+
+Uso:
+    python -m benchmarks.sesion --escala 1k --repeticiones 200
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from benchmarks.comun import resumir
+from benchmarks.sembrar import ESCALAS
+from benchmarks.suite import preparar_app, _cliente_autenticado
+
+URLS = ('/login', '/')
+
+
+def medir_modo(app, modo, repeticiones):
+    from inventario.database import contar_consultas, db
+    from inventario.sesion import cache_sesiones
+
+    app.config['SESION_MODO'] = modo
+    with app.app_context():
+        engine = db.engine
+    cache_sesiones(app).limpiar()
+    cliente = _cliente_autenticado(app)
+    resultado = {}
+    for url in URLS:
+        cliente.get(url)  # calentamiento: primera carga del usuario
+        tiempos, totales, de_usuarios = [], [], []
+        for _ in range(repeticiones):
+            with contar_consultas(engine) as contador:
+                inicio = time.perf_counter()
+                respuesta = cliente.get(url)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            if respuesta.status_code >= 400:
+                raise RuntimeError(f'GET {url} respondió {respuesta.status_code}')
+            totales.append(contador['total'])
+            de_usuarios.append(sum('FROM usuarios' in s for s in contador['sentencias']))
+        resultado[url] = {'ms': resumir(tiempos, 3),
+                          'consultas': round(statistics.mean(totales), 2),
+                          'consultas_usuarios': round(statistics.mean(de_usuarios), 2)}
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', choices=list(ESCALAS), default='1k')
+    parser.add_argument('--repeticiones', type=int, default=200)
+    parser.add_argument('--bd', help='archivo SQLite a usar (por defecto el de la escala en el directorio temporal)')
+    parser.add_argument('--salida', help='guardar el resultado en este archivo JSON')
+    args = parser.parse_args()
+
+    ruta_bd = args.bd or os.path.join(tempfile.gettempdir(), f'inventario-benchmark-{args.escala}.db')
+    app, _ = preparar_app(args.escala, os.path.abspath(ruta_bd))
+    resultado = {'escala': args.escala, 'repeticiones': args.repeticiones,
+                 'modos': {modo: medir_modo(app, modo, args.repeticiones)
+                           for modo in ('consulta', 'cache', 'firmada')}}
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+Benchmarks de las rutas más usadas y de la capa de persistencia en archivos.
+
+Siembra una base SQLite propia (no toca instance/inventario.db) con datos
+sintéticos de la escala pedida y mide con el test client de Flask:
+
+    inicio, productos (listado, búsqueda, categoría), facturas.nueva (GET y
+    POST), reportes PDF (en frío y desde la caché) y file_persistence
+    (guardar/cargar TXT, CSV, JSON y NDJSON).
+
+Para cada caso informa latencia p50/p95 en ms, consultas SQL por petición y
+memoria pico (tracemalloc, en una ejecución aparte para no distorsionar la
+latencia). El resultado se puede guardar en JSON y comparar con uno anterior.
+
+Uso:
+    python -m benchmarks.suite --escala 1k --repeticiones 30 --salida base.json
+    python -m benchmarks.suite --escala 1k --comparar base.json --tolerancia 0.2
+
+La base sembrada se reutiliza entre ejecuciones (--regenerar la vuelve a
+crear). Los POST de facturas agregan facturas a la base de la escala.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from benchmarks.comun import resumir
+from benchmarks.sembrar import ESCALAS, CATEGORIAS, sembrado, sembrar, tamanos
+
+USUARIO = {'nombre': 'Benchmark', 'email': 'benchmark@ejemplo.com', 'password': 'benchmark'}
+
+
+def preparar_app(escala, ruta_bd, regenerar=False):
+    """Importa la app apuntando a la base del benchmark y la siembra si hace falta."""
+    os.environ['DATABASE_URL'] = f'sqlite:///{ruta_bd}'
+    import app as modulo_app
+    from conexion.esquema import inicializar_esquema
+    from inventario.database import db
+    from inventario.usuarios import Usuario
+    from werkzeug.security import generate_password_hash
+
+    app = modulo_app.app
+    app.config['REPORTES_DIRECTORIO'] = os.path.join(os.path.dirname(ruta_bd), f'reportes-{escala}')
+    app.config['REPORTES_ESPERA'] = 600  # los reportes se miden de forma sincrónica
+    with app.app_context():
+        inicializar_esquema()
+        if regenerar or not sembrado(ESCALAS[escala]):
+            print(f'Sembrando escala {escala} en {ruta_bd}...', file=sys.stderr)
+            sembrar(ESCALAS[escala], progreso=lambda m: print(m, file=sys.stderr))
+        if not Usuario.query.filter_by(email=USUARIO['email']).first():
+            db.session.add(Usuario(USUARIO['nombre'], USUARIO['email'],
+                                   generate_password_hash(USUARIO['password'], method='pbkdf2:sha256')))
+            db.session.commit()
+    return app, modulo_app.inventario
+
+
+def _cliente_autenticado(app):
+    cliente = app.test_client()
+    respuesta = cliente.post('/login', data={'email': USUARIO['email'], 'password': USUARIO['password']})
+    if respuesta.status_code != 302:
+        raise RuntimeError('No se pudo iniciar sesión con el usuario del benchmark.')
+    return cliente
+
+
+def medir(funcion, repeticiones, engine, calentamiento=2):
+    """Ejecuta funcion y retorna latencias, consultas por llamada y memoria pico."""
+    from inventario.database import contar_consultas
+
+    for _ in range(calentamiento):
+        funcion()
+    tiempos, consultas = [], []
+    for _ in range(repeticiones):
+        with contar_consultas(engine) as contador:
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(contador['total'])
+    tracemalloc.start()
+    try:
+        funcion()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'ms': resumir(tiempos, 2), 'consultas': round(statistics.mean(consultas), 1),
+            'memoria_pico_kb': round(pico / 1024, 1), 'repeticiones': repeticiones}
+
+
+def _peticion(cliente, metodo, url, **kwargs):
+    def ejecutar():
+        respuesta = getattr(cliente, metodo)(url, **kwargs)
+        if respuesta.status_code >= 400:
+            raise RuntimeError(f'{metodo.upper()} {url} respondió {respuesta.status_code}')
+        return respuesta
+    return ejecutar
+
+
+def casos(app, inventario, escala):
+    """Diccionario nombre -> (función, fracción de repeticiones)."""
+    from services.reporte_trabajos import obtener_gestor
+
+    cliente = _cliente_autenticado(app)
+    n = tamanos(ESCALAS[escala])
+    azar = random.Random(7)
+
+    def crear_factura():
+        datos = {'cliente_id': azar.randint(1, n['clientes']),
+                 'producto_id[]': [str(azar.randint(1, n['productos'])) for _ in range(3)],
+                 'cantidad[]': ['1', '1', '1']}
+        respuesta = cliente.post('/facturas/nueva', data=datos)
+        if respuesta.status_code != 302:
+            raise RuntimeError('La factura del benchmark no se creó.')
+
+    def reporte_frio(url):
+        def ejecutar():
+            gestor = obtener_gestor(app)
+            with gestor._candado:
+                gestor._trabajos.clear()
+            for nombre in os.listdir(gestor.directorio):
+                os.remove(os.path.join(gestor.directorio, nombre))
+            _peticion(cliente, 'get', url)()
+        return ejecutar
+
+    archivos = {formato: f'benchmark.{formato}' for formato in ('txt', 'csv', 'json', 'ndjson')}
+
+    def cargar(formato):
+        from inventario import file_persistence as fp
+        lector = {'txt': lambda: fp.iter_data_from_txt(archivos['txt'], '|'),
+                  'csv': lambda: fp.iter_data_from_csv(archivos['csv']),
+                  'json': lambda: fp.iter_data_from_json(archivos['json']),
+                  'ndjson': lambda: fp.iter_data_from_ndjson(archivos['ndjson'])}[formato]
+        return lambda: sum(1 for _ in lector())
+
+    def guardar(formato):
+        return lambda: getattr(inventario, f'guardar_productos_{formato}')(archivos[formato])
+
+    lista = {
+        'inicio': (_peticion(cliente, 'get', '/'), 1),
+        'productos.index': (_peticion(cliente, 'get', '/productos/'), 1),
+        'productos.index?busqueda': (_peticion(cliente, 'get', '/productos/?busqueda=tornillo'), 1),
+        'productos.index?categoria': (_peticion(cliente, 'get', f'/productos/?categoria={CATEGORIAS[3]}'), 1),
+        'productos.index?pagina=50': (_peticion(cliente, 'get', '/productos/?pagina=50'), 1),
+        'facturas.index': (_peticion(cliente, 'get', '/facturas/'), 1),
+        'facturas.nueva GET': (_peticion(cliente, 'get', '/facturas/nueva'), 1),
+        'facturas.nueva POST': (crear_factura, 1),
+        'productos.reporte_pdf (frío)': (reporte_frio('/productos/reporte/pdf'), 0.2),
+        'productos.reporte_pdf (caché)': (_peticion(cliente, 'get', '/productos/reporte/pdf'), 1),
+        'facturas.reporte_pdf (frío)': (reporte_frio('/facturas/reporte/pdf'), 0.2),
+        'facturas.reporte_pdf (caché)': (_peticion(cliente, 'get', '/facturas/reporte/pdf'), 1),
+    }
+    for formato in archivos:
+        lista[f'file_persistence guardar {formato}'] = (guardar(formato), 0.2)
+        lista[f'file_persistence cargar {formato}'] = (cargar(formato), 0.2)
+    return lista, archivos
+
+
+def ejecutar(escala, repeticiones, ruta_bd, regenerar=False, filtro=None):
+    app, inventario = preparar_app(escala, ruta_bd, regenerar)
+    from inventario.database import db
+    from inventario import file_persistence as fp
+
+    with app.app_context():
+        engine = db.engine
+    lista, archivos = casos(app, inventario, escala)
+    resultados = {}
+    try:
+        for nombre, (funcion, fraccion) in lista.items():
+            if filtro and filtro not in nombre:
+                continue
+            print(f'· {nombre}', file=sys.stderr)
+            resultados[nombre] = medir(funcion, max(1, int(repeticiones * fraccion)), engine,
+                                       calentamiento=1 if fraccion < 1 else 2)
+    finally:
+        for archivo in archivos.values():
+            if fp.existe_archivo(archivo):
+                os.remove(fp.ruta_datos(archivo))
+    return {
+        'escala': escala,
+        'tamanos': tamanos(ESCALAS[escala]),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'casos': resultados
+    }
+
+
+def comparar(actual, base, tolerancia):
+    """Imprime la comparación con una ejecución anterior; retorna los casos que empeoraron."""
+    peores = []
+    print(f"{'caso':40} {'p95 base':>10} {'p95 actual':>11} {'cambio':>8} {'consultas':>12}")
+    for nombre, datos in actual['casos'].items():
+        anterior = base.get('casos', {}).get(nombre)
+        if anterior is None:
+            print(f'{nombre:40} {"-":>10} {datos["ms"]["p95"]:>11} {"nuevo":>8}')
+            continue
+        cambio = datos['ms']['p95'] / anterior['ms']['p95'] - 1 if anterior['ms']['p95'] else 0.0
+        consultas = f"{anterior['consultas']:g}->{datos['consultas']:g}"
+        print(f"{nombre:40} {anterior['ms']['p95']:>10} {datos['ms']['p95']:>11} "
+              f"{cambio:>+8.0%} {consultas:>12}")
+        if cambio > tolerancia or datos['consultas'] > anterior['consultas']:
+            peores.append(nombre)
+    return peores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', choices=list(ESCALAS), default='1k')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--bd', help='archivo SQLite a usar (por defecto uno por escala en el directorio temporal)')
+    parser.add_argument('--regenerar', action='store_true', help='vuelve a sembrar la base')
+    parser.add_argument('--solo', help='ejecuta solo los casos cuyo nombre contiene este texto')
+    parser.add_argument('--salida', help='guarda el resultado en este archivo JSON')
+    parser.add_argument('--comparar', help='JSON de una ejecución anterior para comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.2,
+                        help='aumento de p95 tolerado al comparar (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    ruta_bd = args.bd or os.path.join(tempfile.gettempdir(), f'inventario-benchmark-{args.escala}.db')
+    resultado = ejecutar(args.escala, args.repeticiones, os.path.abspath(ruta_bd), args.regenerar, args.solo)
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            peores = comparar(resultado, json.load(f), args.tolerancia)
+        if peores:
+            print(f"Empeoraron: {', '.join(peores)}", file=sys.stderr)
+            sys.exit(1)
+    elif not args.salida:
+        print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,57 @@
+"""
+Selección de la base de datos a partir de variables de entorno.
+
+La configuración no abre conexiones: elegir el backend es instantáneo y el
+esquema se crea aparte con `flask bd inicializar` (ver conexion/esquema.py).
+El backend elegido se registra una vez al crear la app (logger
+'inventario.conexion', sin la contraseña); si no se definió ninguna variable
+el aviso es un warning.
+
+Variables:
+    DATABASE_URL   URI completa de SQLAlchemy; si está definida tiene prioridad.
+    DB_BACKEND     'mysql' (por defecto), 'sqlite' o 'auto'. 'auto' conserva el
+                   comportamiento anterior: prueba MySQL al arrancar y usa
+                   SQLite si no responde (bloquea hasta 3 s por worker). El
+                   valor por defecto es MySQL para que una instalación existente
+                   sin variables no arranque sobre un SQLite local vacío; para
+                   desarrollo local use DB_BACKEND=sqlite.
+    MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE
+
+Pool de conexiones (ver opciones_motor):
+    DB_POOL_SIZE (5), DB_MAX_OVERFLOW (10), DB_POOL_TIMEOUT (30 s),
+    DB_POOL_RECYCLE (280 s; -1 lo desactiva), DB_POOL_PRE_PING (1 en MySQL, 0 en SQLite)
+    SQLITE_JOURNAL_MODE (WAL), SQLITE_SYNCHRONOUS (NORMAL), SQLITE_BUSY_TIMEOUT_MS (5000)
+
+Facturas (ver services/ingesta_service.py):
+    FACTURAS_INGESTA          1 para registrar las facturas nuevas en segundo plano
+
+Sesiones (ver inventario/sesion.py):
+    SESION_MODO               'cache' (por defecto), 'firmada' o 'consulta'
+
+Instrumentación (ver inventario/metricas.py):
+    INSTRUMENTACION_LENTO_MS  registra las peticiones más lentas que este umbral con su SQL
+    METRICAS_TOKEN            token Bearer que acepta /metricas
+"""
+
+import logging
 import os
+from sqlalchemy.engine import make_url
+from inventario.database import PoolMedido
 
 # Configuración de conexión MySQL
 config_db = {
-    'host': 'localhost',
-    'usuario': 'root',
-    'password': '123456',
-    'database': 'proyecto_inventario_wisuma',
-    'puerto': 3307
+    'host': os.environ.get('MYSQL_HOST', 'localhost'),
+    'usuario': os.environ.get('MYSQL_USER', 'root'),
+    'password': os.environ.get('MYSQL_PASSWORD', '123456'),
+    'database': os.environ.get('MYSQL_DATABASE', 'proyecto_inventario_wisuma'),
+    'puerto': int(os.environ.get('MYSQL_PORT', 3307))
 }
 
+BACKENDS = ('mysql', 'sqlite', 'auto')
+BACKEND_DEFECTO = 'mysql'
+
+registro = logging.getLogger('inventario.conexion')
+
 
 def obtener_uri_mysql():
     return (
@@ -25,25 +68,32 @@ def obtener_uri_sqlite():
     return f"sqlite:///{db_path}"
 
 
-def mysql_disponible():
-    """Verifica si MySQL está accesible y crea la base de datos si no existe."""
+def crear_base_mysql():
+    """Crea la base de datos MySQL si no existe. Lanza la excepción de pymysql si no hay conexión."""
+    import pymysql
+    # Conectar sin especificar base de datos para poder crearla
+    conn = pymysql.connect(
+        host=config_db['host'],
+        port=config_db['puerto'],
+        user=config_db['usuario'],
+        password=config_db['password'],
+        connect_timeout=3
+    )
     try:
-        import pymysql
-        # Conectar sin especificar base de datos para poder crearla
-        conn = pymysql.connect(
-            host=config_db['host'],
-            port=config_db['puerto'],
-            user=config_db['usuario'],
-            password=config_db['password'],
-            connect_timeout=3
-        )
         cursor = conn.cursor()
         cursor.execute(
             f"CREATE DATABASE IF NOT EXISTS `{config_db['database']}` "
             f"CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci"
         )
         conn.commit()
+    finally:
         conn.close()
+
+
+def mysql_disponible():
+    """Verifica si MySQL está accesible y crea la base de datos si no existe."""
+    try:
+        crear_base_mysql()
         print(f"✔ Base de datos '{config_db['database']}' verificada/creada.")
         return True
     except Exception as e:
@@ -51,14 +101,91 @@ def mysql_disponible():
         return False
 
 
-def configurar_app(app):
-    """Configura la URI de base de datos: MySQL si está disponible, SQLite como fallback."""
-    if mysql_disponible():
-        uri = obtener_uri_mysql()
-        print("✔ Conectado a MySQL.")
-    else:
-        uri = obtener_uri_sqlite()
+def backend_configurado():
+    backend = os.environ.get('DB_BACKEND', BACKEND_DEFECTO).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"DB_BACKEND debe ser uno de {', '.join(BACKENDS)}; se recibió '{backend}'.")
+    return backend
+
+
+def obtener_uri():
+    """URI de la base de datos según el entorno, sin abrir conexiones (salvo DB_BACKEND=auto)."""
+    if os.environ.get('DATABASE_URL'):
+        return os.environ['DATABASE_URL']
+    backend = backend_configurado()
+    if backend == 'mysql':
+        return obtener_uri_mysql()
+    if backend == 'auto':
+        if mysql_disponible():
+            print("✔ Conectado a MySQL.")
+            return obtener_uri_mysql()
         print("⚠ MySQL no disponible. Usando SQLite como fallback.")
+    return obtener_uri_sqlite()
+
+
+def _entorno_entero(nombre, defecto):
+    return int(os.environ.get(nombre, defecto))
+
+
+def _entorno_booleano(nombre, defecto):
+    valor = os.environ.get(nombre)
+    if valor is None:
+        return defecto
+    return valor.strip().lower() in ('1', 'true', 'si', 'sí', 'yes')
 
+
+def opciones_motor(uri):
+    """Opciones de create_engine (SQLALCHEMY_ENGINE_OPTIONS) para la URI dada."""
+    es_sqlite = uri.startswith('sqlite')
+    if es_sqlite and (':memory:' in uri or uri.rstrip('/') == 'sqlite:'):
+        return {}  # SQLite en memoria usa un pool de una sola conexión
+    opciones = {
+        'poolclass': PoolMedido,
+        'pool_size': _entorno_entero('DB_POOL_SIZE', 5),
+        'max_overflow': _entorno_entero('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _entorno_entero('DB_POOL_TIMEOUT', 30),
+        'pool_pre_ping': _entorno_booleano('DB_POOL_PRE_PING', not es_sqlite),
+    }
+    if es_sqlite:
+        # busy timeout del driver: esperar el bloqueo de escritura en vez de fallar con "database is locked"
+        opciones['connect_args'] = {
+            'check_same_thread': False,
+            'timeout': _entorno_entero('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000
+        }
+    else:
+        # Reciclar antes de que MySQL (wait_timeout) o un proxy corten la conexión inactiva
+        opciones['pool_recycle'] = _entorno_entero('DB_POOL_RECYCLE', 280)
+    return opciones
+
+
+def pragmas_sqlite():
+    return {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': _entorno_entero('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    }
+
+
+def configurar_app(app):
+    """Configura la URI de base de datos a partir del entorno (ver docstring del módulo)."""
+    uri = obtener_uri()
+    destino = make_url(uri).render_as_string(hide_password=True)
+    if os.environ.get('DATABASE_URL') or os.environ.get('DB_BACKEND'):
+        registro.info('Base de datos: %s', destino)
+    else:
+        # Visible sin configurar logging: el backend no se eligió de forma explícita
+        registro.warning('Base de datos: %s (sin DATABASE_URL ni DB_BACKEND, por defecto %s)',
+                         destino, BACKEND_DEFECTO)
     app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', opciones_motor(uri))
+    if uri.startswith('sqlite'):
+        app.config.setdefault('SQLITE_PRAGMAS', pragmas_sqlite())
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if os.environ.get('FACTURAS_INGESTA'):
+        app.config.setdefault('FACTURAS_INGESTA', _entorno_booleano('FACTURAS_INGESTA', False))
+    if os.environ.get('INSTRUMENTACION_LENTO_MS'):
+        app.config.setdefault('INSTRUMENTACION_LENTO_MS', _entorno_entero('INSTRUMENTACION_LENTO_MS', 0))
+    if os.environ.get('SESION_MODO'):
+        app.config.setdefault('SESION_MODO', os.environ['SESION_MODO'])
+    if os.environ.get('METRICAS_TOKEN'):
+        app.config.setdefault('METRICAS_TOKEN', os.environ['METRICAS_TOKEN'])
@@ -0,0 +1,202 @@
+"""
+Creación del esquema de la base de datos, separada del arranque de la app.
+
+Importar app ya no toca la base de datos; las tablas, el resumen por
+categoría y el índice de búsqueda se preparan con:
+
+    flask --app app bd inicializar
+
+Los cambios sobre bases existentes son migraciones versionadas
+(conexion/migraciones.py): `flask bd migrar`, `flask bd estado`,
+`flask bd revertir --hasta N`. `flask bd explicar` comprueba con EXPLAIN
+que las consultas principales de los servicios usan sus índices.
+"""
+
+import os
+import click
+from flask.cli import AppGroup
+from inventario.database import db, contar_consultas
+from conexion.migraciones import estado, migrar, revertir
+
+
+def inicializar_esquema():
+    """Crea la base (MySQL), las tablas que falten y los datos derivados. Requiere app context."""
+    from conexion.conexion import crear_base_mysql
+    from inventario.busqueda import obtener_motor
+    from inventario.productos import Producto
+    from services.resumen_service import ResumenService
+    from services.reposicion_service import ReposicionService
+    import models  # noqa: registra todos los modelos antes de create_all
+
+    if db.engine.dialect.name == 'mysql' and not os.environ.get('DATABASE_URL'):
+        # Solo la base descrita por config_db; una DATABASE_URL propia ya debe existir
+        crear_base_mysql()
+    db.create_all()
+    migrar(db.engine)
+    ResumenService.asegurar()
+    ReposicionService.asegurar()
+    obtener_motor(db, Producto)
+
+
+def _muestras():
+    """Valores existentes para que las consultas revisadas sean realistas (o de relleno si no hay datos)."""
+    from inventario.clientes import Cliente
+    from inventario.productos import Producto
+    from models.factura import Factura
+    return {
+        'categoria': db.session.query(Producto.categoria).limit(1).scalar() or 'General',
+        'producto_id': db.session.query(Producto.id).limit(1).scalar() or 0,
+        'cliente_id': db.session.query(Cliente.id).limit(1).scalar() or 0,
+        'email': db.session.query(Cliente.email).filter(Cliente.email.isnot(None)).limit(1).scalar() or '',
+        'factura_id': db.session.query(Factura.id).limit(1).scalar() or 0
+    }
+
+
+def _consultas_indexadas():
+    """(descripción, índice esperado, fragmento de la sentencia, función que la ejecuta).
+
+    Se revisa la última sentencia capturada que contiene el fragmento.
+    """
+    from inventario.clientes import Cliente
+    from inventario.productos import Producto
+    from models.factura import Factura, FacturaDetalle
+    from services.factura_service import FacturaService
+    from services.producto_service import ProductoService
+    from services.reposicion_service import ReposicionService
+
+    # Se recorren las relaciones reales; sin datos se usa la consulta equivalente
+    def facturas_de_cliente(m):
+        cliente = db.session.get(Cliente, m['cliente_id'])
+        return cliente.facturas if cliente else Factura.query.filter_by(cliente_id=0).all()
+
+    def lineas_de_factura(m):
+        factura = FacturaService.obtener_por_id(m['factura_id'], detalles=True)
+        return factura or FacturaDetalle.query.filter(FacturaDetalle.factura_id.in_([0])).all()
+
+    def detalles_de_producto(m):
+        producto = db.session.get(Producto, m['producto_id'])
+        return producto.detalles_factura if producto else FacturaDetalle.query.filter_by(producto_id=0).all()
+
+    return [
+        ('Productos por categoría', 'ix_producto_categoria', 'producto.categoria =',
+         lambda m: ProductoService.obtener_por_categoria(m['categoria'], pagina=1)),
+        ('Listado de facturas por fecha', 'ix_facturas_fecha_id', 'ORDER BY facturas.fecha',
+         lambda m: FacturaService.obtener_resumenes(por_pagina=20)),
+        ('Facturas de un cliente', 'ix_facturas_cliente_id', 'facturas.cliente_id',
+         facturas_de_cliente),
+        ('Líneas de una factura', 'ix_factura_detalles_factura_id', 'factura_detalles.factura_id IN',
+         lineas_de_factura),
+        ('Ventas de un producto', 'ix_factura_detalles_producto_id', 'factura_detalles.producto_id',
+         detalles_de_producto),
+        ('Cliente por email', 'ix_cliente_email', 'cliente.email =',
+         lambda m: Cliente.query.filter_by(email=m['email']).first()),
+        ('Productos bajo su punto de reorden', 'ix_reposicion_producto_margen',
+         'reposicion_producto.margen <', lambda m: ReposicionService.bajo_punto_reorden()),
+    ]
+
+
+def _plan(sentencia, parametros):
+    """Líneas del plan de ejecución de la sentencia (EXPLAIN QUERY PLAN en SQLite, EXPLAIN en MySQL)."""
+    conexion = db.session.connection()
+    if db.engine.dialect.name == 'sqlite':
+        filas = conexion.exec_driver_sql('EXPLAIN QUERY PLAN ' + sentencia, parametros).all()
+        return [fila[-1] for fila in filas]
+    filas = conexion.exec_driver_sql('EXPLAIN ' + sentencia, parametros).mappings().all()
+    return [f"{fila['table']}: type={fila['type']} key={fila['key']}" for fila in filas]
+
+
+def verificar_planes():
+    """Ejecuta las consultas principales, captura su SQL y revisa su plan.
+
+    Retorna una lista de (descripción, índice esperado, plan, usa_indice).
+    """
+    muestras = _muestras()
+    resultados = []
+    for descripcion, indice, fragmento, ejecutar in _consultas_indexadas():
+        with contar_consultas() as consultas:
+            ejecutar(muestras)
+        capturadas = [(s, p) for s, p in zip(consultas['sentencias'], consultas['parametros'])
+                      if fragmento in s]
+        if not capturadas:
+            resultados.append((descripcion, indice, ['(no se ejecutó la consulta)'], False))
+            continue
+        plan = _plan(*capturadas[-1])
+        resultados.append((descripcion, indice, plan, any(indice in linea for linea in plan)))
+    db.session.rollback()
+    return resultados
+
+
+bd_cli = AppGroup('bd', help='Esquema de la base de datos.')
+
+
+@bd_cli.command('inicializar')
+def inicializar_comando():
+    """Crea la base de datos y las tablas que falten (idempotente)."""
+    inicializar_esquema()
+    click.echo(f'Esquema verificado en {db.engine.url.render_as_string(hide_password=True)}.')
+
+
+@bd_cli.command('migrar')
+@click.option('--hasta', type=int, help='Última versión a aplicar (por defecto todas).')
+def migrar_comando(hasta):
+    """Aplica las migraciones pendientes."""
+    aplicadas = migrar(db.engine, hasta)
+    for migracion in aplicadas:
+        click.echo(f'Aplicada {migracion.version:03d}: {migracion.descripcion}')
+    if not aplicadas:
+        click.echo('No hay migraciones pendientes.')
+
+
+@bd_cli.command('estado')
+def estado_comando():
+    """Lista las migraciones y cuándo se aplicó cada una."""
+    for migracion, aplicada_en in estado(db.engine):
+        marca = aplicada_en.strftime('%Y-%m-%d %H:%M') if aplicada_en else 'pendiente'
+        click.echo(f'{migracion.version:03d}  {marca:16}  {migracion.descripcion}')
+
+
+@bd_cli.command('revertir')
+@click.option('--hasta', type=int, required=True, help='Versión que queda aplicada (0 = ninguna).')
+def revertir_comando(hasta):
+    """Deshace las migraciones posteriores a --hasta."""
+    for migracion in revertir(db.engine, hasta):
+        click.echo(f'Revertida {migracion.version:03d}: {migracion.descripcion}')
+
+
+@bd_cli.command('explicar')
+@click.option('--detalle', is_flag=True, help='Muestra el plan completo de cada consulta.')
+def explicar_comando(detalle):
+    """Comprueba con EXPLAIN que las consultas principales usan sus índices."""
+    fallos = 0
+    for descripcion, indice, plan, usa_indice in verificar_planes():
+        click.echo(f"[{'OK' if usa_indice else 'FALLA'}] {descripcion}: {indice}")
+        if detalle or not usa_indice:
+            for linea in plan:
+                click.echo(f'       {linea}')
+        fallos += not usa_indice
+    if fallos:
+        raise SystemExit(1)
+
+
+@bd_cli.command('pool')
+@click.option('--hilos', default=0, help='Hilos concurrentes para simular carga (0 = solo mostrar).')
+@click.option('--consultas', default=50, help='Consultas por hilo al simular carga.')
+def pool_comando(hilos, consultas):
+    """Muestra la configuración y métricas del pool; con --hilos lo somete a carga."""
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy import text
+    from inventario.database import estado_pool
+
+    engine = db.engine
+
+    def trabajar():
+        for _ in range(consultas):
+            with engine.connect() as conexion:
+                conexion.execute(text('SELECT 1'))
+
+    if hilos:
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            for futuro in [ejecutor.submit(trabajar) for _ in range(hilos)]:
+                futuro.result()
+    click.echo(json.dumps(estado_pool(engine), indent=2, default=str))
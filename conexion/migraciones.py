@@ -0,0 +1,231 @@
+"""
+Migraciones versionadas del esquema, para MySQL y SQLite.
+
+Cada migración tiene un número de versión, una descripción y funciones
+subir/bajar que reciben una conexión de SQLAlchemy. La versión aplicada se
+guarda en la tabla esquema_version, así que `flask bd migrar` solo ejecuta
+las pendientes y puede repetirse sin efecto.
+
+Las migraciones no dependen de los modelos: describen el cambio tal como
+era al escribirlas, aunque los modelos cambien después. Las bases nuevas
+(create_all) ya traen los índices declarados en los modelos; por eso las
+operaciones comprueban si el índice existe antes de crearlo.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, inspect, select, text
+
+metadata = MetaData()
+
+esquema_version = Table(
+    'esquema_version', metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('descripcion', String(200), nullable=False),
+    Column('aplicada_en', DateTime, nullable=False)
+)
+
+
+class Migracion:
+
+    def __init__(self, version, descripcion, subir, bajar=None):
+        self.version = version
+        self.descripcion = descripcion
+        self.subir = subir
+        self.bajar = bajar
+
+    def __repr__(self):
+        return f"<Migracion {self.version:03d} {self.descripcion}>"
+
+
+# ==================== OPERACIONES ====================
+
+def existe_indice(conexion, tabla, nombre):
+    return any(i['name'] == nombre for i in inspect(conexion).get_indexes(tabla))
+
+
+def crear_indice(conexion, tabla, nombre, columnas):
+    if existe_indice(conexion, tabla, nombre):
+        return False
+    preparador = conexion.dialect.identifier_preparer
+    lista = ', '.join(preparador.quote(c) for c in columnas)
+    conexion.execute(text(f'CREATE INDEX {preparador.quote(nombre)} '
+                          f'ON {preparador.quote(tabla)} ({lista})'))
+    return True
+
+
+def existe_columna(conexion, tabla, nombre):
+    return any(c['name'] == nombre for c in inspect(conexion).get_columns(tabla))
+
+
+def eliminar_indice(conexion, tabla, nombre):
+    if not existe_indice(conexion, tabla, nombre):
+        return False
+    preparador = conexion.dialect.identifier_preparer
+    if conexion.dialect.name == 'mysql':
+        conexion.execute(text(f'DROP INDEX {preparador.quote(nombre)} ON {preparador.quote(tabla)}'))
+    else:
+        conexion.execute(text(f'DROP INDEX {preparador.quote(nombre)}'))
+    return True
+
+
+# ==================== MIGRACIONES ====================
+
+# (tabla, nombre, columnas, respalda_fk)
+INDICES_001 = [
+    ('producto', 'ix_producto_categoria', ['categoria', 'id'], False),
+    ('cliente', 'ix_cliente_email', ['email'], False),
+    ('facturas', 'ix_facturas_cliente_id', ['cliente_id'], True),
+    ('facturas', 'ix_facturas_fecha_id', ['fecha', 'id'], False),
+    ('factura_detalles', 'ix_factura_detalles_factura_id', ['factura_id'], True),
+    ('factura_detalles', 'ix_factura_detalles_producto_id', ['producto_id'], True),
+]
+
+
+def _subir_001(conexion):
+    for tabla, nombre, columnas, _ in INDICES_001:
+        crear_indice(conexion, tabla, nombre, columnas)
+
+
+def _bajar_001(conexion):
+    for tabla, nombre, _, respalda_fk in INDICES_001:
+        # MySQL no permite quitar el único índice que usa una clave foránea
+        if respalda_fk and conexion.dialect.name == 'mysql':
+            continue
+        eliminar_indice(conexion, tabla, nombre)
+
+
+# Registro de cambios de productos tal como se definió en la migración 002
+cambios_producto_002 = Table(
+    'cambios_producto', MetaData(),
+    Column('secuencia', Integer, primary_key=True),
+    Column('producto_id', Integer, nullable=False),
+    Column('operacion', String(10), nullable=False),
+    Column('fecha', DateTime, nullable=False),
+    Index('ix_cambios_producto_producto_secuencia', 'producto_id', 'secuencia')
+)
+
+
+def _subir_002(conexion):
+    if not existe_columna(conexion, 'producto', 'actualizado_en'):
+        conexion.execute(text('ALTER TABLE producto ADD COLUMN actualizado_en DATETIME'))
+    conexion.execute(text('UPDATE producto SET actualizado_en = COALESCE(fecha_creacion, :ahora) '
+                          'WHERE actualizado_en IS NULL'), {'ahora': datetime.utcnow()})
+    cambios_producto_002.create(conexion, checkfirst=True)
+    # Un cambio inicial por producto existente, para que desde=0 entregue el catálogo completo
+    if conexion.execute(select(cambios_producto_002.c.secuencia).limit(1)).first() is None:
+        conexion.execute(text('INSERT INTO cambios_producto (producto_id, operacion, fecha) '
+                              'SELECT id, :operacion, :ahora FROM producto ORDER BY id'),
+                         {'operacion': 'upsert', 'ahora': datetime.utcnow()})
+
+
+def _bajar_002(conexion):
+    cambios_producto_002.drop(conexion, checkfirst=True)
+    if existe_columna(conexion, 'producto', 'actualizado_en'):
+        conexion.execute(text('ALTER TABLE producto DROP COLUMN actualizado_en'))
+
+
+# Índices que cubren las consultas de services/analitica_service.py: el rango
+# de fechas y las líneas de cada factura se leen sin ir a las tablas
+INDICES_003 = [
+    ('facturas', 'ix_facturas_fecha_venta', ['fecha', 'estado', 'total', 'cliente_id']),
+    ('factura_detalles', 'ix_factura_detalles_factura_venta', ['factura_id', 'producto_id', 'cantidad', 'subtotal']),
+]
+
+
+def _subir_003(conexion):
+    for tabla, nombre, columnas in INDICES_003:
+        crear_indice(conexion, tabla, nombre, columnas)
+
+
+def _bajar_003(conexion):
+    for tabla, nombre, _ in INDICES_003:
+        eliminar_indice(conexion, tabla, nombre)
+
+
+# Versión de datos por entidad tal como se definió en la migración 004
+version_datos_004 = Table(
+    'version_datos', MetaData(),
+    Column('entidad', String(30), primary_key=True),
+    Column('version', Integer, nullable=False, default=0)
+)
+ENTIDADES_004 = ('acumulados', 'clientes', 'facturas', 'ingesta', 'productos')
+
+
+def _subir_004(conexion):
+    # Con las filas creadas de antemano, incrementar() siempre actualiza una fila existente
+    version_datos_004.create(conexion, checkfirst=True)
+    existentes = set(conexion.execute(select(version_datos_004.c.entidad)).scalars())
+    faltantes = [{'entidad': e, 'version': 0} for e in ENTIDADES_004 if e not in existentes]
+    if faltantes:
+        conexion.execute(version_datos_004.insert(), faltantes)
+
+
+def _bajar_004(conexion):
+    pass  # las filas en 0 equivalen a no tenerlas (VersionService.obtener)
+
+
+MIGRACIONES = [
+    Migracion(1, 'Índices de categoría, email, cliente/fecha de factura y líneas de factura',
+              _subir_001, _bajar_001),
+    Migracion(2, 'Fecha de actualización de productos y registro de cambios para sincronización',
+              _subir_002, _bajar_002),
+    Migracion(3, 'Índices de análisis de ventas sobre facturas y líneas de factura',
+              _subir_003, _bajar_003),
+    Migracion(4, 'Filas iniciales de version_datos para cada entidad',
+              _subir_004, _bajar_004),
+]
+
+
+# ==================== EJECUCIÓN ====================
+
+def version_actual(engine):
+    with engine.begin() as conexion:
+        esquema_version.create(conexion, checkfirst=True)
+        return conexion.execute(select(esquema_version.c.version)
+                                .order_by(esquema_version.c.version.desc()).limit(1)).scalar() or 0
+
+
+def estado(engine):
+    """Lista de (migración, aplicada_en o None) en orden de versión."""
+    version_actual(engine)  # crea esquema_version si falta
+    with engine.connect() as conexion:
+        aplicadas = dict(conexion.execute(select(esquema_version.c.version,
+                                                 esquema_version.c.aplicada_en)).all())
+    return [(m, aplicadas.get(m.version)) for m in MIGRACIONES]
+
+
+def migrar(engine, hasta=None):
+    """Aplica las migraciones pendientes hasta la versión indicada (todas por defecto).
+
+    Cada migración corre en su propia transacción junto con su registro en
+    esquema_version. Retorna las migraciones aplicadas.
+    """
+    actual = version_actual(engine)
+    aplicadas = []
+    for migracion in MIGRACIONES:
+        if migracion.version <= actual or (hasta is not None and migracion.version > hasta):
+            continue
+        with engine.begin() as conexion:
+            migracion.subir(conexion)
+            conexion.execute(esquema_version.insert().values(
+                version=migracion.version, descripcion=migracion.descripcion,
+                aplicada_en=datetime.utcnow()))
+        aplicadas.append(migracion)
+    return aplicadas
+
+
+def revertir(engine, hasta):
+    """Deshace las migraciones aplicadas con versión mayor que hasta, de la más nueva a la más vieja."""
+    actual = version_actual(engine)
+    revertidas = []
+    for migracion in reversed(MIGRACIONES):
+        if migracion.version > actual or migracion.version <= hasta:
+            continue
+        if migracion.bajar is None:
+            raise RuntimeError(f"La migración {migracion.version} no se puede revertir.")
+        with engine.begin() as conexion:
+            migracion.bajar(conexion)
+            conexion.execute(esquema_version.delete()
+                             .where(esquema_version.c.version == migracion.version))
+        revertidas.append(migracion)
+    return revertidas
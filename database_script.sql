@@ -1,75 +1,31 @@
 -- ============================================================
 -- Script SQL - Ferretería Senguana
 -- Base de datos: proyecto_inventario_wisuma
+--
+-- Este script solo crea la base y carga datos de ejemplo. Las tablas, los
+-- índices y la versión del esquema (esquema_version) los crea
+--
+--     flask --app app bd inicializar
+--
+-- a partir de los modelos (models/, inventario/) y de las migraciones de
+-- conexion/migraciones.py, que son la única definición del esquema; las
+-- bases existentes se actualizan con `flask --app app bd migrar`.
+--
+-- Orden:
+--   1. Ejecutar este script hasta USE (o dejar que bd inicializar cree la base).
+--   2. flask --app app bd inicializar
+--   3. Ejecutar la sección "Datos de ejemplo".
+--   4. flask --app app resumen reconstruir
+--      flask --app app reposicion recalcular
+--      (los INSERT directos no pasan por los listeners que mantienen esas tablas)
 -- ============================================================
-
 CREATE DATABASE IF NOT EXISTS proyecto_inventario_wisuma
   CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 
 USE proyecto_inventario_wisuma;
 
 -- ------------------------------------------------------------
--- Tabla: usuarios
--- ------------------------------------------------------------
-CREATE TABLE IF NOT EXISTS usuarios (
-    id_usuario  INT AUTO_INCREMENT PRIMARY KEY,
-    nombre      VARCHAR(100) NOT NULL,
-    email       VARCHAR(100) NOT NULL UNIQUE,
-    password    VARCHAR(255) NOT NULL
-);
-
--- ------------------------------------------------------------
--- Tabla: producto
--- ------------------------------------------------------------
-CREATE TABLE IF NOT EXISTS producto (
-    id              INT AUTO_INCREMENT PRIMARY KEY,
-    nombre          VARCHAR(100) NOT NULL,
-    categoria       VARCHAR(50)  NOT NULL DEFAULT 'General',
-    descripcion     VARCHAR(200),
-    precio          DOUBLE       NOT NULL,
-    stock           INT          NOT NULL DEFAULT 0,
-    fecha_creacion  DATETIME     DEFAULT CURRENT_TIMESTAMP
-);
-
--- ------------------------------------------------------------
--- Tabla: cliente
--- ------------------------------------------------------------
-CREATE TABLE IF NOT EXISTS cliente (
-    id          INT AUTO_INCREMENT PRIMARY KEY,
-    nombre      VARCHAR(100) NOT NULL,
-    telefono    VARCHAR(20),
-    email       VARCHAR(100),
-    tipo        VARCHAR(50)  DEFAULT 'Particular'
-);
-
--- ------------------------------------------------------------
--- Tabla: facturas
--- ------------------------------------------------------------
-CREATE TABLE IF NOT EXISTS facturas (
-    id          INT AUTO_INCREMENT PRIMARY KEY,
-    cliente_id  INT    NOT NULL,
-    fecha       DATETIME DEFAULT CURRENT_TIMESTAMP,
-    estado      VARCHAR(20) DEFAULT 'Pendiente',
-    total       DOUBLE DEFAULT 0.0,
-    CONSTRAINT fk_factura_cliente FOREIGN KEY (cliente_id) REFERENCES cliente(id)
-);
-
--- ------------------------------------------------------------
--- Tabla: factura_detalles
--- ------------------------------------------------------------
-CREATE TABLE IF NOT EXISTS factura_detalles (
-    id              INT AUTO_INCREMENT PRIMARY KEY,
-    factura_id      INT    NOT NULL,
-    producto_id     INT    NOT NULL,
-    cantidad        INT    NOT NULL,
-    precio_unitario DOUBLE NOT NULL,
-    subtotal        DOUBLE NOT NULL,
-    CONSTRAINT fk_detalle_factura  FOREIGN KEY (factura_id)  REFERENCES facturas(id) ON DELETE CASCADE,
-    CONSTRAINT fk_detalle_producto FOREIGN KEY (producto_id) REFERENCES producto(id)
-);
-
--- ------------------------------------------------------------
--- Datos de ejemplo
+-- Datos de ejemplo (después de bd inicializar)
 -- ------------------------------------------------------------
 INSERT IGNORE INTO usuarios (nombre, email, password) VALUES
 ('Administrador', 'admin@ferreteria.com', 'pbkdf2:sha256:placeholder');
@@ -88,3 +44,9 @@ INSERT IGNORE INTO cliente (nombre, telefono, email, tipo) VALUES
 ('Juan Pérez', '0991234567', 'juan@email.com', 'Particular'),
 ('Constructora ABC', '0987654321', 'contacto@abc.com', 'Empresa'),
 ('María González', '0976543210', 'maria@email.com', 'Particular');
+
+-- Un cambio por producto para que los terminales reciban el catálogo (desde=0)
+INSERT INTO cambios_producto (producto_id, operacion, fecha)
+SELECT p.id, 'upsert', NOW() FROM producto p
+WHERE NOT EXISTS (SELECT 1 FROM cambios_producto c WHERE c.producto_id = p.id)
+ORDER BY p.id;
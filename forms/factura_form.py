@@ -35,3 +35,48 @@ def validar_factura_form(form_data):
         datos['items'] = items
 
     return errores, datos
+
+
+def validar_factura_json(data):
+    """Valida una factura recibida por la API: {"cliente_id": n, "items": [{"producto_id", "cantidad"}]}.
+
+    Retorna (errores, datos_limpios) igual que validar_factura_form.
+    """
+    errores = []
+    datos = {}
+    if not isinstance(data, dict):
+        return ['La factura debe ser un objeto JSON.'], datos
+
+    try:
+        cliente_id = int(data.get('cliente_id', 0))
+        if cliente_id <= 0:
+            errores.append('Debe indicar un cliente.')
+        else:
+            datos['cliente_id'] = cliente_id
+    except (ValueError, TypeError):
+        errores.append('Cliente inválido.')
+
+    items = []
+    items_recibidos = data.get('items') or []
+    if not isinstance(items_recibidos, list):
+        errores.append('items debe ser una lista.')
+        items_recibidos = []
+    for item in items_recibidos:
+        if not isinstance(item, dict):
+            errores.append(f'Ítem inválido: {item!r}.')
+            continue
+        try:
+            pid_int = int(item['producto_id'])
+            cant_int = int(item['cantidad'])
+        except (KeyError, ValueError, TypeError):
+            errores.append(f'Ítem inválido: {item!r}.')
+            continue
+        if pid_int > 0 and cant_int > 0:
+            items.append({'producto_id': pid_int, 'cantidad': cant_int})
+
+    if not items:
+        errores.append('Debe agregar al menos un producto a la factura.')
+    else:
+        datos['items'] = items
+
+    return errores, datos
@@ -0,0 +1,329 @@
+"""
+Búsqueda de productos por texto.
+
+Mantiene un índice sobre nombre, descripción y categoría según el motor de
+base de datos en uso:
+- SQLite: tabla virtual FTS5 sincronizada con triggers.
+- MySQL: índice FULLTEXT consultado con MATCH ... AGAINST en modo booleano.
+- Cualquier otro caso (o SQLite sin FTS5): índice de trigramas en memoria,
+  sincronizado con eventos del ORM.
+
+Todas las variantes buscan por prefijo ("torni" encuentra "Tornillería"),
+ignoran tildes y mayúsculas, y ordenan por relevancia.
+"""
+
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from sqlalchemy import event, text, column
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from .paginacion import Pagina, paginar
+
+INDICE_FTS = 'producto_fts'
+INDICE_FULLTEXT = 'ft_producto_busqueda'
+
+# Pesos de bm25 para (nombre, descripcion, categoria)
+PESOS_FTS = (10.0, 1.0, 3.0)
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'Tornillería' -> 'tornilleria'."""
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def terminos(consulta):
+    """Divide la consulta en palabras alfanuméricas normalizadas."""
+    return re.findall(r'\w+', normalizar(consulta))
+
+
+class IndiceTrigramas:
+    """Índice invertido de trigramas en memoria, usado cuando no hay índice de texto en la BD."""
+
+    def __init__(self):
+        self.documentos = {}
+        self.trigramas = defaultdict(set)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _trigramas(texto):
+        """Trigramas de cada palabra, con relleno para distinguir el inicio de la palabra."""
+        tris = set()
+        for palabra in texto.split():
+            palabra = f'  {palabra} '
+            tris.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+        return tris
+
+    def indexar(self, producto_id, nombre, descripcion, categoria):
+        campos = (normalizar(nombre), normalizar(descripcion), normalizar(categoria))
+        with self.lock:
+            self._quitar(producto_id)
+            self.documentos[producto_id] = campos
+            for tri in self._trigramas(' '.join(campos)):
+                self.trigramas[tri].add(producto_id)
+
+    def quitar(self, producto_id):
+        with self.lock:
+            self._quitar(producto_id)
+
+    def _quitar(self, producto_id):
+        campos = self.documentos.pop(producto_id, None)
+        if campos is None:
+            return
+        for tri in self._trigramas(' '.join(campos)):
+            ids = self.trigramas.get(tri)
+            if ids is not None:
+                ids.discard(producto_id)
+                if not ids:
+                    del self.trigramas[tri]
+
+    def buscar(self, consulta):
+        """Retorna los ids que contienen todas las palabras como prefijo, ordenados por relevancia."""
+        palabras = terminos(consulta)
+        if not palabras:
+            return []
+        with self.lock:
+            candidatos = None
+            for palabra in palabras:
+                tris = self._trigramas(palabra)
+                tris = {t for t in tris if not t.endswith(' ')} or tris
+                ids = set.intersection(*(self.trigramas.get(t, set()) for t in tris))
+                candidatos = ids if candidatos is None else candidatos & ids
+                if not candidatos:
+                    return []
+            resultados = []
+            for producto_id in candidatos:
+                puntaje = self._puntaje(self.documentos[producto_id], palabras)
+                if puntaje:
+                    resultados.append((puntaje, producto_id))
+        resultados.sort(key=lambda r: (-r[0], r[1]))
+        return [producto_id for _, producto_id in resultados]
+
+    @staticmethod
+    def _puntaje(campos, palabras):
+        total = 0
+        for palabra in palabras:
+            mejor = 0
+            for campo, peso in zip(campos, PESOS_FTS):
+                for token in campo.split():
+                    if token.startswith(palabra):
+                        mejor = max(mejor, peso * (2 if token == palabra else 1))
+            if not mejor:
+                return 0
+            total += mejor
+        return total
+
+
+class MotorBusqueda:
+    """Selecciona el backend de búsqueda según el dialecto y mantiene su índice."""
+
+    def __init__(self, db, Producto):
+        self.db = db
+        self.Producto = Producto
+        self.backend = None
+        self.trigramas = None
+
+    # -------------------- Preparación del índice --------------------
+
+    def asegurar_indice(self):
+        dialecto = self.db.engine.dialect.name
+        if dialecto == 'sqlite' and self._preparar_fts5():
+            self.backend = 'fts5'
+        elif dialecto == 'mysql' and self._preparar_fulltext():
+            self.backend = 'fulltext'
+        else:
+            self._preparar_trigramas()
+            self.backend = 'trigramas'
+        return self.backend
+
+    def _preparar_fts5(self):
+        sesion = self.db.session
+        try:
+            existe = sesion.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"),
+                {'n': INDICE_FTS}
+            ).scalar()
+            sesion.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDICE_FTS} USING fts5("
+                "nombre, descripcion, categoria, content='producto', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            ))
+            sesion.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {INDICE_FTS}_ai AFTER INSERT ON producto BEGIN "
+                f"INSERT INTO {INDICE_FTS}(rowid, nombre, descripcion, categoria) "
+                "VALUES (new.id, new.nombre, new.descripcion, new.categoria); END"
+            ))
+            sesion.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {INDICE_FTS}_ad AFTER DELETE ON producto BEGIN "
+                f"INSERT INTO {INDICE_FTS}({INDICE_FTS}, rowid, nombre, descripcion, categoria) "
+                "VALUES ('delete', old.id, old.nombre, old.descripcion, old.categoria); END"
+            ))
+            sesion.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {INDICE_FTS}_au AFTER UPDATE OF nombre, descripcion, categoria "
+                f"ON producto BEGIN "
+                f"INSERT INTO {INDICE_FTS}({INDICE_FTS}, rowid, nombre, descripcion, categoria) "
+                "VALUES ('delete', old.id, old.nombre, old.descripcion, old.categoria); "
+                f"INSERT INTO {INDICE_FTS}(rowid, nombre, descripcion, categoria) "
+                "VALUES (new.id, new.nombre, new.descripcion, new.categoria); END"
+            ))
+            if not existe:
+                sesion.execute(text(f"INSERT INTO {INDICE_FTS}({INDICE_FTS}) VALUES ('rebuild')"))
+            sesion.commit()
+            return True
+        except OperationalError as e:
+            # SQLite compilado sin FTS5
+            sesion.rollback()
+            print(f"⚠ FTS5 no disponible, se usará el índice de trigramas: {e}")
+            return False
+
+    def _preparar_fulltext(self):
+        sesion = self.db.session
+        try:
+            existe = sesion.execute(text(
+                "SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+                "AND TABLE_NAME = 'producto' AND INDEX_NAME = :n LIMIT 1"
+            ), {'n': INDICE_FULLTEXT}).scalar()
+            if not existe:
+                sesion.execute(text(
+                    f"ALTER TABLE producto ADD FULLTEXT INDEX {INDICE_FULLTEXT} "
+                    "(nombre, descripcion, categoria)"
+                ))
+            sesion.commit()
+            return True
+        except (OperationalError, ProgrammingError) as e:
+            sesion.rollback()
+            print(f"⚠ No se pudo crear el índice FULLTEXT, se usará el índice de trigramas: {e}")
+            return False
+
+    def _preparar_trigramas(self):
+        self.trigramas = IndiceTrigramas()
+        P = self.Producto
+        for producto_id, nombre, descripcion, categoria in self.db.session.query(
+                P.id, P.nombre, P.descripcion, P.categoria).yield_per(1000):
+            self.trigramas.indexar(producto_id, nombre, descripcion, categoria)
+
+        def indexar(mapper, connection, target):
+            self.trigramas.indexar(target.id, target.nombre, target.descripcion, target.categoria)
+
+        def quitar(mapper, connection, target):
+            self.trigramas.quitar(target.id)
+
+        event.listen(P, 'after_insert', indexar)
+        event.listen(P, 'after_update', indexar)
+        event.listen(P, 'after_delete', quitar)
+
+    def sincronizar(self, ids):
+        """Reindexa productos escritos sin pasar por el ORM (p. ej. importación masiva).
+
+        FTS5 y FULLTEXT se mantienen solos; solo el índice de trigramas lo necesita.
+        Con ids=None (ids desconocidos) se reconstruye el índice completo.
+        """
+        if self.backend != 'trigramas' or ids == []:
+            return
+        P = self.Producto
+        if ids is None:
+            self.trigramas = IndiceTrigramas()
+            ids = [r[0] for r in self.db.session.query(P.id)]
+        for inicio in range(0, len(ids), 500):
+            for producto_id, nombre, descripcion, categoria in self.db.session.query(
+                    P.id, P.nombre, P.descripcion, P.categoria).filter(P.id.in_(ids[inicio:inicio + 500])):
+                self.trigramas.indexar(producto_id, nombre, descripcion, categoria)
+
+    # -------------------- Consultas --------------------
+
+    def _consulta_fts5(self, palabras):
+        return ' '.join(f'"{p}"*' for p in palabras)
+
+    def _consulta_fulltext(self, palabras):
+        return ' '.join(f'+{p}*' for p in palabras)
+
+    def ids_coincidentes(self, consulta):
+        """Subconsulta (o lista) con los ids de productos que coinciden, para usar en filtros IN."""
+        palabras = terminos(consulta)
+        if self.backend == 'fts5':
+            return text(f"SELECT rowid FROM {INDICE_FTS} WHERE {INDICE_FTS} MATCH :q").bindparams(
+                q=self._consulta_fts5(palabras)).columns(column('rowid'))
+        if self.backend == 'fulltext':
+            return text(
+                "SELECT id FROM producto WHERE MATCH(nombre, descripcion, categoria) "
+                "AGAINST (:q IN BOOLEAN MODE)"
+            ).bindparams(q=self._consulta_fulltext(palabras)).columns(column('id'))
+        return self.trigramas.buscar(consulta)
+
+    def _ids_por_relevancia(self, palabras, consulta, limite=None, desplazamiento=0):
+        """Retorna (ids ordenados por relevancia, total de coincidencias). Sin limite retorna todos."""
+        if self.backend == 'trigramas':
+            todos = self.trigramas.buscar(consulta)
+            fin = None if limite is None else desplazamiento + limite
+            return todos[desplazamiento:fin], len(todos)
+
+        if self.backend == 'fts5':
+            params = {'q': self._consulta_fts5(palabras)}
+            pesos = ', '.join(str(p) for p in PESOS_FTS)
+            desde = f"FROM {INDICE_FTS} WHERE {INDICE_FTS} MATCH :q"
+            sql = f"SELECT rowid {desde} ORDER BY bm25({INDICE_FTS}, {pesos})"
+        else:
+            params = {'q': self._consulta_fulltext(palabras)}
+            coincide = "MATCH(nombre, descripcion, categoria) AGAINST (:q IN BOOLEAN MODE)"
+            desde = f"FROM producto WHERE {coincide}"
+            sql = f"SELECT id {desde} ORDER BY {coincide} DESC, id"
+
+        sesion = self.db.session
+        if limite is None:
+            ids = sesion.execute(text(sql), params).scalars().all()
+            return ids, len(ids)
+        ids = sesion.execute(text(f"{sql} LIMIT :limite OFFSET :desp"),
+                             dict(params, limite=limite, desp=desplazamiento)).scalars().all()
+        total = sesion.execute(text(f"SELECT count(*) {desde}"), params).scalar()
+        return ids, total
+
+    def buscar(self, consulta, pagina=None, por_pagina=20, orden='relevancia',
+               direccion='asc', columnas=None):
+        """Busca productos.
+
+        Sin pagina retorna la lista completa ordenada por relevancia. Con pagina
+        retorna un objeto Pagina; si orden es una de las columnas se ordena por
+        ella en lugar de por relevancia.
+        """
+        P = self.Producto
+        palabras = terminos(consulta)
+        if not palabras:
+            query = P.query
+            if pagina is None:
+                return query.all()
+            return paginar(query, columnas, pagina, por_pagina, orden, direccion, modelo=P)
+
+        if pagina is not None and columnas and orden in columnas:
+            query = P.query.filter(P.id.in_(self.ids_coincidentes(consulta)))
+            return paginar(query, columnas, pagina, por_pagina, orden, direccion, modelo=P)
+
+        if pagina is None:
+            ids, total = self._ids_por_relevancia(palabras, consulta)
+        else:
+            ids, total = self._ids_por_relevancia(palabras, consulta, por_pagina, (pagina - 1) * por_pagina)
+        productos = {p.id: p for p in P.query.filter(P.id.in_(ids)).all()} if ids else {}
+        items = [productos[i] for i in ids if i in productos]
+        if pagina is None:
+            return items
+        return Pagina(items, pagina, por_pagina, total, orden='relevancia', direccion='desc')
+
+
+_motores = {}
+_lock = threading.Lock()
+
+
+def obtener_motor(db, Producto):
+    """Motor de búsqueda del engine actual; prepara el índice la primera vez. Requiere app context."""
+    clave = str(db.engine.url)
+    motor = _motores.get(clave)
+    if motor is None:
+        with _lock:
+            motor = _motores.get(clave)
+            if motor is None:
+                motor = MotorBusqueda(db, Producto)
+                motor.asegurar_indice()
+                _motores[clave] = motor
+    return motor
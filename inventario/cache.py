@@ -0,0 +1,228 @@
+"""
+Caché de lectura para datos de referencia (categorías, listas para formularios).
+
+Dos implementaciones con la misma interfaz:
+
+- CacheMemoria: LRU en el proceso, con vencimiento por TTL.
+- CacheSQLite: archivo SQLite local compartido por todos los workers de la
+  máquina, de modo que una invalidación en un worker la ven los demás.
+
+Las claves usan el prefijo de la entidad ('productos:categorias',
+'clientes:opciones', ...) y las escrituras invalidan con invalidar('productos').
+Solo se deben guardar valores simples (listas, dicts, strings), nunca objetos
+del ORM, que quedarían desligados de la sesión.
+
+Configuración (app.config):
+    CACHE_TIPO       'memoria' (por defecto), 'sqlite' o 'ninguna'
+    CACHE_TTL        segundos de vida de cada entrada (300)
+    CACHE_CAPACIDAD  entradas máximas de la LRU en memoria (1024)
+    CACHE_RUTA       archivo de CacheSQLite (instance/cache.db)
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+
+TTL_DEFECTO = 300
+CAPACIDAD_DEFECTO = 1024
+
+
+class Cache:
+    """Base común: lectura con cálculo (read-through) y métricas de aciertos y fallos."""
+
+    def __init__(self, ttl=TTL_DEFECTO):
+        self.ttl = ttl
+        self._metricas = {'aciertos': 0, 'fallos': 0, 'invalidaciones': 0}
+        self._candado_metricas = threading.Lock()
+
+    def _contar(self, metrica):
+        with self._candado_metricas:
+            self._metricas[metrica] += 1
+
+    def obtener_o_calcular(self, clave, calcular, ttl=None):
+        """Retorna el valor guardado en clave; si no existe o venció lo calcula y lo guarda."""
+        encontrado, valor = self._leer(clave)
+        if encontrado:
+            self._contar('aciertos')
+            return valor
+        self._contar('fallos')
+        valor = calcular()
+        self._escribir(clave, valor, self.ttl if ttl is None else ttl)
+        return valor
+
+    def invalidar(self, *prefijos):
+        """Elimina las entradas cuya clave empieza con alguno de los prefijos."""
+        for prefijo in prefijos:
+            self._borrar_prefijo(prefijo)
+            self._contar('invalidaciones')
+
+    def metricas(self):
+        with self._candado_metricas:
+            metricas = dict(self._metricas)
+        consultas = metricas['aciertos'] + metricas['fallos']
+        metricas['tasa_aciertos'] = round(metricas['aciertos'] / consultas, 4) if consultas else 0.0
+        metricas['entradas'] = self.tamano()
+        metricas['tipo'] = type(self).__name__
+        return metricas
+
+    def _leer(self, clave):
+        raise NotImplementedError
+
+    def _escribir(self, clave, valor, ttl):
+        raise NotImplementedError
+
+    def _borrar_prefijo(self, prefijo):
+        raise NotImplementedError
+
+    def limpiar(self):
+        raise NotImplementedError
+
+    def tamano(self):
+        raise NotImplementedError
+
+
+class CacheMemoria(Cache):
+    """LRU en memoria con TTL, segura entre hilos."""
+
+    def __init__(self, ttl=TTL_DEFECTO, capacidad=CAPACIDAD_DEFECTO):
+        super().__init__(ttl)
+        self.capacidad = capacidad
+        self._datos = OrderedDict()  # clave -> (vence, valor)
+        self._candado = threading.Lock()
+
+    def _leer(self, clave):
+        with self._candado:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return False, None
+            if entrada[0] <= time.monotonic():
+                del self._datos[clave]
+                return False, None
+            self._datos.move_to_end(clave)
+            return True, entrada[1]
+
+    def _escribir(self, clave, valor, ttl):
+        with self._candado:
+            self._datos[clave] = (time.monotonic() + ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def _borrar_prefijo(self, prefijo):
+        with self._candado:
+            for clave in [c for c in self._datos if c.startswith(prefijo)]:
+                del self._datos[clave]
+
+    def limpiar(self):
+        with self._candado:
+            self._datos.clear()
+
+    def tamano(self):
+        return len(self._datos)
+
+
+class CacheSQLite(Cache):
+    """Caché en un archivo SQLite local, compartida por los procesos de la máquina.
+
+    Los valores se serializan con pickle y el vencimiento se guarda como
+    tiempo Unix (time.monotonic no es comparable entre procesos).
+    """
+
+    def __init__(self, ruta, ttl=TTL_DEFECTO):
+        super().__init__(ttl)
+        self.ruta = ruta
+        self._local = threading.local()
+        with self._conexion() as conexion:
+            conexion.execute('CREATE TABLE IF NOT EXISTS cache '
+                             '(clave TEXT PRIMARY KEY, vence REAL NOT NULL, valor BLOB NOT NULL)')
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+            conexion = sqlite3.connect(self.ruta, timeout=5)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            self._local.conexion = conexion
+        return conexion
+
+    def _leer(self, clave):
+        fila = self._conexion().execute('SELECT vence, valor FROM cache WHERE clave = ?',
+                                        (clave,)).fetchone()
+        if fila is None or fila[0] <= time.time():
+            return False, None
+        return True, pickle.loads(fila[1])
+
+    def _escribir(self, clave, valor, ttl):
+        with self._conexion() as conexion:
+            conexion.execute('INSERT OR REPLACE INTO cache (clave, vence, valor) VALUES (?, ?, ?)',
+                             (clave, time.time() + ttl, pickle.dumps(valor)))
+            conexion.execute('DELETE FROM cache WHERE vence <= ?', (time.time(),))
+
+    def _borrar_prefijo(self, prefijo):
+        with self._conexion() as conexion:
+            conexion.execute("DELETE FROM cache WHERE substr(clave, 1, ?) = ?", (len(prefijo), prefijo))
+
+    def limpiar(self):
+        with self._conexion() as conexion:
+            conexion.execute('DELETE FROM cache')
+
+    def tamano(self):
+        return self._conexion().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+class SinCache(Cache):
+    """Desactiva la caché: siempre calcula (útil en pruebas y para comparar)."""
+
+    def _leer(self, clave):
+        return False, None
+
+    def _escribir(self, clave, valor, ttl):
+        pass
+
+    def _borrar_prefijo(self, prefijo):
+        pass
+
+    def limpiar(self):
+        pass
+
+    def tamano(self):
+        return 0
+
+
+_caches = {}
+
+
+def crear_cache(config, instance_path='instance'):
+    tipo = config.get('CACHE_TIPO', 'memoria')
+    ttl = config.get('CACHE_TTL', TTL_DEFECTO)
+    if tipo == 'sqlite':
+        return CacheSQLite(config.get('CACHE_RUTA') or os.path.join(instance_path, 'cache.db'), ttl)
+    if tipo == 'ninguna':
+        return SinCache(ttl)
+    return CacheMemoria(ttl, config.get('CACHE_CAPACIDAD', CAPACIDAD_DEFECTO))
+
+
+def obtener_cache(app=None):
+    """Caché de la aplicación (una por app, creada según su configuración)."""
+    if app is None:
+        app = current_app._get_current_object() if has_app_context() else None
+    clave = id(app)
+    if clave not in _caches:
+        if app is None:
+            _caches[clave] = CacheMemoria()
+        else:
+            _caches[clave] = crear_cache(app.config, app.instance_path)
+    return _caches[clave]
+
+
+def cacheado(clave, calcular, ttl=None):
+    """Atajo: obtener_o_calcular sobre la caché de la aplicación actual."""
+    return obtener_cache().obtener_o_calcular(clave, calcular, ttl)
+
+
+def invalidar(*prefijos):
+    obtener_cache().invalidar(*prefijos)
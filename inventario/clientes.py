@@ -7,6 +7,8 @@ class Cliente(db.Model):
     email = db.Column(db.String(100))
     tipo = db.Column(db.String(50)) # Por ejemplo: 'Particular', 'Empresa'
 
+    __table_args__ = (db.Index('ix_cliente_email', 'email'),)
+
     def __init__(self, nombre, telefono, email, tipo, id=None):
         if id is not None:
             self.id = id
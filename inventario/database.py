@@ -1,2 +1,153 @@
+import threading
+import time
+from contextlib import contextmanager
 from flask_sqlalchemy import SQLAlchemy
-db = SQLAlchemy()
\ No newline at end of file
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+db = SQLAlchemy()
+
+
+@contextmanager
+def contar_consultas(engine=None):
+    """Cuenta las sentencias SQL ejecutadas dentro del bloque (sirve para detectar consultas N+1).
+
+    Uso:
+        with contar_consultas() as consultas:
+            FacturaService.obtener_por_id(1, detalles=True).to_dict()
+        assert consultas['total'] <= 2
+    """
+    engine = engine or db.engine
+    contador = {'total': 0, 'sentencias': [], 'parametros': []}
+
+    def antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+        contador['total'] += 1
+        contador['sentencias'].append(statement)
+        contador['parametros'].append(parameters)
+
+    event.listen(engine, 'before_cursor_execute', antes_de_ejecutar)
+    try:
+        yield contador
+    finally:
+        event.remove(engine, 'before_cursor_execute', antes_de_ejecutar)
+
+
+def insertar_o_sumar(conexion, tabla, clave, sumas):
+    """Inserta la fila {**clave, **sumas} o, si la clave ya existe, suma los valores de sumas a los guardados.
+
+    Es una sola sentencia (ON CONFLICT en SQLite, ON DUPLICATE KEY en MySQL):
+    dos transacciones que crean la misma fila a la vez no chocan con un error
+    de clave duplicada, como pasaba con UPDATE y luego INSERT si no había fila.
+    """
+    valores = {**clave, **sumas}
+    dialecto = conexion.dialect.name
+    if dialecto == 'sqlite':
+        sentencia = sqlite.insert(tabla).values(valores)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=list(clave),
+            set_={c: tabla.c[c] + sentencia.excluded[c] for c in sumas})
+    elif dialecto in ('mysql', 'mariadb'):
+        sentencia = mysql.insert(tabla).values(valores)
+        sentencia = sentencia.on_duplicate_key_update(
+            {c: tabla.c[c] + sentencia.inserted[c] for c in sumas})
+    else:
+        condicion = [tabla.c[c] == v for c, v in clave.items()]
+        resultado = conexion.execute(tabla.update().where(*condicion)
+                                     .values({c: tabla.c[c] + v for c, v in sumas.items()}))
+        if resultado.rowcount:
+            return
+        sentencia = tabla.insert().values(valores)
+    conexion.execute(sentencia)
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que registra checkouts, tiempo de espera por conexión y desbordes.
+
+    Los contadores se reinician si el engine recrea el pool (engine.dispose()).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._candado_metricas = threading.Lock()
+        self._metricas = {'checkouts': 0, 'checkins': 0, 'conexiones_creadas': 0,
+                          'timeouts': 0, 'espera_total': 0.0, 'espera_maxima': 0.0,
+                          'desborde_maximo': 0}
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except PoolTimeoutError:
+            with self._candado_metricas:
+                self._metricas['timeouts'] += 1
+            raise
+        espera = time.perf_counter() - inicio
+        with self._candado_metricas:
+            m = self._metricas
+            m['checkouts'] += 1
+            m['espera_total'] += espera
+            m['espera_maxima'] = max(m['espera_maxima'], espera)
+            m['desborde_maximo'] = max(m['desborde_maximo'], max(self.overflow(), 0))
+        return conexion
+
+    def _do_return_conn(self, record):
+        with self._candado_metricas:
+            self._metricas['checkins'] += 1
+        super()._do_return_conn(record)
+
+    def _create_connection(self):
+        with self._candado_metricas:
+            self._metricas['conexiones_creadas'] += 1
+        return super()._create_connection()
+
+    def metricas(self):
+        with self._candado_metricas:
+            metricas = dict(self._metricas)
+        checkouts = metricas['checkouts']
+        metricas['espera_promedio'] = metricas['espera_total'] / checkouts if checkouts else 0.0
+        return metricas
+
+
+def configurar_motor(app):
+    """Aplica al engine de la app los PRAGMA de SQLite de app.config['SQLITE_PRAGMAS']."""
+    with app.app_context():
+        engine = db.engine
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for nombre, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nombre}={valor}')
+        cursor.close()
+
+
+def estado_pool(engine=None):
+    """Configuración y uso actual del pool del engine (para /estado/pool y `flask bd pool`)."""
+    engine = engine or db.engine
+    pool = engine.pool
+    estado = {'dialecto': engine.dialect.name, 'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        estado.update({
+            'tamano': pool.size(),
+            'max_desborde': pool._max_overflow,
+            'timeout': pool.timeout(),
+            'recycle': pool._recycle,
+            'pre_ping': pool._pre_ping,
+            'en_uso': pool.checkedout(),
+            'disponibles': pool.checkedin(),
+            'desborde': max(pool.overflow(), 0)
+        })
+    if isinstance(pool, PoolMedido):
+        estado.update(pool.metricas())
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as conexion:
+            estado['pragmas'] = {
+                nombre: conexion.exec_driver_sql(f'PRAGMA {nombre}').scalar()
+                for nombre in ('journal_mode', 'synchronous', 'busy_timeout')
+            }
+    return estado
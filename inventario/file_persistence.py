@@ -2,61 +2,194 @@ import os
 import json
 import csv
 
+# Tamaño de bloque para la lectura incremental de JSON
+TAMANO_BLOQUE = 64 * 1024
+
+
+def ruta_datos(filename):
+    return os.path.join(os.path.dirname(__file__), "data", filename)
+
+
+def existe_archivo(filename):
+    return os.path.exists(ruta_datos(filename))
+
+
+# ==================== TXT ====================
+
+def lineas_txt(data, delimiter='|'):
+    """Genera una línea de texto por elemento; los valores None se escriben vacíos."""
+    for item in data:
+        # Assuming item is a dictionary and values are strings or can be converted to strings
+        yield delimiter.join('' if value is None else str(value) for value in item.values()) + "\n"
+
+
 def save_data_to_txt(data, filename, delimiter='|'):
-    filepath = os.path.join(os.path.dirname(__file__), "data", filename)
+    filepath = ruta_datos(filename)
     with open(filepath, "w", encoding="utf-8") as f:
-        for item in data:
-            # Assuming item is a dictionary and values are strings or can be converted to strings
-            line = delimiter.join(str(value) for value in item.values())
-            f.write(line + "\n")
+        f.writelines(lineas_txt(data, delimiter))
     return True, f"Datos guardados en {filename} exitosamente."
 
-def load_data_from_txt(filename, delimiter='|', keys=None):
-    filepath = os.path.join(os.path.dirname(__file__), "data", filename)
-    data = []
+
+def iter_data_from_txt(filename, delimiter='|', keys=None):
+    """Lee el archivo línea por línea sin cargarlo completo en memoria."""
+    filepath = ruta_datos(filename)
     if not os.path.exists(filepath):
-        return [], f"El archivo {filename} no existe."
-    
+        return
     with open(filepath, "r", encoding="utf-8") as f:
         for line in f:
+            if not line.strip():
+                continue
             values = line.strip().split(delimiter)
             if keys and len(values) == len(keys):
-                item = dict(zip(keys, values))
-                data.append(item)
+                yield dict(zip(keys, values))
             else:
                 # If keys are not provided or don't match, return as a list of values
-                data.append(values)
+                yield values
+
+
+def load_data_from_txt(filename, delimiter='|', keys=None):
+    if not existe_archivo(filename):
+        return [], f"El archivo {filename} no existe."
+    data = list(iter_data_from_txt(filename, delimiter, keys))
     return data, f"Datos cargados desde {filename} exitosamente."
 
+
+# ==================== JSON / NDJSON ====================
+
+def fragmentos_json(data, indent=4):
+    """Codifica un iterable como arreglo JSON, un elemento a la vez."""
+    primero = True
+    for item in data:
+        texto = json.dumps(item, indent=indent, ensure_ascii=False)
+        if indent:
+            texto = texto.replace("\n", "\n" + " " * indent)
+            yield ("[\n" if primero else ",\n") + " " * indent + texto
+        else:
+            yield ("[" if primero else ",") + texto
+        primero = False
+    yield "[]" if primero else ("\n]" if indent else "]")
+
+
+def lineas_ndjson(data):
+    """Un objeto JSON por línea (NDJSON)."""
+    for item in data:
+        yield json.dumps(item, ensure_ascii=False) + "\n"
+
+
 def save_data_to_json(data, filename):
-    filepath = os.path.join(os.path.dirname(__file__), "data", filename)
+    filepath = ruta_datos(filename)
     with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+        f.writelines(fragmentos_json(data))
     return True, f"Datos guardados en {filename} exitosamente."
 
-def load_data_from_json(filename):
-    filepath = os.path.join(os.path.dirname(__file__), "data", filename)
+
+def save_data_to_ndjson(data, filename):
+    filepath = ruta_datos(filename)
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.writelines(lineas_ndjson(data))
+    return True, f"Datos guardados en {filename} exitosamente."
+
+
+def iter_data_from_json(filename, tamano_bloque=TAMANO_BLOQUE):
+    """Lee un arreglo JSON elemento por elemento, sin cargar el archivo completo.
+
+    Si el documento no es un arreglo se decodifica completo y se entrega como
+    un único elemento.
+    """
+    filepath = ruta_datos(filename)
     if not os.path.exists(filepath):
-        return [], f"El archivo {filename} no existe."
+        return
+    decoder = json.JSONDecoder()
+    with open(filepath, "r", encoding="utf-8") as f:
+        buffer = f.read(tamano_bloque).lstrip()
+        if not buffer:
+            return
+        if not buffer.startswith('['):
+            yield json.loads(buffer + f.read())
+            return
+        pos = 1
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buffer):
+                bloque = f.read(tamano_bloque)
+                if not bloque:
+                    raise ValueError(f"El archivo {filename} termina antes de cerrar el arreglo JSON.")
+                buffer, pos = bloque, 0
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                item, fin = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                fin = None
+            if fin is None or fin == len(buffer):
+                # Elemento incompleto (o un número que podría continuar): leer más
+                bloque = f.read(tamano_bloque)
+                if bloque:
+                    buffer, pos = buffer[pos:] + bloque, 0
+                    continue
+                if fin is None:
+                    raise ValueError(f"JSON inválido en {filename}.")
+            yield item
+            pos = fin
+            if pos > tamano_bloque:
+                buffer, pos = buffer[pos:], 0
+
+
+def iter_data_from_ndjson(filename):
+    filepath = ruta_datos(filename)
+    if not os.path.exists(filepath):
+        return
     with open(filepath, "r", encoding="utf-8") as f:
-        data = json.load(f)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_data_from_json(filename):
+    if not existe_archivo(filename):
+        return [], f"El archivo {filename} no existe."
+    data = list(iter_data_from_json(filename))
     return data, f"Datos cargados desde {filename} exitosamente."
 
+
+# ==================== CSV ====================
+
+class _Eco:
+    """Objeto tipo archivo que devuelve lo escrito, para generar CSV por filas."""
+
+    def write(self, valor):
+        return valor
+
+
+def lineas_csv(data, fieldnames):
+    """Genera el encabezado y luego una línea CSV por elemento."""
+    writer = csv.DictWriter(_Eco(), fieldnames=fieldnames)
+    yield writer.writeheader()
+    for item in data:
+        yield writer.writerow(item)
+
+
 def save_data_to_csv(data, filename, fieldnames):
-    filepath = os.path.join(os.path.dirname(__file__), "data", filename)
+    filepath = ruta_datos(filename)
     with open(filepath, "w", encoding="utf-8", newline='') as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(data)
     return True, f"Datos guardados en {filename} exitosamente."
 
-def load_data_from_csv(filename):
-    filepath = os.path.join(os.path.dirname(__file__), "data", filename)
-    data = []
+
+def iter_data_from_csv(filename):
+    filepath = ruta_datos(filename)
     if not os.path.exists(filepath):
-        return [], f"El archivo {filename} no existe."
+        return
     with open(filepath, "r", encoding="utf-8", newline='') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            data.append(row)
+        yield from csv.DictReader(f)
+
+
+def load_data_from_csv(filename):
+    if not existe_archivo(filename):
+        return [], f"El archivo {filename} no existe."
+    data = list(iter_data_from_csv(filename))
     return data, f"Datos cargados desde {filename} exitosamente."
@@ -4,7 +4,63 @@ Implementa la clase Inventario con operaciones CRUD usando colecciones de Python
 """
 
 
-from .file_persistence import save_data_to_txt, load_data_from_txt, save_data_to_json, load_data_from_json, save_data_to_csv, load_data_from_csv
+import time
+from datetime import datetime
+from sqlalchemy import func, insert, update
+from forms.producto_form import validar_producto_form
+from models.resumen import ResumenCategoria
+from services.resumen_service import ResumenService
+from services.version_service import incrementar_al_confirmar
+from services.sincronizacion_service import registrar_cambios, registrar_cambios_desde
+from services.reposicion_service import ReposicionService, sincronizar_stock
+from .paginacion import paginar
+from .busqueda import obtener_motor
+from .cache import obtener_cache
+from .sesion import invalidar_usuario
+from itertools import chain, islice
+from .file_persistence import (save_data_to_txt, load_data_from_txt, save_data_to_json, load_data_from_json,
+                               save_data_to_csv, load_data_from_csv, save_data_to_ndjson, existe_archivo,
+                               iter_data_from_txt, iter_data_from_json, iter_data_from_csv, iter_data_from_ndjson)
+
+# Orden de las columnas en los archivos de datos, igual al de Producto.to_dict()
+CAMPOS_PRODUCTO = ["id", "nombre", "categoria", "descripcion", "precio", "stock", "fecha_creacion"]
+
+
+class ProductosPorCategoria:
+    """Acceso perezoso a los productos de cada categoría.
+
+    Solo consulta la base de datos cuando la plantilla pide una categoría,
+    y devuelve una página de productos en lugar de la categoría completa.
+    """
+
+    def __init__(self, inventario, conteo, por_pagina=20):
+        self.inventario = inventario
+        self.conteo = conteo
+        self.por_pagina = por_pagina
+        self._paginas = {}
+
+    def __getitem__(self, categoria):
+        if categoria not in self.conteo:
+            raise KeyError(categoria)
+        return self.pagina(categoria, 1)
+
+    def __contains__(self, categoria):
+        return categoria in self.conteo
+
+    def __iter__(self):
+        return iter(self.conteo)
+
+    def __len__(self):
+        return len(self.conteo)
+
+    def pagina(self, categoria, pagina=1):
+        clave = (categoria, pagina)
+        if clave not in self._paginas:
+            productos = self.inventario.obtener_productos_por_categoria(
+                categoria, pagina=pagina, por_pagina=self.por_pagina)
+            self._paginas[clave] = [p.to_dict() for p in productos]
+        return self._paginas[clave]
+
 
 class Inventario:
     def __init__(self, app, db, Producto, Cliente, **kwargs):
@@ -13,6 +69,7 @@ class Inventario:
         self.Producto = Producto
         self.Cliente = Cliente
         self.Usuario = kwargs.get('Usuario', None) # Se agrega Usuario opcionalmente para retrocompatibilidad
+        self.Factura = kwargs.get('Factura', None)
 
     
     # ==================== OPERACIONES CRUD DE PRODUCTOS ====================
@@ -22,11 +79,24 @@ class Inventario:
             nombre_producto = producto.nombre
             self.db.session.add(producto)
             self.db.session.commit()
+            obtener_cache().invalidar('productos')
         return True, f"Producto {nombre_producto} agregado exitosamente"
 
-    def obtener_todos_productos(self):
+    def _columnas_producto(self):
+        P = self.Producto
+        return {'id': P.id, 'nombre': P.nombre, 'categoria': P.categoria,
+                'precio': P.precio, 'stock': P.stock}
+
+    def obtener_todos_productos(self, pagina=None, por_pagina=20, orden='id', direccion='asc', categoria=None):
+        """Sin pagina retorna la lista completa; con pagina retorna un objeto Pagina."""
         with self.app.app_context():
-            return self.Producto.query.all()
+            query = self.Producto.query
+            if categoria:
+                query = query.filter_by(categoria=categoria)
+            if pagina is None:
+                return query.all()
+            return paginar(query, self._columnas_producto(), pagina, por_pagina,
+                           orden, direccion, modelo=self.Producto)
 
     def obtener_producto_por_id(self, producto_id):
         with self.app.app_context():
@@ -40,6 +110,7 @@ class Inventario:
             for key, value in kwargs.items():
                 setattr(producto, key, value)
             self.db.session.commit()
+            obtener_cache().invalidar('productos')
             return True, "Producto actualizado exitosamente"
 
     def eliminar_producto(self, producto_id):
@@ -49,20 +120,62 @@ class Inventario:
                 return False, "Producto no encontrado"
             self.db.session.delete(producto)
             self.db.session.commit()
+            obtener_cache().invalidar('productos')
             return True, "Producto eliminado exitosamente"
 
-    def buscar_productos_por_nombre(self, nombre):
+    def buscar_productos_por_nombre(self, nombre, pagina=None, por_pagina=20, orden='relevancia', direccion='asc'):
+        """Búsqueda indexada por nombre, descripción y categoría (ver inventario/busqueda.py)."""
         with self.app.app_context():
-            return self.Producto.query.filter(self.Producto.nombre.like(f'%{nombre}%')).all()
+            motor = obtener_motor(self.db, self.Producto)
+            return motor.buscar(nombre, pagina, por_pagina, orden, direccion,
+                                columnas=self._columnas_producto())
 
-    def obtener_productos_por_categoria(self, categoria):
+    def obtener_productos_por_categoria(self, categoria, pagina=None, por_pagina=20):
         with self.app.app_context():
-            return self.Producto.query.filter_by(categoria=categoria).all()
+            query = self.Producto.query.filter_by(categoria=categoria).order_by(self.Producto.id)
+            if pagina is not None:
+                query = query.limit(por_pagina).offset((max(pagina, 1) - 1) * por_pagina)
+            return query.all()
 
     def obtener_categorias(self):
         with self.app.app_context():
-            categorias = self.db.session.query(self.Producto.categoria).distinct().all()
-            return [c[0] for c in categorias]
+            def calcular():
+                categorias = self.db.session.query(self.Producto.categoria).distinct().all()
+                return [c[0] for c in categorias]
+            return obtener_cache().obtener_o_calcular('productos:categorias', calcular)
+
+    def obtener_estadisticas(self, por_pagina=20):
+        """Estadísticas del panel principal.
+
+        Los conteos y el valor (precio * stock) por categoría se leen de
+        resumen_categoria, que se mantiene de forma incremental; otra consulta
+        obtiene los totales de clientes y facturas. Los productos bajo su punto
+        de reorden se leen de reposicion_producto (services/reposicion_service.py).
+        Los productos de cada categoría se cargan de forma perezosa y paginada
+        a través de ProductosPorCategoria.
+        """
+        with self.app.app_context():
+            filas = self.db.session.query(
+                ResumenCategoria.categoria, ResumenCategoria.productos, ResumenCategoria.valor
+            ).order_by(ResumenCategoria.categoria).all()
+
+            totales = [self.db.session.query(func.count(self.Cliente.id)).scalar_subquery()]
+            if self.Factura is not None:
+                totales.append(self.db.session.query(func.count(self.Factura.id)).scalar_subquery())
+            fila_totales = self.db.session.query(*totales).one()
+            bajo_stock = ReposicionService.bajo_punto_reorden()
+
+        conteo_por_categoria = {categoria: cantidad for categoria, cantidad, _ in filas}
+        return {
+            'total_productos': sum(conteo_por_categoria.values()),
+            'total_clientes': fila_totales[0],
+            'total_facturas': fila_totales[1] if len(fila_totales) > 1 else 0,
+            'valor_total': float(sum(valor for _, _, valor in filas)),
+            'categorias': list(conteo_por_categoria),
+            'conteo_por_categoria': conteo_por_categoria,
+            'productos_por_categoria': ProductosPorCategoria(self, conteo_por_categoria, por_pagina),
+            'productos_bajo_stock': bajo_stock
+        }
 
     # ==================== OPERACIONES CRUD DE CLIENTES ====================
 
@@ -71,11 +184,17 @@ class Inventario:
             nombre_cliente = cliente.nombre
             self.db.session.add(cliente)
             self.db.session.commit()
+            obtener_cache().invalidar('clientes')
         return True, f"Cliente {nombre_cliente} agregado exitosamente"
 
-    def obtener_todos_clientes(self):
+    def obtener_todos_clientes(self, pagina=None, por_pagina=20, orden='id', direccion='asc'):
+        """Sin pagina retorna la lista completa; con pagina retorna un objeto Pagina."""
         with self.app.app_context():
-            return self.Cliente.query.all()
+            if pagina is None:
+                return self.Cliente.query.all()
+            C = self.Cliente
+            columnas = {'id': C.id, 'nombre': C.nombre, 'email': C.email, 'tipo': C.tipo}
+            return paginar(C.query, columnas, pagina, por_pagina, orden, direccion, modelo=C)
 
     def obtener_cliente_por_id(self, cliente_id):
         with self.app.app_context():
@@ -89,6 +208,7 @@ class Inventario:
             for key, value in kwargs.items():
                 setattr(cliente, key, value)
             self.db.session.commit()
+            obtener_cache().invalidar('clientes')
             return True, "Cliente actualizado exitosamente"
 
     def eliminar_cliente(self, cliente_id):
@@ -98,15 +218,24 @@ class Inventario:
                 return False, "Cliente no encontrado"
             self.db.session.delete(cliente)
             self.db.session.commit()
+            obtener_cache().invalidar('clientes')
             return True, "Cliente eliminado exitosamente"
 
+    def iterar_productos(self, tamano_lote=1000):
+        """Recorre todos los productos como diccionarios, cargándolos por lotes (yield_per).
+
+        La memoria usada depende del tamaño de lote y no del tamaño del catálogo.
+        """
+        with self.app.app_context():
+            query = self.Producto.query.order_by(self.Producto.id).yield_per(tamano_lote)
+            for producto in query:
+                yield producto.to_dict()
+
     def guardar_productos_txt(self, filename="datos.txt"):
-        productos_dicts = [p.to_dict() for p in self.obtener_todos_productos()]
-        return save_data_to_txt(productos_dicts, filename, delimiter='|')
+        return save_data_to_txt(self.iterar_productos(), filename, delimiter='|')
 
     def cargar_productos_txt(self, filename="datos.txt"):
-        keys = ["id", "codigo", "nombre", "categoria", "precio", "stock", "ubicacion", "descripcion"]
-        data, mensaje = load_data_from_txt(filename, delimiter='|', keys=keys)
+        data, mensaje = load_data_from_txt(filename, delimiter='|', keys=CAMPOS_PRODUCTO)
         productos = []
         for item_dict in data:
             try:
@@ -114,18 +243,18 @@ class Inventario:
                 item_dict['id'] = int(item_dict['id'])
                 item_dict['precio'] = float(item_dict['precio'])
                 item_dict['stock'] = int(item_dict['stock'])
-                productos.append(Producto.from_dict(item_dict))
+                productos.append(self.Producto.from_dict(item_dict))
             except ValueError as e:
                 print(f"Error al convertir datos de TXT: {e} en {item_dict}")
                 continue
         return productos, mensaje
 
     def guardar_productos_csv(self, filename="datos.csv"):
-        productos_dicts = [p.to_dict() for p in self.obtener_todos_productos()]
-        if not productos_dicts:
+        productos = self.iterar_productos()
+        primero = next(productos, None)
+        if primero is None:
             return False, "No hay productos para guardar en CSV."
-        fieldnames = list(productos_dicts[0].keys())
-        return save_data_to_csv(productos_dicts, filename, fieldnames)
+        return save_data_to_csv(chain([primero], productos), filename, list(primero.keys()))
 
     def cargar_productos_csv(self, filename="datos.csv"):
         data, mensaje = load_data_from_csv(filename)
@@ -136,27 +265,197 @@ class Inventario:
                 item_dict['id'] = int(item_dict['id']) if 'id' in item_dict and item_dict['id'] else None
                 item_dict['precio'] = float(item_dict['precio']) if 'precio' in item_dict and item_dict['precio'] else 0.0
                 item_dict['stock'] = int(item_dict['stock']) if 'stock' in item_dict and item_dict['stock'] else 0
-                productos.append(Producto.from_dict(item_dict))
+                productos.append(self.Producto.from_dict(item_dict))
             except ValueError as e:
                 print(f"Error al convertir datos de CSV: {e} en {item_dict}")
                 continue
         return productos, mensaje
 
     def guardar_productos_json(self, filename="datos.json"):
-        productos_dicts = [p.to_dict() for p in self.obtener_todos_productos()]
-        return save_data_to_json(productos_dicts, filename)
+        return save_data_to_json(self.iterar_productos(), filename)
+
+    def guardar_productos_ndjson(self, filename="datos.ndjson"):
+        return save_data_to_ndjson(self.iterar_productos(), filename)
 
     def cargar_productos_json(self, filename="datos.json"):
         data, mensaje = load_data_from_json(filename)
         productos = []
         for item_dict in data:
             try:
-                productos.append(Producto.from_dict(item_dict))
+                productos.append(self.Producto.from_dict(item_dict))
             except Exception as e:
                 print(f"Error al convertir datos de JSON: {e} en {item_dict}")
                 continue
         return productos, mensaje
 
+    # ==================== IMPORTACIÓN MASIVA DE PRODUCTOS ====================
+
+    def importar_productos(self, filas, tamano_lote=None, upsert=False):
+        """Importa productos desde un iterable de diccionarios en una sola transacción.
+
+        Cada fila se valida con validar_producto_form. Las filas válidas se
+        insertan por lotes con executemany; con upsert=True las filas cuyo id
+        ya existe se actualizan en lugar de rechazarse. Si ocurre un error de
+        base de datos se deshace toda la importación.
+
+        Retorna (exito, mensaje, reporte) donde reporte contiene insertados,
+        actualizados, rechazados (lista de (numero_fila, errores)), segundos y
+        filas_por_segundo.
+        """
+        if tamano_lote is None:
+            tamano_lote = self.app.config.get('IMPORTACION_TAMANO_LOTE', 1000)
+        reporte = {'insertados': 0, 'actualizados': 0, 'rechazados': [],
+                   'segundos': 0.0, 'filas_por_segundo': 0.0}
+        inicio = time.perf_counter()
+        total_filas = 0
+        ids_vistos = set()
+        ids_afectados = []
+        # Sin RETURNING (MySQL) los cambios se registran por actualizado_en; DATETIME guarda segundos
+        marca = datetime.utcnow().replace(microsecond=0)
+
+        with self.app.app_context():
+            try:
+                lote = []
+                for numero, fila in enumerate(filas, start=1):
+                    total_filas = numero
+                    datos, errores = self._validar_fila_importacion(fila, ids_vistos)
+                    if errores:
+                        reporte['rechazados'].append((numero, errores))
+                        continue
+                    lote.append((numero, datos))
+                    if len(lote) >= tamano_lote:
+                        ids_afectados = self._acumular_ids(
+                            ids_afectados, self._guardar_lote_importacion(lote, upsert, reporte))
+                        lote = []
+                if lote:
+                    ids_afectados = self._acumular_ids(
+                        ids_afectados, self._guardar_lote_importacion(lote, upsert, reporte))
+                if reporte['insertados'] or reporte['actualizados']:
+                    # executemany no dispara los eventos del ORM que mantienen el resumen
+                    ResumenService.reconstruir(commit=False)
+                    incrementar_al_confirmar(self.db.session, 'productos')
+                    if ids_afectados is None:
+                        registrar_cambios_desde(self.db.session.connection(), marca)
+                        sincronizar_stock(self.db.session.connection(), marca=marca)
+                    else:
+                        registrar_cambios(self.db.session.connection(), ids_afectados)
+                        sincronizar_stock(self.db.session.connection(), ids=ids_afectados)
+                self.db.session.commit()
+            except Exception as e:
+                self.db.session.rollback()
+                return False, f"Error al importar productos: {e}", reporte
+            obtener_motor(self.db, self.Producto).sincronizar(ids_afectados)
+            obtener_cache().invalidar('productos')
+
+        segundos = time.perf_counter() - inicio
+        reporte['segundos'] = round(segundos, 3)
+        reporte['filas_por_segundo'] = round(total_filas / segundos, 1) if segundos > 0 else 0.0
+        mensaje = (f"Importación completada: {reporte['insertados']} insertados, "
+                   f"{reporte['actualizados']} actualizados, {len(reporte['rechazados'])} rechazados "
+                   f"en {reporte['segundos']} s ({reporte['filas_por_segundo']} filas/s).")
+        return True, mensaje, reporte
+
+    @staticmethod
+    def _acumular_ids(ids, nuevos):
+        """None significa que hay filas con id desconocido."""
+        if ids is None or nuevos is None:
+            return None
+        return ids + nuevos
+
+    def _validar_fila_importacion(self, fila, ids_vistos):
+        """Retorna (datos, errores) para una fila de archivo."""
+        if not isinstance(fila, dict):
+            return None, ['La fila no tiene el número de columnas esperado.']
+        formulario = {k: '' if v is None else str(v) for k, v in fila.items()}
+        errores, datos = validar_producto_form(formulario)
+        id_texto = formulario.get('id', '').strip()
+        if id_texto:
+            try:
+                datos['id'] = int(id_texto)
+            except ValueError:
+                errores.append('El id debe ser un número entero.')
+            else:
+                if datos['id'] in ids_vistos:
+                    errores.append(f"El id {datos['id']} está repetido en el archivo.")
+                ids_vistos.add(datos['id'])
+        return datos, errores
+
+    def _guardar_lote_importacion(self, lote, upsert, reporte):
+        """Inserta/actualiza un lote dentro de la transacción en curso. Retorna los ids afectados."""
+        P = self.Producto
+        con_id = [datos['id'] for _, datos in lote if 'id' in datos]
+        existentes = set()
+        if con_id:
+            existentes = {r[0] for r in self.db.session.query(P.id).filter(P.id.in_(con_id))}
+
+        nuevos, cambios = [], []
+        for numero, datos in lote:
+            if datos.get('id') in existentes:
+                if upsert:
+                    cambios.append(datos)
+                else:
+                    reporte['rechazados'].append((numero, [f"Ya existe un producto con id {datos['id']}."]))
+            else:
+                nuevos.append(datos)
+
+        ids = []
+        if nuevos:
+            # MySQL no soporta RETURNING: ahí los ids generados no se conocen (ids = None).
+            con_returning = self.db.session.get_bind().dialect.insert_executemany_returning
+            # Las filas con y sin id se insertan por separado para que executemany use un solo formato.
+            for grupo in ([d for d in nuevos if 'id' in d], [d for d in nuevos if 'id' not in d]):
+                if not grupo:
+                    continue
+                if con_returning:
+                    ids += self.db.session.execute(insert(P).returning(P.id), grupo).scalars().all()
+                else:
+                    self.db.session.execute(insert(P), grupo)
+                    if 'id' in grupo[0]:
+                        ids += [d['id'] for d in grupo]
+                    else:
+                        ids = None
+            reporte['insertados'] += len(nuevos)
+        if cambios:
+            self.db.session.execute(update(P), cambios)
+            if ids is not None:
+                ids += [d['id'] for d in cambios]
+            reporte['actualizados'] += len(cambios)
+        return ids
+
+    def importar_productos_txt(self, filename="datos.txt", **kwargs):
+        if not existe_archivo(filename):
+            return False, f"El archivo {filename} no existe.", None
+        return self.importar_productos(iter_data_from_txt(filename, '|', CAMPOS_PRODUCTO), **kwargs)
+
+    def importar_productos_csv(self, filename="datos.csv", **kwargs):
+        if not existe_archivo(filename):
+            return False, f"El archivo {filename} no existe.", None
+        return self.importar_productos(iter_data_from_csv(filename), **kwargs)
+
+    def importar_productos_json(self, filename="datos.json", **kwargs):
+        if not existe_archivo(filename):
+            return False, f"El archivo {filename} no existe.", None
+        return self.importar_productos(iter_data_from_json(filename), **kwargs)
+
+    def importar_productos_ndjson(self, filename="datos.ndjson", **kwargs):
+        if not existe_archivo(filename):
+            return False, f"El archivo {filename} no existe.", None
+        return self.importar_productos(iter_data_from_ndjson(filename), **kwargs)
+
+    def vista_previa_archivo(self, formato, limite=100):
+        """Primeras filas del archivo de datos como diccionarios, leyendo solo lo necesario."""
+        lectores = {
+            'txt': lambda: iter_data_from_txt("datos.txt", '|', CAMPOS_PRODUCTO),
+            'csv': lambda: iter_data_from_csv("datos.csv"),
+            'json': lambda: iter_data_from_json("datos.json"),
+            'ndjson': lambda: iter_data_from_ndjson("datos.ndjson")
+        }
+        filename = f"datos.{formato}"
+        if not existe_archivo(filename):
+            return [], f"El archivo {filename} no existe."
+        filas = [f for f in islice(lectores[formato](), limite) if isinstance(f, dict)]
+        return filas, f"Datos cargados desde {filename} exitosamente."
+
     # ==================== OPERACIONES CRUD DE USUARIOS ====================
 
     def agregar_usuario(self, usuario):
@@ -164,13 +463,20 @@ class Inventario:
             nombre_usuario = usuario.nombre
             self.db.session.add(usuario)
             self.db.session.commit()
+            # Un id reutilizado (SQLite) no debe leer el None guardado de un usuario eliminado
+            invalidar_usuario(usuario.id_usuario)
         return True, f"Usuario {nombre_usuario} agregado exitosamente"
 
-    def obtener_todos_usuarios(self):
+    def obtener_todos_usuarios(self, pagina=None, por_pagina=20, orden='id_usuario', direccion='asc'):
+        """Sin pagina retorna la lista completa; con pagina retorna un objeto Pagina."""
         with self.app.app_context():
             if not self.Usuario:
                 return []
-            return self.Usuario.query.all()
+            if pagina is None:
+                return self.Usuario.query.all()
+            U = self.Usuario
+            columnas = {'id_usuario': U.id_usuario, 'nombre': U.nombre, 'email': U.email}
+            return paginar(U.query, columnas, pagina, por_pagina, orden, direccion, modelo=U)
 
     def buscar_usuario_por_email(self, email):
         with self.app.app_context():
@@ -190,6 +496,7 @@ class Inventario:
             for key, value in kwargs.items():
                 setattr(usuario, key, value)
             self.db.session.commit()
+            invalidar_usuario(id_usuario)
             return True, "Usuario actualizado exitosamente"
 
     def eliminar_usuario(self, id_usuario):
@@ -199,4 +506,5 @@ class Inventario:
                 return False, "Usuario no encontrado"
             self.db.session.delete(usuario)
             self.db.session.commit()
+            invalidar_usuario(id_usuario)
             return True, "Usuario eliminado exitosamente"
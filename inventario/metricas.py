@@ -0,0 +1,247 @@
+"""
+Instrumentación por petición: consultas SQL, tiempo de base de datos, de
+plantillas y total, agrupados por endpoint (productos.index, facturas.detalle, ...).
+
+registrar_instrumentacion(app) conecta:
+- before/after_cursor_execute del engine, para contar y cronometrar cada sentencia;
+- las señales request_started/request_finished y before_render_template/
+  template_rendered de Flask.
+
+Los acumulados se exponen en formato de texto de Prometheus en /metricas
+(ver exportar_prometheus) junto con las métricas del pool y de la caché.
+Son por proceso: con varios workers, cada uno informa lo suyo.
+
+Configuración (app.config):
+    INSTRUMENTACION_LENTO_MS   umbral del registro de peticiones lentas (None = desactivado)
+    INSTRUMENTACION_SQL_LENTO  sentencias más lentas incluidas en ese registro (3)
+    METRICAS_TOKEN             token para /metricas; sin token la ruta exige sesión iniciada
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from flask import has_request_context, request, request_started, request_finished
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+from inventario.database import db
+
+# Límites superiores (segundos) del histograma de duración de peticiones
+CUBETAS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# clave de estado_pool() -> (métrica, tipo)
+POOL = (('en_uso', 'inventario_pool_en_uso', 'gauge'),
+        ('disponibles', 'inventario_pool_disponibles', 'gauge'),
+        ('desborde', 'inventario_pool_desborde', 'gauge'),
+        ('tamano', 'inventario_pool_tamano', 'gauge'),
+        ('checkouts', 'inventario_pool_checkouts_total', 'counter'),
+        ('timeouts', 'inventario_pool_timeouts_total', 'counter'),
+        ('conexiones_creadas', 'inventario_pool_conexiones_creadas_total', 'counter'),
+        ('espera_total', 'inventario_pool_espera_segundos_total', 'counter'),
+        ('espera_maxima', 'inventario_pool_espera_maxima_segundos', 'gauge'))
+
+registro_lento = logging.getLogger('inventario.lento')
+
+
+class _Medicion:
+    """Lo que se acumula durante una petición.
+
+    Se guarda en el environ de la petición y no en flask.g: Inventario abre
+    su propio app context (con otro g) y sus consultas también deben contarse.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.tiempo_plantillas = 0.0
+        self.sentencias = []  # (segundos, sql)
+        self.inicio_plantilla = None
+
+
+class RegistroMetricas:
+    """Acumulados por endpoint, seguros entre hilos."""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.peticiones = defaultdict(int)         # (endpoint, método, estado) -> n
+        self.duracion = defaultdict(float)         # endpoint -> segundos
+        self.bd = defaultdict(float)               # endpoint -> segundos
+        self.plantillas = defaultdict(float)       # endpoint -> segundos
+        self.consultas = defaultdict(int)          # endpoint -> sentencias
+        self.cubetas = defaultdict(lambda: [0] * len(CUBETAS))
+        self.observaciones = defaultdict(int)      # endpoint -> peticiones medidas
+
+    def registrar(self, endpoint, metodo, estado, medicion, total):
+        with self._candado:
+            self.peticiones[(endpoint, metodo, estado)] += 1
+            self.observaciones[endpoint] += 1
+            self.duracion[endpoint] += total
+            self.bd[endpoint] += medicion.tiempo_bd
+            self.plantillas[endpoint] += medicion.tiempo_plantillas
+            self.consultas[endpoint] += medicion.consultas
+            cubetas = self.cubetas[endpoint]
+            for i, limite in enumerate(CUBETAS):
+                if total <= limite:
+                    cubetas[i] += 1
+
+    def instantanea(self):
+        with self._candado:
+            return {
+                'peticiones': dict(self.peticiones),
+                'duracion': dict(self.duracion),
+                'bd': dict(self.bd),
+                'plantillas': dict(self.plantillas),
+                'consultas': dict(self.consultas),
+                'cubetas': {e: list(c) for e, c in self.cubetas.items()},
+                'observaciones': dict(self.observaciones)
+            }
+
+    def resumen(self):
+        """Promedios por endpoint (ms y consultas por petición), útil para depurar."""
+        datos = self.instantanea()
+        resumen = {}
+        for endpoint, n in datos['observaciones'].items():
+            resumen[endpoint] = {
+                'peticiones': n,
+                'ms_promedio': round(datos['duracion'][endpoint] / n * 1000, 2),
+                'ms_bd_promedio': round(datos['bd'][endpoint] / n * 1000, 2),
+                'ms_plantillas_promedio': round(datos['plantillas'][endpoint] / n * 1000, 2),
+                'consultas_promedio': round(datos['consultas'][endpoint] / n, 2)
+            }
+        return resumen
+
+
+CLAVE = 'inventario.medicion'
+
+
+def _medicion_actual():
+    if not has_request_context():
+        return None
+    return request.environ.get(CLAVE)
+
+
+# ==================== ENGANCHES ====================
+
+def _antes_de_sql(conn, cursor, statement, parameters, context, executemany):
+    if _medicion_actual() is not None:
+        conn.info.setdefault('_inicio_sql', []).append(time.perf_counter())
+
+
+def _despues_de_sql(conn, cursor, statement, parameters, context, executemany):
+    medicion = _medicion_actual()
+    pila = conn.info.get('_inicio_sql')
+    if medicion is None or not pila:
+        return
+    duracion = time.perf_counter() - pila.pop()
+    medicion.consultas += 1
+    medicion.tiempo_bd += duracion
+    medicion.sentencias.append((duracion, statement))
+
+
+def _peticion_iniciada(sender, **extra):
+    request.environ[CLAVE] = _Medicion()
+
+
+def _antes_de_plantilla(sender, template, context, **extra):
+    medicion = _medicion_actual()
+    if medicion is not None:
+        medicion.inicio_plantilla = time.perf_counter()
+
+
+def _plantilla_renderizada(sender, template, context, **extra):
+    medicion = _medicion_actual()
+    if medicion is not None and medicion.inicio_plantilla is not None:
+        medicion.tiempo_plantillas += time.perf_counter() - medicion.inicio_plantilla
+        medicion.inicio_plantilla = None
+
+
+def _peticion_terminada(sender, response, **extra):
+    medicion = request.environ.pop(CLAVE, None)
+    if medicion is None:
+        return
+    total = time.perf_counter() - medicion.inicio
+    endpoint = request.endpoint or '<sin_ruta>'
+    sender.extensions['metricas'].registrar(endpoint, request.method, response.status_code,
+                                            medicion, total)
+    umbral = sender.config.get('INSTRUMENTACION_LENTO_MS')
+    if umbral is not None and total * 1000 >= umbral:
+        lentas = sorted(medicion.sentencias, key=lambda s: s[0], reverse=True)
+        lentas = lentas[:sender.config.get('INSTRUMENTACION_SQL_LENTO', 3)]
+        detalle = ''.join(f'\n  {segundos * 1000:.1f} ms: {" ".join(sql.split())}'
+                          for segundos, sql in lentas)
+        registro_lento.warning('Petición lenta %s %s (%s): %.1f ms total, %.1f ms en %d consultas, '
+                               '%.1f ms en plantillas%s', request.method, request.full_path.rstrip('?'),
+                               endpoint, total * 1000, medicion.tiempo_bd * 1000, medicion.consultas,
+                               medicion.tiempo_plantillas * 1000, detalle)
+
+
+def registrar_instrumentacion(app):
+    """Activa la instrumentación para la app y el engine de db."""
+    with app.app_context():
+        engine = db.engine
+    app.extensions['metricas'] = RegistroMetricas()
+    if not event.contains(engine, 'before_cursor_execute', _antes_de_sql):
+        event.listen(engine, 'before_cursor_execute', _antes_de_sql)
+        event.listen(engine, 'after_cursor_execute', _despues_de_sql)
+    request_started.connect(_peticion_iniciada, app)
+    request_finished.connect(_peticion_terminada, app)
+    before_render_template.connect(_antes_de_plantilla, app)
+    template_rendered.connect(_plantilla_renderizada, app)
+
+
+# ==================== EXPOSICIÓN ====================
+
+def _etiquetas(**valores):
+    def escapar(valor):
+        return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escapar(v)}"' for k, v in valores.items()) + '}'
+
+
+def _familia(lineas, nombre, tipo, ayuda):
+    lineas.append(f'# HELP {nombre} {ayuda}')
+    lineas.append(f'# TYPE {nombre} {tipo}')
+
+
+def exportar_prometheus(app, estado_pool=None, metricas_cache=None):
+    """Texto en formato de exposición de Prometheus (versión 0.0.4)."""
+    datos = app.extensions['metricas'].instantanea()
+    lineas = []
+
+    _familia(lineas, 'inventario_peticiones_total', 'counter', 'Peticiones atendidas.')
+    for (endpoint, metodo, estado), n in sorted(datos['peticiones'].items()):
+        lineas.append(f'inventario_peticiones_total{_etiquetas(endpoint=endpoint, metodo=metodo, estado=estado)} {n}')
+
+    _familia(lineas, 'inventario_peticion_segundos', 'histogram', 'Duración total de la petición.')
+    for endpoint in sorted(datos['observaciones']):
+        for limite, n in zip(CUBETAS, datos['cubetas'][endpoint]):
+            lineas.append(f'inventario_peticion_segundos_bucket{_etiquetas(endpoint=endpoint, le=limite)} {n}')
+        total = datos['observaciones'][endpoint]
+        lineas.append(f'inventario_peticion_segundos_bucket{_etiquetas(endpoint=endpoint, le="+Inf")} {total}')
+        lineas.append(f'inventario_peticion_segundos_sum{_etiquetas(endpoint=endpoint)} {datos["duracion"][endpoint]:.6f}')
+        lineas.append(f'inventario_peticion_segundos_count{_etiquetas(endpoint=endpoint)} {total}')
+
+    for clave, nombre, ayuda in (('bd', 'inventario_peticion_bd_segundos_total', 'Tiempo en la base de datos.'),
+                                 ('plantillas', 'inventario_peticion_plantillas_segundos_total',
+                                  'Tiempo renderizando plantillas.'),
+                                 ('consultas', 'inventario_peticion_consultas_total', 'Sentencias SQL ejecutadas.')):
+        _familia(lineas, nombre, 'counter', ayuda)
+        for endpoint, valor in sorted(datos[clave].items()):
+            lineas.append(f'{nombre}{_etiquetas(endpoint=endpoint)} {valor:.6f}'
+                          if isinstance(valor, float) else f'{nombre}{_etiquetas(endpoint=endpoint)} {valor}')
+
+    if estado_pool:
+        for clave, nombre, tipo in POOL:
+            if clave in estado_pool:
+                _familia(lineas, nombre, tipo, f'Pool de conexiones: {clave}.')
+                lineas.append(f'{nombre} {estado_pool[clave]}')
+
+    if metricas_cache:
+        for clave in ('aciertos', 'fallos', 'invalidaciones'):
+            nombre = f'inventario_cache_{clave}_total'
+            _familia(lineas, nombre, 'counter', f'Caché de datos de referencia: {clave}.')
+            lineas.append(f'{nombre}{_etiquetas(tipo=metricas_cache["tipo"])} {metricas_cache[clave]}')
+        _familia(lineas, 'inventario_cache_entradas', 'gauge', 'Entradas en la caché.')
+        lineas.append(f'inventario_cache_entradas{_etiquetas(tipo=metricas_cache["tipo"])} {metricas_cache["entradas"]}')
+
+    return '\n'.join(lineas) + '\n'
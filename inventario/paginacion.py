@@ -0,0 +1,187 @@
+"""
+Paginación del lado del servidor para los listados.
+
+Ofrece dos estrategias:
+- paginar: LIMIT/OFFSET con columnas ordenables, adecuada para tablas pequeñas.
+- paginar_keyset: cursor sobre (columna, id), para tablas grandes donde el
+  OFFSET obligaría a recorrer todas las filas anteriores.
+"""
+
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import or_, and_, text
+
+POR_PAGINA_DEFECTO = 20
+POR_PAGINA_MAXIMO = 100
+
+
+class Pagina:
+    """Una página de resultados con la información necesaria para navegar."""
+
+    def __init__(self, items, pagina=1, por_pagina=POR_PAGINA_DEFECTO, total=None,
+                 total_estimado=False, orden=None, direccion='asc',
+                 cursor_siguiente=None, cursor_actual=None, keyset=False):
+        self.items = items
+        self.pagina = pagina
+        self.por_pagina = por_pagina
+        self.total = total
+        self.total_estimado = total_estimado
+        self.orden = orden
+        self.direccion = direccion
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_actual = cursor_actual
+        self.keyset = keyset
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def total_paginas(self):
+        if not self.total:
+            return 1
+        return max(1, -(-self.total // self.por_pagina))
+
+    @property
+    def tiene_anterior(self):
+        if self.keyset:
+            return self.cursor_actual is not None
+        return self.pagina > 1
+
+    @property
+    def tiene_siguiente(self):
+        if self.keyset:
+            return self.cursor_siguiente is not None
+        return self.pagina < self.total_paginas
+
+    def map(self, funcion):
+        """Devuelve una copia de la página aplicando funcion a cada elemento (p. ej. to_dict)."""
+        return Pagina([funcion(i) for i in self.items], self.pagina, self.por_pagina, self.total,
+                      self.total_estimado, self.orden, self.direccion,
+                      self.cursor_siguiente, self.cursor_actual, self.keyset)
+
+
+def parametros_paginacion(args, orden_defecto='id', direccion_defecto='asc'):
+    """Extrae pagina, por_pagina, orden, direccion y cursor de request.args."""
+    try:
+        pagina = max(1, int(args.get('pagina', 1)))
+    except (ValueError, TypeError):
+        pagina = 1
+    try:
+        por_pagina = int(args.get('por_pagina', POR_PAGINA_DEFECTO))
+    except (ValueError, TypeError):
+        por_pagina = POR_PAGINA_DEFECTO
+    por_pagina = min(max(1, por_pagina), POR_PAGINA_MAXIMO)
+    direccion = args.get('dir', direccion_defecto)
+    if direccion not in ('asc', 'desc'):
+        direccion = direccion_defecto
+    return {
+        'pagina': pagina,
+        'por_pagina': por_pagina,
+        'orden': args.get('orden', orden_defecto) or orden_defecto,
+        'direccion': direccion,
+        'cursor': args.get('cursor') or None
+    }
+
+
+def contar_total(query, modelo=None, estimado=False):
+    """Cuenta las filas de la consulta.
+
+    Con estimado=True y sin filtros en MySQL se lee TABLE_ROWS de
+    information_schema, que no recorre la tabla. En otro caso se hace un
+    COUNT(*) sin ORDER BY. Retorna (total, es_estimado).
+    """
+    sesion = query.session
+    if estimado and modelo is not None and query.whereclause is None:
+        bind = sesion.get_bind()
+        if bind.dialect.name == 'mysql':
+            total = sesion.execute(
+                text("SELECT TABLE_ROWS FROM information_schema.TABLES "
+                     "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla"),
+                {'tabla': modelo.__tablename__}
+            ).scalar()
+            if total is not None:
+                return int(total), True
+    return query.order_by(None).count(), False
+
+
+def _columna_orden(columnas, orden, defecto):
+    if orden in columnas:
+        return orden, columnas[orden]
+    return defecto, columnas[defecto]
+
+
+def paginar(query, columnas, pagina=1, por_pagina=POR_PAGINA_DEFECTO, orden='id',
+            direccion='asc', modelo=None, contar=True, estimado=False):
+    """Paginación LIMIT/OFFSET. columnas es el diccionario de columnas ordenables permitidas."""
+    defecto = next(iter(columnas))
+    orden, columna = _columna_orden(columnas, orden, defecto)
+    total, total_estimado = (None, False)
+    if contar:
+        total, total_estimado = contar_total(query, modelo, estimado)
+
+    criterio = columna.desc() if direccion == 'desc' else columna.asc()
+    desempate = columnas[defecto]
+    orden_sql = [criterio] if columna is desempate else [criterio, desempate.asc()]
+    items = (query.order_by(*orden_sql)
+             .limit(por_pagina)
+             .offset((pagina - 1) * por_pagina)
+             .all())
+    return Pagina(items, pagina, por_pagina, total, total_estimado, orden, direccion)
+
+
+def codificar_cursor(valor, id_):
+    if isinstance(valor, datetime):
+        valor = {'dt': valor.isoformat()}
+    crudo = json.dumps([valor, id_]).encode('utf-8')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Retorna (valor, id) o None si el cursor no es válido."""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valor, id_ = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        return None
+    if isinstance(valor, dict) and 'dt' in valor:
+        valor = datetime.fromisoformat(valor['dt'])
+    return valor, int(id_)
+
+
+def paginar_keyset(query, columna, columna_id, cursor=None, por_pagina=POR_PAGINA_DEFECTO,
+                   direccion='desc', modelo=None, contar=True, estimado=True):
+    """Paginación por cursor sobre (columna, id).
+
+    Cada página continúa después de la última fila de la anterior, de modo que
+    el costo no depende de cuántas páginas se hayan recorrido.
+    """
+    posicion = decodificar_cursor(cursor) if cursor else None
+    base = query
+    if posicion is not None:
+        valor, ultimo_id = posicion
+        if direccion == 'desc':
+            query = query.filter(or_(columna < valor, and_(columna == valor, columna_id < ultimo_id)))
+        else:
+            query = query.filter(or_(columna > valor, and_(columna == valor, columna_id > ultimo_id)))
+
+    if direccion == 'desc':
+        query = query.order_by(columna.desc(), columna_id.desc())
+    else:
+        query = query.order_by(columna.asc(), columna_id.asc())
+
+    filas = query.limit(por_pagina + 1).all()
+    cursor_siguiente = None
+    if len(filas) > por_pagina:
+        filas = filas[:por_pagina]
+        ultimo = filas[-1]
+        cursor_siguiente = codificar_cursor(getattr(ultimo, columna.key), getattr(ultimo, columna_id.key))
+
+    total, total_estimado = (None, False)
+    if contar:
+        total, total_estimado = contar_total(base, modelo, estimado)
+    return Pagina(filas, 1, por_pagina, total, total_estimado, columna.key, direccion,
+                  cursor_siguiente=cursor_siguiente, cursor_actual=cursor, keyset=True)
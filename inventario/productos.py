@@ -9,6 +9,11 @@ class Producto(db.Model):
     precio = db.Column(db.Float, nullable=False)
     stock = db.Column(db.Integer, nullable=False)
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    # También se actualiza en los UPDATE de Core (descuento de stock, importación)
+    actualizado_en = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # (categoria, id): filtrar por categoría ya ordenado por id (migración 001)
+    __table_args__ = (db.Index('ix_producto_categoria', 'categoria', 'id'),)
 
     def __init__(self, nombre, categoria, descripcion, precio, stock, id=None):
         if id is not None:
@@ -0,0 +1,48 @@
+"""
+Lecturas por lotes para la API JSON: varios registros por id en una sola
+consulta, con selección de campos (solo se leen las columnas pedidas).
+"""
+
+from datetime import datetime
+
+
+class CampoInvalidoError(ValueError):
+    """Se pidió un campo que el recurso no expone."""
+
+
+def elegir_campos(texto, columnas):
+    """Lista de campos a partir de 'id,nombre,...'; todos si texto está vacío.
+
+    El id se incluye siempre para que el cliente pueda asociar cada fila.
+    """
+    if not texto:
+        return list(columnas)
+    campos = [c.strip() for c in texto.split(',') if c.strip()]
+    desconocidos = [c for c in campos if c not in columnas]
+    if desconocidos:
+        raise CampoInvalidoError(f"Campos desconocidos: {', '.join(desconocidos)}. "
+                                 f"Disponibles: {', '.join(columnas)}.")
+    return ['id'] + [c for c in campos if c != 'id']
+
+
+def _valor(valor):
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+
+def filas_por_ids(sesion, columnas, ids, campos=None):
+    """Dicts con los campos pedidos de las filas cuyo id está en ids, ordenados por id.
+
+    columnas: {nombre: columna} del recurso; debe incluir 'id'.
+    """
+    campos = campos or list(columnas)
+    if not ids:
+        return []
+    filas = (sesion.query(*(columnas[c] for c in campos))
+             .filter(columnas['id'].in_(set(ids)))
+             .order_by(columnas['id']))
+    return [{c: _valor(v) for c, v in zip(campos, fila)} for fila in filas]
+
+
+def recortar(registro, campos):
+    """Deja en un dict (p. ej. de to_dict) solo los campos pedidos."""
+    return {c: registro[c] for c in campos if c in registro}
@@ -0,0 +1,123 @@
+"""
+Usuario de la sesión (Flask-Login) sin una consulta a la base en cada petición.
+
+Flask-Login llama al user_loader en toda petición autenticada. Según
+SESION_MODO el usuario se obtiene de:
+
+- 'cache' (por defecto): una LRU en memoria con TTL, por id de usuario. Las
+  altas, cambios y bajas hechas con Inventario invalidan la entrada; en otros
+  workers la entrada vieja dura a lo sumo SESION_TTL segundos.
+- 'firmada': la cookie de sesión (firmada con la secret_key) lleva el id,
+  nombre y email del usuario y hasta cuándo valen. Al vencer se vuelven a
+  leer de la base, así que una baja o un cambio hecho por otro usuario se
+  aplica como máximo SESION_TTL segundos después. No usa memoria del worker.
+- 'consulta': el comportamiento anterior, una consulta por petición.
+
+En los modos 'cache' y 'firmada', current_user es un UsuarioSesion con los
+campos mínimos (sin password), no una entidad del ORM.
+
+Configuración (app.config, o la variable de entorno SESION_MODO):
+    SESION_MODO       'cache', 'firmada' o 'consulta'
+    SESION_TTL        segundos que se usan los datos sin volver a leerlos (60)
+    SESION_CAPACIDAD  usuarios máximos en la LRU (1024)
+"""
+
+import time
+from flask import current_app, has_request_context, session
+from flask_login import UserMixin
+from .cache import CacheMemoria
+from .database import db
+from .usuarios import Usuario
+
+MODOS = ('cache', 'firmada', 'consulta')
+TTL_DEFECTO = 60
+CAPACIDAD_DEFECTO = 1024
+CLAVE_SESION = 'usuario'
+CAMPOS = ('id_usuario', 'nombre', 'email')
+
+
+class UsuarioSesion(UserMixin):
+    """Datos mínimos del usuario autenticado."""
+
+    def __init__(self, id_usuario, nombre, email):
+        self.id_usuario = id_usuario
+        self.nombre = nombre
+        self.email = email
+
+    def get_id(self):
+        return str(self.id_usuario)
+
+    def to_dict(self):
+        return {campo: getattr(self, campo) for campo in CAMPOS}
+
+    def __repr__(self):
+        return f"<UsuarioSesion {self.nombre}>"
+
+
+_caches = {}
+
+
+def cache_sesiones(app=None):
+    """LRU de usuarios de la aplicación (una por app)."""
+    app = app or current_app._get_current_object()
+    if id(app) not in _caches:
+        _caches[id(app)] = CacheMemoria(app.config.get('SESION_TTL', TTL_DEFECTO),
+                                        app.config.get('SESION_CAPACIDAD', CAPACIDAD_DEFECTO))
+    return _caches[id(app)]
+
+
+def _leer(id_usuario):
+    """Campos mínimos del usuario como dict, o None si no existe."""
+    fila = (db.session.query(Usuario.id_usuario, Usuario.nombre, Usuario.email)
+            .filter(Usuario.id_usuario == id_usuario).first())
+    return dict(fila._mapping) if fila else None
+
+
+def _clave(id_usuario):
+    # Los dos puntos finales evitan que invalidar 'usuarios:1' borre 'usuarios:10'
+    return f'usuarios:{id_usuario}:'
+
+
+def _desde_sesion_firmada(id_usuario, ttl):
+    datos = session.get(CLAVE_SESION)
+    if datos and datos.get('id_usuario') == id_usuario and datos.get('vence', 0) > time.time():
+        return {campo: datos[campo] for campo in CAMPOS}
+    datos = _leer(id_usuario)
+    if datos is None:
+        session.pop(CLAVE_SESION, None)
+        return None
+    session[CLAVE_SESION] = {**datos, 'vence': time.time() + ttl}
+    return datos
+
+
+def cargar_usuario(user_id):
+    """user_loader de Flask-Login según SESION_MODO (ver docstring del módulo)."""
+    try:
+        id_usuario = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    config = current_app.config
+    modo = config.get('SESION_MODO', 'cache')
+    if modo == 'consulta':
+        return db.session.get(Usuario, id_usuario)
+    if modo == 'firmada':
+        datos = _desde_sesion_firmada(id_usuario, config.get('SESION_TTL', TTL_DEFECTO))
+    else:
+        # Un id inexistente también se guarda (None): una cookie vieja no consulta en cada petición
+        datos = cache_sesiones().obtener_o_calcular(_clave(id_usuario), lambda: _leer(id_usuario))
+    return UsuarioSesion(**datos) if datos else None
+
+
+def invalidar_usuario(id_usuario=None):
+    """Descarta los datos guardados del usuario (de todos sin id) tras un cambio o una baja."""
+    cache_sesiones().invalidar(_clave(id_usuario) if id_usuario is not None else 'usuarios:')
+    # La sesión firmada de la petición en curso se refresca en la próxima; las demás al vencer
+    if has_request_context():
+        datos = session.get(CLAVE_SESION)
+        if datos and (id_usuario is None or datos.get('id_usuario') == id_usuario):
+            session.pop(CLAVE_SESION, None)
+
+
+def olvidar_sesion():
+    """Quita de la cookie los datos del usuario (al cerrar sesión)."""
+    session.pop(CLAVE_SESION, None)
@@ -4,3 +4,10 @@ from inventario.productos import Producto
 from inventario.clientes import Cliente
 from inventario.usuarios import Usuario
 from .factura import Factura, FacturaDetalle
+from .resumen import ResumenCategoria
+from .version import VersionDatos
+from .cambio import CambioProducto
+from .ingesta import FacturaIngestada
+from .acumulado import (VentaDiaria, VentaDiariaProducto, VentaDiariaCategoria, StockDiario,
+                        AcumuladoEstado, AcumuladoPendiente)
+from .reposicion import ReposicionProducto
@@ -0,0 +1,85 @@
+from inventario.database import db
+
+
+class VentaDiaria(db.Model):
+    """Totales de venta de un día (facturas no anuladas).
+
+    Las tablas de acumulados no tienen claves foráneas: la historia se
+    conserva aunque se eliminen productos. Ver services/acumulado_service.py.
+    """
+    __tablename__ = 'ventas_diarias'
+
+    dia = db.Column(db.Date, primary_key=True)
+    facturas = db.Column(db.Integer, nullable=False, default=0)
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+    ingresos = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<VentaDiaria {self.dia}>"
+
+
+class VentaDiariaProducto(db.Model):
+    __tablename__ = 'ventas_diarias_producto'
+
+    dia = db.Column(db.Date, primary_key=True)
+    producto_id = db.Column(db.Integer, primary_key=True)
+    facturas = db.Column(db.Integer, nullable=False, default=0)
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+    ingresos = db.Column(db.Float, nullable=False, default=0.0)
+
+    # Historia de un producto
+    __table_args__ = (db.Index('ix_ventas_diarias_producto_producto_dia', 'producto_id', 'dia'),)
+
+    def __repr__(self):
+        return f"<VentaDiariaProducto {self.dia} producto={self.producto_id}>"
+
+
+class VentaDiariaCategoria(db.Model):
+    """Ventas del día por la categoría que tenía el producto al acumular el día."""
+    __tablename__ = 'ventas_diarias_categoria'
+
+    dia = db.Column(db.Date, primary_key=True)
+    categoria = db.Column(db.String(50), primary_key=True)
+    facturas = db.Column(db.Integer, nullable=False, default=0)
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+    ingresos = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<VentaDiariaCategoria {self.dia} {self.categoria}>"
+
+
+class StockDiario(db.Model):
+    """Stock de un producto al cierre de dia; solo se guarda cuando cambió desde la foto anterior."""
+    __tablename__ = 'stock_diario'
+
+    producto_id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, primary_key=True)
+    stock = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<StockDiario producto={self.producto_id} {self.dia}={self.stock}>"
+
+
+class AcumuladoEstado(db.Model):
+    """Hasta dónde llegó cada proceso de acumulados ('ventas', 'stock')."""
+    __tablename__ = 'acumulado_estado'
+
+    proceso = db.Column(db.String(20), primary_key=True)
+    ultimo_dia = db.Column(db.Date, nullable=False)
+    ejecutado_en = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<AcumuladoEstado {self.proceso} {self.ultimo_dia}>"
+
+
+class AcumuladoPendiente(db.Model):
+    """Día ya acumulado cuyas facturas cambiaron después; se vuelve a acumular en la próxima ejecución."""
+    __tablename__ = 'acumulado_pendientes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False)
+
+    __table_args__ = (db.Index('ix_acumulado_pendientes_dia', 'dia'),)
+
+    def __repr__(self):
+        return f"<AcumuladoPendiente {self.dia}>"
@@ -0,0 +1,22 @@
+from inventario.database import db
+
+
+class CambioProducto(db.Model):
+    """Registro de cambios del catálogo de productos para la sincronización por deltas.
+
+    secuencia crece con cada cambio (alta, modificación o baja); un terminal
+    guarda la última que recibió y pide solo las posteriores. Las bajas
+    quedan como lápidas (operacion='eliminado'). Ver services/sincronizacion_service.py.
+    """
+    __tablename__ = 'cambios_producto'
+
+    secuencia = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, nullable=False)
+    operacion = db.Column(db.String(10), nullable=False, default='upsert')  # upsert, eliminado
+    fecha = db.Column(db.DateTime, nullable=False)
+
+    # Agrupar por producto y quedarse con su último cambio (feed y compactación)
+    __table_args__ = (db.Index('ix_cambios_producto_producto_secuencia', 'producto_id', 'secuencia'),)
+
+    def __repr__(self):
+        return f"<CambioProducto {self.secuencia} producto={self.producto_id} {self.operacion}>"
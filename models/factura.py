@@ -11,6 +11,12 @@ class Factura(db.Model):
     estado = db.Column(db.String(20), default='Pendiente')  # Pendiente, Pagada, Anulada
     total = db.Column(db.Float, default=0.0)
 
+    # (fecha, id) sirve al orden y al cursor de paginar_keyset (migración 001);
+    # ix_facturas_fecha_venta cubre los análisis de ventas por rango (migración 003)
+    __table_args__ = (db.Index('ix_facturas_cliente_id', 'cliente_id'),
+                      db.Index('ix_facturas_fecha_id', 'fecha', 'id'),
+                      db.Index('ix_facturas_fecha_venta', 'fecha', 'estado', 'total', 'cliente_id'))
+
     cliente = db.relationship('Cliente', backref=db.backref('facturas', lazy=True))
     detalles = db.relationship('FacturaDetalle', backref='factura', lazy=True, cascade='all, delete-orphan')
 
@@ -18,6 +24,18 @@ class Factura(db.Model):
         self.total = sum(d.subtotal for d in self.detalles)
         return self.total
 
+    @staticmethod
+    def resumen_desde_fila(fila):
+        """Resumen de listado a partir de una fila de columnas (sin cargar la entidad ni sus detalles)."""
+        return {
+            'id': fila.id,
+            'cliente_id': fila.cliente_id,
+            'cliente_nombre': fila.cliente_nombre or '',
+            'fecha': fila.fecha.strftime('%Y-%m-%d %H:%M') if fila.fecha else '',
+            'estado': fila.estado,
+            'total': fila.total
+        }
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -43,6 +61,11 @@ class FacturaDetalle(db.Model):
     precio_unitario = db.Column(db.Float, nullable=False)
     subtotal = db.Column(db.Float, nullable=False)
 
+    __table_args__ = (db.Index('ix_factura_detalles_factura_id', 'factura_id'),
+                      db.Index('ix_factura_detalles_producto_id', 'producto_id'),
+                      db.Index('ix_factura_detalles_factura_venta',
+                               'factura_id', 'producto_id', 'cantidad', 'subtotal'))
+
     producto = db.relationship('Producto', backref=db.backref('detalles_factura', lazy=True))
 
     def to_dict(self):
@@ -0,0 +1,18 @@
+from inventario.database import db
+
+
+class FacturaIngestada(db.Model):
+    """Resultado de cada factura de la cola de ingesta, guardado en la misma transacción que la factura.
+
+    Hace que procesar la cola sea idempotente: si el proceso se detiene entre
+    el commit de la base y la marca en la cola, al reintentar la factura no se
+    registra dos veces. Ver services/ingesta_service.py.
+    """
+    __tablename__ = 'facturas_ingestadas'
+
+    pendiente_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    factura_id = db.Column(db.Integer)  # None si se rechazó
+    error = db.Column(db.String(300))
+
+    def __repr__(self):
+        return f"<FacturaIngestada {self.pendiente_id} -> {self.factura_id}>"
@@ -0,0 +1,25 @@
+from inventario.database import db
+
+
+class ReposicionProducto(db.Model):
+    """Consumo diario, punto de reorden y stock de cada producto, mantenidos de forma incremental.
+
+    margen = stock - punto_reorden; los productos a reponer son los de margen
+    negativo y se leen del índice sobre margen sin recorrer el catálogo.
+    Ver services/reposicion_service.py.
+    """
+    __tablename__ = 'reposicion_producto'
+
+    producto_id = db.Column(db.Integer, primary_key=True)
+    stock = db.Column(db.Integer, nullable=False, default=0)
+    unidades_periodo = db.Column(db.Integer, nullable=False, default=0)
+    dias_periodo = db.Column(db.Integer, nullable=False)
+    consumo_diario = db.Column(db.Float, nullable=False, default=0.0)
+    punto_reorden = db.Column(db.Float, nullable=False, default=0.0)
+    margen = db.Column(db.Float, nullable=False, default=0.0)
+    recalculado_en = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (db.Index('ix_reposicion_producto_margen', 'margen'),)
+
+    def __repr__(self):
+        return f"<ReposicionProducto {self.producto_id} margen={self.margen}>"
@@ -0,0 +1,25 @@
+from inventario.database import db
+
+
+class ResumenCategoria(db.Model):
+    """Totales del inventario por categoría, mantenidos de forma incremental.
+
+    Ver services/resumen_service.py para el mantenimiento y la reconstrucción.
+    """
+    __tablename__ = 'resumen_categoria'
+
+    categoria = db.Column(db.String(50), primary_key=True)
+    productos = db.Column(db.Integer, nullable=False, default=0)
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+    valor = db.Column(db.Float, nullable=False, default=0.0)
+
+    def to_dict(self):
+        return {
+            'categoria': self.categoria,
+            'productos': self.productos,
+            'unidades': self.unidades,
+            'valor': self.valor
+        }
+
+    def __repr__(self):
+        return f"<ResumenCategoria {self.categoria}>"
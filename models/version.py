@@ -0,0 +1,16 @@
+from inventario.database import db
+
+
+class VersionDatos(db.Model):
+    """Contador que aumenta cada vez que cambian los datos de una entidad.
+
+    Sirve como huella barata para saber si un resultado derivado (p. ej. un
+    reporte PDF) sigue vigente. Ver services/version_service.py.
+    """
+    __tablename__ = 'version_datos'
+
+    entidad = db.Column(db.String(30), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<VersionDatos {self.entidad}={self.version}>"
@@ -0,0 +1,295 @@
+"""
+API JSON versionada (/api/v1) para los terminales de caja.
+
+- Lecturas por lotes: GET /api/v1/productos?ids=1,2,3 (también clientes y facturas).
+- Stock por lotes: GET /api/v1/productos/stock?ids=1,2,3
+- Selección de campos: ?campos=nombre,stock (el id siempre se incluye).
+- GET condicional: cada respuesta lleva un ETag armado con la versión de datos
+  de las entidades que muestra (services/version_service.py); con
+  If-None-Match igual se responde 304 sin leer las filas.
+- Facturas por lotes: POST /api/v1/facturas/lote con {"facturas": [...]}.
+- Sincronización por deltas: GET /api/v1/productos/cambios?desde=<cursor>
+  (services/sincronizacion_service.py).
+- Análisis de ventas: GET /api/v1/analitica/ventas?desde=&hasta=
+  (services/analitica_service.py).
+- Stock histórico: GET /api/v1/productos/<id>/stock/historial?desde=&hasta=
+  (services/acumulado_service.py).
+
+Requiere sesión iniciada (POST /login); sin ella responde 401 en JSON.
+"""
+
+from functools import wraps
+from flask import Blueprint, jsonify, request, current_app, Response
+from flask_login import current_user
+from forms.factura_form import validar_factura_json
+from inventario.paginacion import parametros_paginacion
+from inventario.seleccion import CampoInvalidoError, elegir_campos, recortar
+from services import producto_service, cliente_service
+from services.producto_service import ProductoService
+from services.cliente_service import ClienteService
+from services.factura_service import FacturaService
+from services.version_service import VersionService
+from services.sincronizacion_service import SincronizacionService, LIMITE_DEFECTO
+from services import analitica_service
+from services.analitica_service import AnaliticaService, leer_rango
+from services.acumulado_service import AcumuladoService
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+MAXIMO_IDS = 500
+MAXIMO_LOTE = 100
+MAXIMO_DIAS = 366
+
+
+class ErrorApi(Exception):
+
+    def __init__(self, mensaje, codigo=400):
+        super().__init__(mensaje)
+        self.codigo = codigo
+
+
+@api_bp.errorhandler(ErrorApi)
+def _error_api(ex):
+    return jsonify({'error': str(ex)}), ex.codigo
+
+
+@api_bp.errorhandler(CampoInvalidoError)
+def _campo_invalido(ex):
+    return jsonify({'error': str(ex)}), 400
+
+
+def requiere_sesion(vista):
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        if not current_user.is_authenticated:
+            raise ErrorApi('Se requiere iniciar sesión.', 401)
+        return vista(*args, **kwargs)
+    return envoltura
+
+
+def _ids():
+    """ids de ?ids=1,2,3 (None si no se pasó el parámetro)."""
+    texto = request.args.get('ids')
+    if texto is None:
+        return None
+    try:
+        ids = [int(i) for i in texto.split(',') if i.strip()]
+    except ValueError:
+        raise ErrorApi('ids debe ser una lista de enteros separados por comas.')
+    maximo = current_app.config.get('API_MAXIMO_IDS', MAXIMO_IDS)
+    if len(ids) > maximo:
+        raise ErrorApi(f'Se aceptan hasta {maximo} ids por petición.')
+    return ids
+
+
+def condicional(*entidades):
+    """Responde 304 si el ETag del cliente coincide con las versiones actuales de las entidades.
+
+    La versión se lee antes que las filas: si otra escritura entra entre ambas
+    lecturas el ETag queda atrasado y el cliente solo vuelve a pedir los datos.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            versiones = VersionService.obtener(*entidades)
+            etag = 'v1-' + '-'.join(f'{e}.{versiones[e]}' for e in entidades)
+            if request.if_none_match.contains(etag):
+                respuesta = Response(status=304)
+            else:
+                respuesta = vista(*args, **kwargs)
+                if not isinstance(respuesta, Response):
+                    respuesta = jsonify(respuesta)
+            if respuesta.status_code in (200, 304):
+                respuesta.set_etag(etag)
+                respuesta.headers['Cache-Control'] = 'private, no-cache'
+            return respuesta
+        return envoltura
+    return decorador
+
+
+def _lote(encontrados, ids, clave):
+    encontrados_ids = {r['id'] for r in encontrados}
+    return {clave: encontrados, 'no_encontrados': [i for i in dict.fromkeys(ids) if i not in encontrados_ids]}
+
+
+def _listado(pagina, campos):
+    return {'items': [recortar(r, campos) for r in pagina.items], 'pagina': pagina.pagina,
+            'por_pagina': pagina.por_pagina, 'total': pagina.total,
+            'tiene_siguiente': pagina.tiene_siguiente}
+
+
+# ==================== PRODUCTOS ====================
+
+@api_bp.route('/productos')
+@requiere_sesion
+@condicional('productos')
+def productos():
+    campos = elegir_campos(request.args.get('campos'), producto_service.CAMPOS)
+    ids = _ids()
+    if ids is not None:
+        return _lote(ProductoService.obtener_por_ids(ids, campos), ids, 'productos')
+    params = parametros_paginacion(request.args)
+    pagina = ProductoService.obtener_todos(params['pagina'], params['por_pagina'],
+                                           params['orden'], params['direccion'])
+    return _listado(pagina.map(lambda p: p.to_dict()), campos)
+
+
+@api_bp.route('/productos/stock')
+@requiere_sesion
+@condicional('productos')
+def stock():
+    ids = _ids()
+    if not ids:
+        raise ErrorApi('Indique los productos con ?ids=1,2,3.')
+    existencias = ProductoService.obtener_stock(ids)
+    return {'stock': {str(i): existencias[i] for i in ids if i in existencias},
+            'no_encontrados': [i for i in dict.fromkeys(ids) if i not in existencias]}
+
+
+@api_bp.route('/productos/cambios')
+@requiere_sesion
+def cambios():
+    """Cambios posteriores al cursor desde (0 = catálogo completo), incluidas las bajas."""
+    try:
+        desde = int(request.args.get('desde', 0))
+        limite = int(request.args.get('limite', LIMITE_DEFECTO))
+    except ValueError:
+        raise ErrorApi('desde y limite deben ser enteros.')
+    campos = elegir_campos(request.args.get('campos'), producto_service.CAMPOS)
+    return jsonify(SincronizacionService.cambios_desde(desde, limite, campos))
+
+
+@api_bp.route('/productos/<int:producto_id>')
+@requiere_sesion
+@condicional('productos')
+def producto(producto_id):
+    campos = elegir_campos(request.args.get('campos'), producto_service.CAMPOS)
+    filas = ProductoService.obtener_por_ids([producto_id], campos)
+    if not filas:
+        raise ErrorApi('Producto no encontrado.', 404)
+    return filas[0]
+
+
+@api_bp.route('/productos/<int:producto_id>/stock/historial')
+@requiere_sesion
+def historial_stock(producto_id):
+    """Stock al cierre de cada día del rango según las fotos nocturnas (None antes de la primera)."""
+    try:
+        desde, hasta = leer_rango(request.args.get('desde'), request.args.get('hasta'))
+    except ValueError as ex:
+        raise ErrorApi(str(ex))
+    maximo = current_app.config.get('API_MAXIMO_DIAS', MAXIMO_DIAS)
+    if (hasta - desde).days >= maximo:
+        raise ErrorApi(f'El rango puede tener hasta {maximo} días.')
+    return jsonify({'id': producto_id,
+                    'historial': AcumuladoService.historial_stock(producto_id, desde, hasta)})
+
+
+# ==================== CLIENTES ====================
+
+@api_bp.route('/clientes')
+@requiere_sesion
+@condicional('clientes')
+def clientes():
+    campos = elegir_campos(request.args.get('campos'), cliente_service.CAMPOS)
+    ids = _ids()
+    if ids is not None:
+        return _lote(ClienteService.obtener_por_ids(ids, campos), ids, 'clientes')
+    params = parametros_paginacion(request.args)
+    pagina = ClienteService.obtener_todos(params['pagina'], params['por_pagina'],
+                                          params['orden'], params['direccion'])
+    return _listado(pagina.map(lambda c: c.to_dict()), campos)
+
+
+@api_bp.route('/clientes/<int:cliente_id>')
+@requiere_sesion
+@condicional('clientes')
+def cliente(cliente_id):
+    campos = elegir_campos(request.args.get('campos'), cliente_service.CAMPOS)
+    filas = ClienteService.obtener_por_ids([cliente_id], campos)
+    if not filas:
+        raise ErrorApi('Cliente no encontrado.', 404)
+    return filas[0]
+
+
+# ==================== FACTURAS ====================
+
+# La factura muestra el nombre del cliente y de cada producto
+CAMPOS_FACTURA = ('id', 'cliente_id', 'cliente_nombre', 'fecha', 'estado', 'total', 'detalles')
+
+
+@api_bp.route('/facturas')
+@requiere_sesion
+@condicional('facturas', 'clientes', 'productos')
+def facturas():
+    campos = elegir_campos(request.args.get('campos'), CAMPOS_FACTURA)
+    ids = _ids()
+    if not ids:
+        raise ErrorApi('Indique las facturas con ?ids=1,2,3.')
+    return _lote([recortar(f.to_dict(), campos) for f in FacturaService.obtener_por_ids(ids)],
+                 ids, 'facturas')
+
+
+@api_bp.route('/facturas/<int:factura_id>')
+@requiere_sesion
+@condicional('facturas', 'clientes', 'productos')
+def factura(factura_id):
+    campos = elegir_campos(request.args.get('campos'), CAMPOS_FACTURA)
+    encontrada = FacturaService.obtener_por_id(factura_id)
+    if not encontrada:
+        raise ErrorApi('Factura no encontrada.', 404)
+    return recortar(encontrada.to_dict(), campos)
+
+
+@api_bp.route('/facturas/lote', methods=['POST'])
+@requiere_sesion
+def facturas_lote():
+    """Crea varias facturas; cada una es independiente y su resultado repite la 'referencia' enviada."""
+    cuerpo = request.get_json(silent=True)
+    if not isinstance(cuerpo, dict) or not isinstance(cuerpo.get('facturas'), list):
+        raise ErrorApi('Se espera {"facturas": [{"cliente_id": ..., "items": [...]}, ...]}.')
+    maximo = current_app.config.get('API_MAXIMO_LOTE', MAXIMO_LOTE)
+    if len(cuerpo['facturas']) > maximo:
+        raise ErrorApi(f'Se aceptan hasta {maximo} facturas por lote.')
+
+    resultados = [None] * len(cuerpo['facturas'])
+    validas, posiciones = [], []
+    for i, datos in enumerate(cuerpo['facturas']):
+        errores, limpios = validar_factura_json(datos)
+        if errores:
+            resultados[i] = {'ok': False, 'error': ' '.join(errores)}
+        else:
+            validas.append(limpios)
+            posiciones.append(i)
+    for i, resultado in zip(posiciones, FacturaService.crear_lote(validas)):
+        resultados[i] = resultado
+    for datos, resultado in zip(cuerpo['facturas'], resultados):
+        if isinstance(datos, dict) and 'referencia' in datos:
+            resultado['referencia'] = datos['referencia']
+
+    creadas = sum(1 for r in resultados if r['ok'])
+    return jsonify({'resultados': resultados, 'creadas': creadas,
+                    'rechazadas': len(resultados) - creadas}), 200 if creadas or not resultados else 422
+
+
+# ==================== ANÁLISIS ====================
+
+@api_bp.route('/analitica/ventas')
+@requiere_sesion
+@condicional('facturas', 'clientes', 'productos')
+def analitica_ventas():
+    """Informe de ventas del rango desde/hasta (AAAA-MM-DD, por defecto los últimos 30 días).
+
+    limite: productos del ranking; ventana: días del promedio móvil.
+    """
+    try:
+        desde, hasta = leer_rango(request.args.get('desde'), request.args.get('hasta'))
+    except ValueError as ex:
+        raise ErrorApi(str(ex))
+    try:
+        limite = int(request.args.get('limite', analitica_service.LIMITE_DEFECTO))
+        ventana = int(request.args.get('ventana', analitica_service.VENTANA_DEFECTO))
+    except ValueError:
+        raise ErrorApi('limite y ventana deben ser enteros.')
+    return AnaliticaService.informe(desde, hasta, min(max(limite, 1), analitica_service.LIMITE_MAXIMO),
+                                    min(max(ventana, 1), analitica_service.VENTANA_MAXIMA))
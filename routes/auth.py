@@ -1,8 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from inventario.usuarios import Usuario
 from inventario.inventario import Inventario
+from inventario.sesion import olvidar_sesion
+from services.contrasena_service import ContrasenaService, DemasiadosIntentosError, ServicioOcupadoError
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -27,7 +28,11 @@ def registro():
             flash('El email ya está registrado.', 'error')
             return redirect(url_for('auth.registro'))
 
-        hashed = generate_password_hash(password, method='pbkdf2:sha256')
+        try:
+            hashed = ContrasenaService.generar(password)
+        except ServicioOcupadoError as e:
+            flash(str(e), 'error')
+            return render_template('auth/registro.html'), 503
         usuario = Usuario(nombre=nombre, email=email, password=hashed)
         exito, mensaje = inv.agregar_usuario(usuario)
 
@@ -47,20 +52,21 @@ def login():
     if request.method == 'POST':
         email = request.form['email']
         password = request.form['password']
-        inv = get_inventario()
-        usuario = inv.buscar_usuario_por_email(email)
+        try:
+            # Las contraseñas en texto plano se guardan con hash al iniciar sesión
+            usuario = ContrasenaService.autenticar(email, password)
+        except DemasiadosIntentosError as e:
+            flash(str(e), 'error')
+            return render_template('auth/login.html'), 429, {'Retry-After': str(e.segundos)}
+        except ServicioOcupadoError as e:
+            flash(str(e), 'error')
+            return render_template('auth/login.html'), 503
 
         if usuario:
-            if usuario.password.startswith('pbkdf2:sha256'):
-                ok = check_password_hash(usuario.password, password)
-            else:
-                ok = (usuario.password == password)
-
-            if ok:
-                login_user(usuario)
-                flash('Sesión iniciada exitosamente.', 'success')
-                next_page = request.args.get('next')
-                return redirect(next_page or url_for('main.inicio'))
+            login_user(usuario)
+            flash('Sesión iniciada exitosamente.', 'success')
+            next_page = request.args.get('next')
+            return redirect(next_page or url_for('main.inicio'))
 
         flash('Email o contraseña incorrectos.', 'error')
 
@@ -71,5 +77,6 @@ def login():
 @login_required
 def logout():
     logout_user()
+    olvidar_sesion()
     flash('Sesión cerrada.', 'info')
     return redirect(url_for('auth.login'))
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required
 from inventario.clientes import Cliente
+from inventario.paginacion import parametros_paginacion
 
 clientes_bp = Blueprint('clientes', __name__, url_prefix='/clientes')
 
@@ -13,8 +14,12 @@ def get_inventario():
 @clientes_bp.route('/')
 @login_required
 def index():
-    lista = get_inventario().obtener_todos_clientes()
-    return render_template('clientes/index.html', clientes=[c.to_dict() for c in lista])
+    params = parametros_paginacion(request.args)
+    pagina = get_inventario().obtener_todos_clientes(params['pagina'], params['por_pagina'],
+                                                     params['orden'], params['direccion'])
+    return render_template('clientes/index.html',
+                           clientes=[c.to_dict() for c in pagina],
+                           pagina=pagina)
 
 
 @clientes_bp.route('/nuevo', methods=['GET', 'POST'])
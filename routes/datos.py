@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from datetime import datetime
+from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, stream_with_context, abort
 from flask_login import login_required
-from inventario.productos import Producto
+from services import exportacion_service as exportacion
 
 datos_bp = Blueprint('datos', __name__, url_prefix='/datos')
 
@@ -10,11 +11,21 @@ def get_inventario():
     return inventario
 
 
+def _informar_importacion(exito, mensaje, reporte, max_rechazos=10):
+    flash(mensaje, 'success' if exito else 'error')
+    if reporte and reporte['rechazados']:
+        detalle = '; '.join(f"fila {n}: {' '.join(errores)}"
+                            for n, errores in reporte['rechazados'][:max_rechazos])
+        restantes = len(reporte['rechazados']) - max_rechazos
+        if restantes > 0:
+            detalle += f' (y {restantes} más)'
+        flash(f'Filas rechazadas: {detalle}', 'warning')
+
+
 @datos_bp.route('/txt')
 @login_required
 def txt():
-    inv = get_inventario()
-    data, mensaje = inv.cargar_productos_txt()
+    data, mensaje = get_inventario().vista_previa_archivo('txt')
     if not data:
         flash(mensaje, 'info')
     return render_template('datos.html', data=data, tipo='TXT')
@@ -31,19 +42,15 @@ def guardar_txt():
 @datos_bp.route('/txt/cargar', methods=['POST'])
 @login_required
 def cargar_txt():
-    inv = get_inventario()
-    data, mensaje = inv.cargar_productos_txt()
-    for d in data:
-        inv.agregar_producto(Producto.from_dict(d))
-    flash(mensaje, 'success')
+    exito, mensaje, reporte = get_inventario().importar_productos_txt(upsert=True)
+    _informar_importacion(exito, mensaje, reporte)
     return redirect(url_for('datos.txt'))
 
 
 @datos_bp.route('/json')
 @login_required
 def json_view():
-    inv = get_inventario()
-    data, mensaje = inv.cargar_productos_json()
+    data, mensaje = get_inventario().vista_previa_archivo('json')
     if not data:
         flash(mensaje, 'info')
     return render_template('datos.html', data=data, tipo='JSON')
@@ -60,19 +67,15 @@ def guardar_json():
 @datos_bp.route('/json/cargar', methods=['POST'])
 @login_required
 def cargar_json():
-    inv = get_inventario()
-    data, mensaje = inv.cargar_productos_json()
-    for d in data:
-        inv.agregar_producto(Producto.from_dict(d))
-    flash(mensaje, 'success')
+    exito, mensaje, reporte = get_inventario().importar_productos_json(upsert=True)
+    _informar_importacion(exito, mensaje, reporte)
     return redirect(url_for('datos.json_view'))
 
 
 @datos_bp.route('/csv')
 @login_required
 def csv_view():
-    inv = get_inventario()
-    data, mensaje = inv.cargar_productos_csv()
+    data, mensaje = get_inventario().vista_previa_archivo('csv')
     if not data:
         flash(mensaje, 'info')
     return render_template('datos.html', data=data, tipo='CSV')
@@ -89,9 +92,58 @@ def guardar_csv():
 @datos_bp.route('/csv/cargar', methods=['POST'])
 @login_required
 def cargar_csv():
-    inv = get_inventario()
-    data, mensaje = inv.cargar_productos_csv()
-    for d in data:
-        inv.agregar_producto(Producto.from_dict(d))
-    flash(mensaje, 'success')
+    exito, mensaje, reporte = get_inventario().importar_productos_csv(upsert=True)
+    _informar_importacion(exito, mensaje, reporte)
     return redirect(url_for('datos.csv_view'))
+
+
+# ==================== EXPORTACIÓN EN STREAMING ====================
+
+def _fecha_param(nombre):
+    valor = request.args.get(nombre, '').strip()
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d')
+    except ValueError:
+        abort(400, f'El parámetro {nombre} debe tener el formato AAAA-MM-DD.')
+
+
+@datos_bp.route('/exportar/<entidad>.<formato>')
+@login_required
+def exportar(entidad, formato):
+    """Descarga productos, clientes, facturas o detalles generados en streaming.
+
+    Parámetros: categoria (productos/detalles), desde y hasta (AAAA-MM-DD,
+    facturas/detalles), despues_de=<id> para retomar una descarga cortada
+    y gzip=1 para recibir el archivo comprimido.
+    """
+    if formato not in exportacion.FORMATOS:
+        abort(404)
+    despues_de = request.args.get('despues_de', type=int)
+    categoria = request.args.get('categoria') or None
+
+    if entidad == 'productos':
+        columnas, filas = exportacion.filas_productos(categoria, despues_de)
+    elif entidad == 'clientes':
+        columnas, filas = exportacion.filas_clientes(despues_de)
+    elif entidad == 'facturas':
+        columnas, filas = exportacion.filas_facturas(_fecha_param('desde'), _fecha_param('hasta'), despues_de)
+    elif entidad == 'detalles':
+        columnas, filas = exportacion.filas_detalles(_fecha_param('desde'), _fecha_param('hasta'),
+                                                     categoria, despues_de)
+    else:
+        abort(404)
+
+    cuerpo = exportacion.agrupar(exportacion.codificar(filas, columnas, formato))
+    nombre = f'{entidad}.{formato}'
+    mimetype = exportacion.FORMATOS[formato]
+    if request.args.get('gzip') == '1':
+        cuerpo = exportacion.comprimir_gzip(cuerpo)
+        nombre += '.gz'
+        mimetype = 'application/gzip'
+
+    respuesta = Response(stream_with_context(cuerpo), mimetype=mimetype)
+    respuesta.headers['Content-Disposition'] = f'attachment; filename={nombre}'
+    respuesta.headers['X-Accel-Buffering'] = 'no'
+    return respuesta
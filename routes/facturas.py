@@ -1,10 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
 from flask_login import login_required
 from services.cliente_service import ClienteService
-from services.factura_service import FacturaService
+from services.factura_service import FacturaService, StockInsuficienteError
 from services.producto_service import ProductoService
-from services.reporte_service import generar_reporte_facturas
+from services.ingesta_service import IngestaService
+from services.analitica_service import AnaliticaService, leer_rango
 from forms.factura_form import validar_factura_form
+from inventario.paginacion import parametros_paginacion
+from services.reporte_trabajos import responder_reporte, responder_estado, responder_descarga
 
 facturas_bp = Blueprint('facturas', __name__, url_prefix='/facturas')
 
@@ -12,8 +15,9 @@ facturas_bp = Blueprint('facturas', __name__, url_prefix='/facturas')
 @facturas_bp.route('/')
 @login_required
 def index():
-    lista = FacturaService.obtener_todas()
-    return render_template('facturas/index.html', facturas=[f.to_dict() for f in lista])
+    params = parametros_paginacion(request.args, direccion_defecto='desc')
+    pagina = FacturaService.obtener_resumenes(params['cursor'], params['por_pagina'], params['direccion'])
+    return render_template('facturas/index.html', facturas=pagina.items, pagina=pagina)
 
 
 @facturas_bp.route('/nueva', methods=['GET', 'POST'])
@@ -24,17 +28,36 @@ def nueva():
         if errores:
             for e in errores:
                 flash(e, 'error')
+        elif current_app.config.get('FACTURAS_INGESTA'):
+            numero = IngestaService.encolar(datos['cliente_id'], datos['items'])
+            flash(f'Factura recibida con número provisional {numero}; '
+                  'se registrará en unos segundos.', 'success')
+            return redirect(url_for('facturas.index'))
         else:
             try:
                 FacturaService.crear(datos['cliente_id'], datos['items'])
                 flash('Factura creada exitosamente.', 'success')
                 return redirect(url_for('facturas.index'))
+            except StockInsuficienteError as ex:
+                flash(str(ex), 'error')
             except Exception as ex:
                 flash(f'Error al crear factura: {ex}', 'error')
 
     return render_template('facturas/form.html',
-                           clientes=ClienteService.obtener_todos(),
-                           productos=ProductoService.obtener_todos())
+                           clientes=ClienteService.obtener_opciones(),
+                           productos=ProductoService.obtener_opciones())
+
+
+@facturas_bp.route('/provisional/<int:pendiente_id>')
+@login_required
+def provisional(pendiente_id):
+    """Estado de una factura recibida en modo de ingesta (JSON)."""
+    pendiente = IngestaService.obtener(pendiente_id)
+    if not pendiente:
+        return jsonify({'id': pendiente_id, 'estado': 'desconocido'}), 404
+    if pendiente['factura_id']:
+        pendiente['url'] = url_for('facturas.detalle', factura_id=pendiente['factura_id'])
+    return jsonify(pendiente)
 
 
 @facturas_bp.route('/<int:factura_id>')
@@ -68,9 +91,49 @@ def eliminar(factura_id):
     return redirect(url_for('facturas.index'))
 
 
+@facturas_bp.route('/analitica')
+@login_required
+def analitica():
+    """Ventas del rango desde/hasta (AAAA-MM-DD, por defecto los últimos 30 días)."""
+    try:
+        desde, hasta = leer_rango(request.args.get('desde'), request.args.get('hasta'))
+    except ValueError as ex:
+        flash(str(ex), 'error')
+        desde, hasta = leer_rango()
+    return render_template('facturas/analitica.html', informe=AnaliticaService.informe(desde, hasta))
+
+
 @facturas_bp.route('/reporte/pdf')
 @login_required
 def reporte_pdf():
-    buffer = generar_reporte_facturas(FacturaService.obtener_todas())
-    return send_file(buffer, mimetype='application/pdf',
-                     download_name='reporte_facturas.pdf', as_attachment=False)
+    return responder_reporte('facturas', 'facturas.reporte_estado', 'facturas.reporte_descargar')
+
+
+@facturas_bp.route('/reporte/pdf/<huella>/estado')
+@login_required
+def reporte_estado(huella):
+    return responder_estado('facturas', huella, 'facturas.reporte_descargar')
+
+
+@facturas_bp.route('/reporte/pdf/<huella>')
+@login_required
+def reporte_descargar(huella):
+    return responder_descarga('facturas', huella)
+
+
+@facturas_bp.route('/reporte/ventas/pdf')
+@login_required
+def reporte_ventas_pdf():
+    return responder_reporte('ventas', 'facturas.reporte_ventas_estado', 'facturas.reporte_ventas_descargar')
+
+
+@facturas_bp.route('/reporte/ventas/pdf/<huella>/estado')
+@login_required
+def reporte_ventas_estado(huella):
+    return responder_estado('ventas', huella, 'facturas.reporte_ventas_descargar')
+
+
+@facturas_bp.route('/reporte/ventas/pdf/<huella>')
+@login_required
+def reporte_ventas_descargar(huella):
+    return responder_descarga('ventas', huella)
@@ -1,6 +1,9 @@
-from flask import Blueprint, render_template
-from flask_login import login_required
-from models.factura import Factura
+import hmac
+from flask import Blueprint, render_template, jsonify, request, current_app, abort, Response
+from flask_login import login_required, current_user
+from inventario.database import estado_pool
+from inventario.cache import obtener_cache
+from inventario.metricas import exportar_prometheus
 
 main_bp = Blueprint('main', __name__)
 
@@ -13,37 +16,40 @@ def get_inventario():
 @main_bp.route('/')
 @login_required
 def inicio():
-    inv = get_inventario()
-    total_productos = len(inv.obtener_todos_productos())
-    total_clientes = len(inv.obtener_todos_clientes())
-    categorias = inv.obtener_categorias()
-
-    productos_por_categoria = {}
-    valor_total = 0
-    for cat in categorias:
-        prods = inv.obtener_productos_por_categoria(cat)
-        productos_por_categoria[cat] = [p.to_dict() for p in prods]
-        for p in prods:
-            valor_total += p.precio * p.stock
-
-    try:
-        total_facturas = Factura.query.count()
-    except Exception:
-        total_facturas = 0
-
-    estadisticas = {
-        'valor_total': valor_total,
-        'categorias': categorias,
-        'productos_por_categoria': productos_por_categoria
-    }
+    estadisticas = get_inventario().obtener_estadisticas()
 
     return render_template('index.html',
-                           total_productos=total_productos,
-                           total_clientes=total_clientes,
-                           total_facturas=total_facturas,
+                           total_productos=estadisticas['total_productos'],
+                           total_clientes=estadisticas['total_clientes'],
+                           total_facturas=estadisticas['total_facturas'],
                            estadisticas=estadisticas)
 
 
+@main_bp.route('/estado/pool')
+@login_required
+def pool():
+    """Uso del pool de conexiones de este worker (checkouts, espera, desborde)."""
+    return jsonify(estado_pool())
+
+
+@main_bp.route('/metricas')
+def metricas():
+    """Métricas por endpoint, pool y caché en formato de texto de Prometheus.
+
+    Con METRICAS_TOKEN configurado se acepta `Authorization: Bearer <token>`
+    (para el scraper); sin token, solo usuarios con sesión iniciada.
+    """
+    token = current_app.config.get('METRICAS_TOKEN')
+    if token:
+        recibido = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(recibido.encode(), token.encode()):
+            abort(401)
+    elif not current_user.is_authenticated:
+        return current_app.login_manager.unauthorized()
+    texto = exportar_prometheus(current_app, estado_pool(), obtener_cache().metricas())
+    return Response(texto, mimetype='text/plain; version=0.0.4')
+
+
 @main_bp.route('/about')
 def about():
     return render_template('about.html')
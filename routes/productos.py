@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required
 from inventario.productos import Producto
 from services.producto_service import ProductoService
-from services.reporte_service import generar_reporte_productos
+from services.reporte_trabajos import responder_reporte, responder_estado, responder_descarga
+from inventario.paginacion import parametros_paginacion
 
 productos_bp = Blueprint('productos', __name__, url_prefix='/productos')
 
@@ -18,16 +19,20 @@ def index():
     inv = get_inventario()
     categoria = request.args.get('categoria', '')
     busqueda = request.args.get('busqueda', '')
+    params = parametros_paginacion(request.args,
+                                   orden_defecto='relevancia' if busqueda and not categoria else 'id')
 
-    if categoria:
-        lista = inv.obtener_productos_por_categoria(categoria)
-    elif busqueda:
-        lista = inv.buscar_productos_por_nombre(busqueda)
+    if busqueda and not categoria:
+        pagina = inv.buscar_productos_por_nombre(busqueda, params['pagina'], params['por_pagina'],
+                                                 params['orden'], params['direccion'])
     else:
-        lista = inv.obtener_todos_productos()
+        pagina = inv.obtener_todos_productos(params['pagina'], params['por_pagina'],
+                                             params['orden'], params['direccion'],
+                                             categoria=categoria or None)
 
     return render_template('productos/index.html',
-                           productos=[p.to_dict() for p in lista],
+                           productos=[p.to_dict() for p in pagina],
+                           pagina=pagina,
                            categorias=inv.obtener_categorias(),
                            categoria_actual=categoria,
                            busqueda_actual=busqueda)
@@ -107,6 +112,16 @@ def detalle(producto_id):
 @productos_bp.route('/reporte/pdf')
 @login_required
 def reporte_pdf():
-    buffer = generar_reporte_productos(ProductoService.obtener_todos())
-    return send_file(buffer, mimetype='application/pdf',
-                     download_name='reporte_productos.pdf', as_attachment=False)
+    return responder_reporte('productos', 'productos.reporte_estado', 'productos.reporte_descargar')
+
+
+@productos_bp.route('/reporte/pdf/<huella>/estado')
+@login_required
+def reporte_estado(huella):
+    return responder_estado('productos', huella, 'productos.reporte_descargar')
+
+
+@productos_bp.route('/reporte/pdf/<huella>')
+@login_required
+def reporte_descargar(huella):
+    return responder_descarga('productos', huella)
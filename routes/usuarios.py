@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required
-from werkzeug.security import generate_password_hash
 from inventario.usuarios import Usuario
+from inventario.paginacion import parametros_paginacion
+from services.contrasena_service import ContrasenaService, ServicioOcupadoError
 
 usuarios_bp = Blueprint('usuarios', __name__, url_prefix='/usuarios')
 
@@ -14,15 +15,23 @@ def get_inventario():
 @usuarios_bp.route('/')
 @login_required
 def index():
-    lista = get_inventario().obtener_todos_usuarios()
-    return render_template('usuarios/index.html', usuarios=[u.to_dict() for u in lista])
+    params = parametros_paginacion(request.args, orden_defecto='id_usuario')
+    pagina = get_inventario().obtener_todos_usuarios(params['pagina'], params['por_pagina'],
+                                                     params['orden'], params['direccion'])
+    return render_template('usuarios/index.html',
+                           usuarios=[u.to_dict() for u in pagina],
+                           pagina=pagina)
 
 
 @usuarios_bp.route('/nuevo', methods=['GET', 'POST'])
 @login_required
 def nuevo():
     if request.method == 'POST':
-        hashed = generate_password_hash(request.form['password'], method='pbkdf2:sha256')
+        try:
+            hashed = ContrasenaService.generar(request.form['password'])
+        except ServicioOcupadoError as e:
+            flash(str(e), 'error')
+            return render_template('usuarios/form.html', usuario=None, accion='Agregar'), 503
         usuario = Usuario(
             nombre=request.form['nombre'],
             email=request.form['email'],
@@ -47,7 +56,11 @@ def editar(id_usuario):
 
     if request.method == 'POST':
         password = request.form.get('password', '')
-        hashed = generate_password_hash(password, method='pbkdf2:sha256') if password else usuario.password
+        try:
+            hashed = ContrasenaService.generar(password) if password else usuario.password
+        except ServicioOcupadoError as e:
+            flash(str(e), 'error')
+            return render_template('usuarios/form.html', usuario=usuario.to_dict(), accion='Editar'), 503
         exito, mensaje = inv.actualizar_usuario(
             id_usuario,
             nombre=request.form['nombre'],
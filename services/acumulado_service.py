@@ -0,0 +1,326 @@
+"""
+Acumulados diarios de ventas y fotos del stock.
+
+Las preguntas históricas (ventas por día y categoría, stock de un producto
+en una fecha) no deberían recorrer todas las facturas. `flask acumulados
+ejecutar`, pensado para correr cada noche desde cron o el programador de
+tareas, agrupa las líneas de factura de cada día cerrado en:
+
+- ventas_diarias            totales del día
+- ventas_diarias_producto   unidades, ingresos y facturas por producto
+- ventas_diarias_categoria  lo mismo por categoría
+
+Cada ejecución continúa desde el último día acumulado (la primera vez,
+desde la primera factura) hasta ayer, en tramos de DIAS_POR_TRAMO días con
+su propio commit: una carga histórica interrumpida se retoma donde quedó.
+Un día se acumula borrando e insertando sus filas con INSERT ... SELECT, así
+que repetirlo no duplica nada. Los días son de la fecha guardada en
+facturas (UTC).
+
+Si una factura de un día ya acumulado cambia (se anula o elimina), un
+listener after_flush anota el día en acumulado_pendientes; la próxima
+ejecución lo vuelve a acumular y, mientras tanto, dia_vigente() se detiene
+antes de ese día para que los análisis lo lean de las facturas.
+
+Stock: cada ejecución toma una foto con dia = ayer, solo de los productos
+modificados desde la foto anterior (la primera vez, de todos). El stock de
+un producto en una fecha es el de su última foto hasta ese día. No se
+reconstruye stock pasado: la historia empieza con la primera ejecución.
+
+Las ejecuciones incrementan la versión 'acumulados' (version_datos) en cada
+tramo; el UPDATE bloquea la fila hasta el commit, así que dos ejecuciones
+simultáneas no se pisan, y la versión sirve de huella al reporte PDF de
+ventas.
+"""
+
+from datetime import datetime, timedelta
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, func, inspect, insert, literal, select
+from sqlalchemy.orm import Session
+from inventario.database import db
+from inventario.productos import Producto
+from models.acumulado import (AcumuladoEstado, AcumuladoPendiente, StockDiario, VentaDiaria,
+                              VentaDiariaCategoria, VentaDiariaProducto)
+from models.factura import Factura, FacturaDetalle
+from services.version_service import incrementar
+
+ANULADA = 'Anulada'
+DIAS_POR_TRAMO = 31
+VENTAS = 'ventas'
+STOCK = 'stock'
+
+
+def _inicio(dia):
+    return datetime.combine(dia, datetime.min.time())
+
+
+def _ayer():
+    return datetime.utcnow().date() - timedelta(days=1)
+
+
+def acumular_dias(conexion, desde, hasta):
+    """Vuelve a calcular las ventas de los días desde..hasta (inclusive) desde las facturas."""
+    for modelo in (VentaDiaria, VentaDiariaProducto, VentaDiariaCategoria):
+        conexion.execute(delete(modelo).where(modelo.dia >= desde, modelo.dia <= hasta))
+
+    dia = func.date(Factura.fecha)
+    lineas = (select().select_from(FacturaDetalle)
+              .join(Factura, Factura.id == FacturaDetalle.factura_id)
+              .where(Factura.fecha >= _inicio(desde), Factura.fecha < _inicio(hasta + timedelta(days=1)),
+                     Factura.estado != ANULADA))
+    facturas = func.count(func.distinct(FacturaDetalle.factura_id))
+    unidades = func.sum(FacturaDetalle.cantidad)
+    ingresos = func.sum(FacturaDetalle.subtotal)
+
+    conexion.execute(insert(VentaDiaria).from_select(
+        ['dia', 'facturas', 'unidades', 'ingresos'],
+        lineas.add_columns(dia, facturas, unidades, ingresos).group_by(dia)))
+    conexion.execute(insert(VentaDiariaProducto).from_select(
+        ['dia', 'producto_id', 'facturas', 'unidades', 'ingresos'],
+        lineas.add_columns(dia, FacturaDetalle.producto_id, facturas, unidades, ingresos)
+        .group_by(dia, FacturaDetalle.producto_id)))
+    conexion.execute(insert(VentaDiariaCategoria).from_select(
+        ['dia', 'categoria', 'facturas', 'unidades', 'ingresos'],
+        lineas.join(Producto, Producto.id == FacturaDetalle.producto_id)
+        .add_columns(dia, Producto.categoria, facturas, unidades, ingresos)
+        .group_by(dia, Producto.categoria)))
+
+
+def _guardar_estado(conexion, proceso, ultimo_dia, ejecutado_en):
+    tabla = AcumuladoEstado.__table__
+    resultado = conexion.execute(tabla.update().where(tabla.c.proceso == proceso)
+                                 .values(ultimo_dia=ultimo_dia, ejecutado_en=ejecutado_en))
+    if resultado.rowcount == 0:
+        conexion.execute(tabla.insert().values(proceso=proceso, ultimo_dia=ultimo_dia,
+                                               ejecutado_en=ejecutado_en))
+
+
+def _dias_de(factura):
+    """Días (fecha actual y anterior) de una factura nueva, modificada o eliminada."""
+    fechas = [factura.fecha, *inspect(factura).attrs.fecha.history.deleted]
+    return {f.date() for f in fechas if f is not None}
+
+
+def _despues_de_flush(session, flush_context):
+    hoy = datetime.utcnow().date()
+    dias = set()
+    for factura in session.new | session.deleted:
+        if isinstance(factura, Factura):
+            dias.update(_dias_de(factura))
+    for factura in session.dirty:
+        if isinstance(factura, Factura) and session.is_modified(factura):
+            dias.update(_dias_de(factura))
+    # Las facturas de hoy todavía no se acumularon: solo se anotan los días anteriores
+    dias = sorted(d for d in dias if d < hoy)
+    if dias:
+        session.connection().execute(insert(AcumuladoPendiente), [{'dia': d} for d in dias])
+
+
+class AcumuladoService:
+
+    @staticmethod
+    def registrar_eventos():
+        if not event.contains(Session, 'after_flush', _despues_de_flush):
+            event.listen(Session, 'after_flush', _despues_de_flush)
+
+    @staticmethod
+    def estado():
+        """{proceso: (ultimo_dia, ejecutado_en)} y los días pendientes de volver a acumular."""
+        procesos = {e.proceso: (e.ultimo_dia, e.ejecutado_en) for e in AcumuladoEstado.query}
+        pendientes = [d for (d,) in db.session.query(AcumuladoPendiente.dia).distinct()
+                      .order_by(AcumuladoPendiente.dia)]
+        return procesos, pendientes
+
+    @staticmethod
+    def dia_vigente():
+        """Último día hasta el cual los acumulados de ventas coinciden con las facturas (None si ninguno)."""
+        ultimo = db.session.query(AcumuladoEstado.ultimo_dia).filter_by(proceso=VENTAS).scalar()
+        if ultimo is None:
+            return None
+        pendiente = (db.session.query(func.min(AcumuladoPendiente.dia))
+                     .filter(AcumuladoPendiente.dia <= ultimo).scalar())
+        return ultimo if pendiente is None else pendiente - timedelta(days=1)
+
+    @staticmethod
+    def reacumular_pendientes():
+        """Vuelve a acumular los días anotados como cambiados. Retorna cuántos días."""
+        ultimo = db.session.query(AcumuladoEstado.ultimo_dia).filter_by(proceso=VENTAS).scalar()
+        try:
+            conexion = db.session.connection()
+            incrementar(conexion, 'acumulados')
+            id_maximo = db.session.query(func.max(AcumuladoPendiente.id)).scalar()
+            if id_maximo is None:
+                db.session.rollback()
+                return 0
+            dias = [d for (d,) in db.session.query(AcumuladoPendiente.dia).distinct()
+                    .filter(AcumuladoPendiente.id <= id_maximo)]
+            dias = [d for d in dias if ultimo is not None and d <= ultimo]
+            for dia in dias:
+                acumular_dias(conexion, dia, dia)
+            # Las marcas de días aún no acumulados se descartan: se acumularán al avanzar.
+            # Las anotadas después de leer id_maximo quedan para la próxima ejecución.
+            conexion.execute(delete(AcumuladoPendiente).where(AcumuladoPendiente.id <= id_maximo))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(dias)
+
+    @staticmethod
+    def avanzar(hasta=None, dias_por_tramo=DIAS_POR_TRAMO, progreso=None):
+        """Acumula las ventas desde el último día acumulado hasta hasta (ayer por defecto).
+
+        Los días posteriores a ayer no se acumulan porque todavía pueden
+        recibir facturas. Retorna la cantidad de días acumulados.
+        """
+        hasta = min(hasta or _ayer(), _ayer())
+        ultimo = db.session.query(AcumuladoEstado.ultimo_dia).filter_by(proceso=VENTAS).scalar()
+        if ultimo is not None:
+            desde = ultimo + timedelta(days=1)
+        else:
+            primera = db.session.query(func.min(Factura.fecha)).scalar()
+            desde = primera.date() if primera else hasta
+        db.session.rollback()  # terminar la lectura antes de tomar el bloqueo por tramo
+
+        dias = 0
+        while desde <= hasta:
+            fin = min(desde + timedelta(days=dias_por_tramo - 1), hasta)
+            try:
+                conexion = db.session.connection()
+                incrementar(conexion, 'acumulados')  # una ejecución a la vez (ver docstring del módulo)
+                acumular_dias(conexion, desde, fin)
+                _guardar_estado(conexion, VENTAS, fin, datetime.utcnow())
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            dias += (fin - desde).days + 1
+            if progreso:
+                progreso(desde, fin)
+            desde = fin + timedelta(days=1)
+        return dias
+
+    @staticmethod
+    def tomar_foto_stock(dia=None):
+        """Guarda el stock de los productos modificados desde la foto anterior. Retorna las filas guardadas."""
+        dia = dia or _ayer()
+        marca = datetime.utcnow()
+        anterior = AcumuladoEstado.query.filter_by(proceso=STOCK).first()
+        cambiados = select(Producto.id)
+        if anterior is not None:
+            cambiados = cambiados.where(Producto.actualizado_en >= anterior.ejecutado_en)
+        try:
+            conexion = db.session.connection()
+            incrementar(conexion, 'acumulados')
+            # Una segunda foto del mismo día reemplaza a la primera
+            conexion.execute(delete(StockDiario).where(StockDiario.dia == dia,
+                                                       StockDiario.producto_id.in_(cambiados)))
+            resultado = conexion.execute(insert(StockDiario).from_select(
+                ['producto_id', 'dia', 'stock'],
+                select(Producto.id, literal(dia), Producto.stock).where(Producto.id.in_(cambiados))))
+            _guardar_estado(conexion, STOCK, dia, marca)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return resultado.rowcount
+
+    @staticmethod
+    def ejecutar(hasta=None, progreso=None):
+        """Ejecución nocturna: días cambiados, días nuevos y foto del stock.
+
+        Retorna {'reacumulados': n, 'acumulados': n, 'stock': filas}. Con un
+        hasta anterior a ayer (carga histórica parcial) no se toma foto: el
+        stock actual no corresponde a ese día.
+        """
+        resultado = {'reacumulados': AcumuladoService.reacumular_pendientes(),
+                     'acumulados': AcumuladoService.avanzar(hasta, progreso=progreso), 'stock': 0}
+        if hasta is None or hasta >= _ayer():
+            resultado['stock'] = AcumuladoService.tomar_foto_stock()
+        return resultado
+
+    @staticmethod
+    def reconstruir(desde, hasta):
+        """Vuelve a acumular un rango ya acumulado (p. ej. tras corregir facturas a mano)."""
+        ultimo = db.session.query(AcumuladoEstado.ultimo_dia).filter_by(proceso=VENTAS).scalar()
+        if ultimo is None:
+            return 0
+        hasta = min(hasta, ultimo)
+        try:
+            conexion = db.session.connection()
+            incrementar(conexion, 'acumulados')
+            if desde <= hasta:
+                acumular_dias(conexion, desde, hasta)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return max((hasta - desde).days + 1, 0)
+
+    @staticmethod
+    def stock_en(producto_id, dia):
+        """Stock del producto al cierre de dia según las fotos, o None si no hay foto hasta ese día."""
+        return (db.session.query(StockDiario.stock)
+                .filter(StockDiario.producto_id == producto_id, StockDiario.dia <= dia)
+                .order_by(StockDiario.dia.desc()).limit(1).scalar())
+
+    @staticmethod
+    def historial_stock(producto_id, desde, hasta):
+        """[{'dia', 'stock'}] de cada día del rango; stock None antes de la primera foto."""
+        stock = AcumuladoService.stock_en(producto_id, desde)
+        fotos = dict(db.session.query(StockDiario.dia, StockDiario.stock)
+                     .filter(StockDiario.producto_id == producto_id,
+                             StockDiario.dia > desde, StockDiario.dia <= hasta))
+        historial = []
+        for i in range((hasta - desde).days + 1):
+            dia = desde + timedelta(days=i)
+            stock = fotos.get(dia, stock)
+            historial.append({'dia': dia.isoformat(), 'stock': stock})
+        return historial
+
+
+# ==================== CLI ====================
+
+acumulados_cli = AppGroup('acumulados', help='Acumulados diarios de ventas y fotos del stock.')
+
+
+def _fecha(ctx, parametro, valor):
+    if valor is None:
+        return None
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise click.BadParameter('use el formato AAAA-MM-DD.')
+
+
+@acumulados_cli.command('ejecutar')
+@click.option('--hasta', callback=_fecha, help='Último día a acumular, AAAA-MM-DD (por defecto ayer).')
+def ejecutar_comando(hasta):
+    """Acumula los días nuevos y cambiados y toma la foto del stock (para cron, cada noche)."""
+    resultado = AcumuladoService.ejecutar(
+        hasta, progreso=lambda desde, fin: click.echo(f"  {desde} .. {fin}"))
+    click.echo(f"Días acumulados: {resultado['acumulados']}, "
+               f"días corregidos: {resultado['reacumulados']}, "
+               f"productos en la foto de stock: {resultado['stock']}")
+
+
+@acumulados_cli.command('reconstruir')
+@click.option('--desde', callback=_fecha, required=True, help='AAAA-MM-DD')
+@click.option('--hasta', callback=_fecha, required=True, help='AAAA-MM-DD')
+def reconstruir_comando(desde, hasta):
+    """Vuelve a acumular un rango de días ya acumulados."""
+    click.echo(f"Días reconstruidos: {AcumuladoService.reconstruir(desde, hasta)}")
+
+
+@acumulados_cli.command('estado')
+def estado_comando():
+    """Muestra hasta qué día llega cada proceso y los días pendientes."""
+    procesos, pendientes = AcumuladoService.estado()
+    for proceso in (VENTAS, STOCK):
+        if proceso in procesos:
+            ultimo_dia, ejecutado_en = procesos[proceso]
+            click.echo(f"{proceso:7} hasta {ultimo_dia} (ejecutado {ejecutado_en:%Y-%m-%d %H:%M})")
+        else:
+            click.echo(f"{proceso:7} sin ejecutar")
+    click.echo(f"Días pendientes de corregir: {', '.join(map(str, pendientes)) or 'ninguno'}")
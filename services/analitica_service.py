@@ -0,0 +1,258 @@
+"""
+Análisis de ventas sobre las líneas de factura.
+
+Los totales (productos más vendidos, ventas por día y categoría, ingresos
+por tipo de cliente) se calculan con GROUP BY en la base: solo viajan las
+filas ya agrupadas, nunca las facturas con sus detalles. El rango de fechas
+y las líneas de cada factura se leen de índices que cubren las columnas
+usadas (migración 003). Las facturas anuladas no cuentan como venta.
+
+Los productos más vendidos, las ventas por categoría y la tendencia leen
+los días ya acumulados de las tablas diarias (services/acumulado_service.py)
+y solo los días siguientes de las líneas de factura.
+
+Lo que SQL no resuelve de forma portable (promedio móvil por día y
+percentiles del total de factura) se calcula en Python sobre una sola
+columna: con NumPy si está instalado, si no con listas, con el mismo
+resultado (percentil por interpolación lineal).
+
+informe() junta todo y lo guarda en la caché de la aplicación con la
+versión de datos de facturas, productos y clientes en la clave: cualquier
+escritura deja la entrada anterior fuera de uso sin invalidar a mano.
+
+Configuración (app.config):
+    ANALITICA_TTL   segundos de vida de un informe en la caché (300)
+"""
+
+from array import array
+from collections import deque
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, select, union_all
+from inventario.cache import cacheado
+from inventario.database import db
+from inventario.productos import Producto
+from inventario.clientes import Cliente
+from models.acumulado import VentaDiaria, VentaDiariaCategoria, VentaDiariaProducto
+from models.factura import Factura, FacturaDetalle
+from services.acumulado_service import AcumuladoService
+from services.version_service import VersionService
+
+try:
+    import numpy
+except ImportError:  # dependencia opcional
+    numpy = None
+
+ANULADA = 'Anulada'
+DIAS_DEFECTO = 30
+LIMITE_DEFECTO = 10
+LIMITE_MAXIMO = 100
+VENTANA_DEFECTO = 7
+VENTANA_MAXIMA = 365
+PERCENTILES = (50, 75, 90, 95, 99)
+TTL_DEFECTO = 300
+
+
+def leer_rango(desde=None, hasta=None):
+    """(desde, hasta) como date a partir de textos AAAA-MM-DD; por defecto los últimos 30 días.
+
+    Lanza ValueError si una fecha no tiene el formato o desde es posterior a hasta.
+    """
+    def fecha(texto, nombre):
+        try:
+            return datetime.strptime(texto.strip(), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f'{nombre} debe tener el formato AAAA-MM-DD.')
+
+    hasta = fecha(hasta, 'hasta') if hasta and hasta.strip() else date.today()
+    desde = fecha(desde, 'desde') if desde and desde.strip() else hasta - timedelta(days=DIAS_DEFECTO - 1)
+    if desde > hasta:
+        raise ValueError('desde no puede ser posterior a hasta.')
+    return desde, hasta
+
+
+def _en_rango(consulta, desde, hasta):
+    # hasta es inclusivo: se incluye todo ese día
+    return consulta.filter(Factura.fecha >= datetime.combine(desde, datetime.min.time()),
+                           Factura.fecha < datetime.combine(hasta + timedelta(days=1), datetime.min.time()),
+                           Factura.estado != ANULADA)
+
+
+def _tramos(desde, hasta):
+    """Divide el rango en (tramo leído de los acumulados, tramo leído de las facturas); None si vacío."""
+    vigente = AcumuladoService.dia_vigente()
+    if vigente is None or vigente < desde:
+        return None, (desde, hasta)
+    if vigente >= hasta:
+        return (desde, hasta), None
+    return (desde, vigente), (vigente + timedelta(days=1), hasta)
+
+
+def ventas_por_producto(desde, hasta):
+    """Subconsulta (producto_id, unidades, ingresos, facturas) de las ventas del rango.
+
+    Puede tener más de una fila por producto (una de los acumulados y otra de
+    las facturas); quien la usa vuelve a agrupar por producto_id.
+    """
+    acumulado, crudo = _tramos(desde, hasta)
+    partes = []
+    if acumulado:
+        partes.append(select(VentaDiariaProducto.producto_id, VentaDiariaProducto.unidades,
+                             VentaDiariaProducto.ingresos, VentaDiariaProducto.facturas)
+                      .where(VentaDiariaProducto.dia >= acumulado[0], VentaDiariaProducto.dia <= acumulado[1]))
+    if crudo:
+        partes.append(_en_rango(
+            select(FacturaDetalle.producto_id.label('producto_id'),
+                   func.sum(FacturaDetalle.cantidad).label('unidades'),
+                   func.sum(FacturaDetalle.subtotal).label('ingresos'),
+                   func.count(func.distinct(FacturaDetalle.factura_id)).label('facturas'))
+            .join(Factura, Factura.id == FacturaDetalle.factura_id), *crudo)
+            .group_by(FacturaDetalle.producto_id))
+    return (union_all(*partes) if len(partes) > 1 else partes[0]).subquery()
+
+
+def _dia(valor):
+    """func.date() devuelve texto en SQLite y date en MySQL."""
+    return valor.isoformat() if isinstance(valor, date) else str(valor)
+
+
+def promedio_movil(valores, ventana):
+    """Promedio de los últimos ventana valores en cada posición (menos al comienzo)."""
+    if numpy is not None:
+        acumulado = numpy.cumsum(numpy.asarray(valores, dtype=float))
+        anteriores = numpy.concatenate((numpy.zeros(ventana), acumulado[:-ventana]))[:len(acumulado)]
+        cantidades = numpy.minimum(numpy.arange(1, len(acumulado) + 1), ventana)
+        return ((acumulado - anteriores) / cantidades).tolist()
+    resultado, ultimos, suma = [], deque(), 0.0
+    for valor in valores:
+        ultimos.append(valor)
+        suma += valor
+        if len(ultimos) > ventana:
+            suma -= ultimos.popleft()
+        resultado.append(suma / len(ultimos))
+    return resultado
+
+
+def percentiles(valores, cortes=PERCENTILES):
+    """{corte: valor} por interpolación lineal (el método por defecto de numpy.percentile)."""
+    if not len(valores):
+        return {c: None for c in cortes}
+    if numpy is not None:
+        return dict(zip(cortes, numpy.percentile(numpy.asarray(valores), cortes).tolist()))
+    ordenados = sorted(valores)
+    resultado = {}
+    for corte in cortes:
+        posicion = (len(ordenados) - 1) * corte / 100
+        base = int(posicion)
+        siguiente = ordenados[min(base + 1, len(ordenados) - 1)]
+        resultado[corte] = ordenados[base] + (siguiente - ordenados[base]) * (posicion - base)
+    return resultado
+
+
+class AnaliticaService:
+
+    @staticmethod
+    def top_productos(desde, hasta, limite=LIMITE_DEFECTO, categoria=None):
+        """Productos con más ingresos en el rango: id, nombre, categoria, unidades, ingresos, facturas."""
+        partes = ventas_por_producto(desde, hasta)
+        ventas = (select(partes.c.producto_id, func.sum(partes.c.unidades).label('unidades'),
+                         func.sum(partes.c.ingresos).label('ingresos'),
+                         func.sum(partes.c.facturas).label('facturas'))
+                  .group_by(partes.c.producto_id))
+        if categoria:
+            ventas = (ventas.join(Producto, Producto.id == partes.c.producto_id)
+                      .where(Producto.categoria == categoria))
+        ventas = ventas.subquery()
+        # El nombre se busca solo para los productos del resultado
+        filas = (db.session.query(ventas, Producto.nombre, Producto.categoria)
+                 .outerjoin(Producto, Producto.id == ventas.c.producto_id)
+                 .order_by(ventas.c.ingresos.desc(), ventas.c.producto_id)
+                 .limit(min(max(int(limite), 1), LIMITE_MAXIMO)))
+        return [{'id': f.producto_id, 'nombre': f.nombre or '', 'categoria': f.categoria or '',
+                 'unidades': int(f.unidades), 'ingresos': round(float(f.ingresos), 2),
+                 'facturas': int(f.facturas)} for f in filas]
+
+    @staticmethod
+    def ventas_por_categoria(desde, hasta):
+        """Ventas de cada día por categoría: dia, categoria, unidades, ingresos."""
+        acumulado, crudo = _tramos(desde, hasta)
+        filas = []
+        if acumulado:
+            filas += (db.session.query(VentaDiariaCategoria.dia, VentaDiariaCategoria.categoria,
+                                       VentaDiariaCategoria.unidades, VentaDiariaCategoria.ingresos)
+                      .filter(VentaDiariaCategoria.dia >= acumulado[0], VentaDiariaCategoria.dia <= acumulado[1])
+                      .order_by(VentaDiariaCategoria.dia, VentaDiariaCategoria.categoria).all())
+        if crudo:
+            dia = func.date(Factura.fecha)
+            filas += (_en_rango(
+                db.session.query(dia, Producto.categoria, func.sum(FacturaDetalle.cantidad),
+                                 func.sum(FacturaDetalle.subtotal))
+                .select_from(FacturaDetalle)
+                .join(Factura, Factura.id == FacturaDetalle.factura_id)
+                .join(Producto, Producto.id == FacturaDetalle.producto_id), *crudo)
+                .group_by(dia, Producto.categoria)
+                .order_by(dia, Producto.categoria).all())
+        return [{'dia': _dia(d), 'categoria': categoria, 'unidades': int(unidades),
+                 'ingresos': round(float(ingresos), 2)} for d, categoria, unidades, ingresos in filas]
+
+    @staticmethod
+    def ingresos_por_tipo_cliente(desde, hasta):
+        """Ingresos por tipo de cliente: tipo, clientes, facturas, ingresos, ticket_promedio."""
+        filas = (_en_rango(
+            db.session.query(Cliente.tipo, func.count(func.distinct(Factura.cliente_id)),
+                             func.count(Factura.id), func.sum(Factura.total))
+            .join(Cliente, Cliente.id == Factura.cliente_id), desde, hasta)
+            .group_by(Cliente.tipo)
+            .order_by(func.sum(Factura.total).desc()))
+        return [{'tipo': tipo or 'Sin tipo', 'clientes': clientes, 'facturas': facturas,
+                 'ingresos': round(float(ingresos), 2),
+                 'ticket_promedio': round(float(ingresos) / facturas, 2)}
+                for tipo, clientes, facturas, ingresos in filas]
+
+    @staticmethod
+    def tendencia(desde, hasta, ventana=VENTANA_DEFECTO):
+        """Ingresos y facturas de cada día del rango (también los días sin ventas) con su promedio móvil."""
+        acumulado, crudo = _tramos(desde, hasta)
+        por_dia = {}
+        if acumulado:
+            por_dia.update((d.isoformat(), (facturas, ingresos)) for d, facturas, ingresos in
+                           db.session.query(VentaDiaria.dia, VentaDiaria.facturas, VentaDiaria.ingresos)
+                           .filter(VentaDiaria.dia >= acumulado[0], VentaDiaria.dia <= acumulado[1]))
+        if crudo:
+            dia = func.date(Factura.fecha)
+            por_dia.update((_dia(d), (facturas, float(ingresos))) for d, facturas, ingresos in _en_rango(
+                db.session.query(dia, func.count(Factura.id), func.sum(Factura.total)), *crudo)
+                .group_by(dia))
+        dias = [(desde + timedelta(days=i)).isoformat() for i in range((hasta - desde).days + 1)]
+        ingresos = [por_dia.get(d, (0, 0.0))[1] for d in dias]
+        movil = promedio_movil(ingresos, max(int(ventana), 1))
+        return [{'dia': d, 'facturas': por_dia.get(d, (0, 0.0))[0], 'ingresos': round(i, 2),
+                 'promedio_movil': round(m, 2)} for d, i, m in zip(dias, ingresos, movil)]
+
+    @staticmethod
+    def distribucion_facturas(desde, hasta, cortes=PERCENTILES):
+        """Cantidad, suma, promedio y percentiles del total de las facturas del rango."""
+        # Con Core y sin entidades: pasar por el ORM triplica el costo por fila
+        resultado = db.session.connection().execute(_en_rango(select(Factura.total), desde, hasta))
+        totales = array('d', (t or 0.0 for t in resultado.scalars()))
+        suma = sum(totales)
+        return {'facturas': len(totales), 'ingresos': round(suma, 2),
+                'promedio': round(suma / len(totales), 2) if totales else None,
+                'percentiles': {f'p{c}': None if v is None else round(v, 2)
+                                for c, v in percentiles(totales, cortes).items()}}
+
+    @staticmethod
+    def informe(desde, hasta, limite=LIMITE_DEFECTO, ventana=VENTANA_DEFECTO):
+        """Todos los análisis del rango en un dict, leído de la caché si los datos no cambiaron."""
+        versiones = VersionService.obtener('facturas', 'productos', 'clientes')
+        clave = (f"facturas:analitica:{desde:%Y%m%d}-{hasta:%Y%m%d}:{limite}:{ventana}:"
+                 + '.'.join(str(versiones[e]) for e in sorted(versiones)))
+
+        def calcular():
+            return {'desde': desde.isoformat(), 'hasta': hasta.isoformat(),
+                    'resumen': AnaliticaService.distribucion_facturas(desde, hasta),
+                    'top_productos': AnaliticaService.top_productos(desde, hasta, limite),
+                    'por_tipo_cliente': AnaliticaService.ingresos_por_tipo_cliente(desde, hasta),
+                    'por_categoria': AnaliticaService.ventas_por_categoria(desde, hasta),
+                    'tendencia': AnaliticaService.tendencia(desde, hasta, ventana)}
+        return cacheado(clave, calcular, current_app.config.get('ANALITICA_TTL', TTL_DEFECTO))
@@ -1,12 +1,48 @@
 from inventario.database import db
 from inventario.clientes import Cliente
+from inventario.paginacion import paginar
+from inventario.cache import cacheado, invalidar
+from inventario.seleccion import filas_por_ids
+
+COLUMNAS_ORDEN = {
+    'id': Cliente.id,
+    'nombre': Cliente.nombre,
+    'email': Cliente.email,
+    'tipo': Cliente.tipo
+}
+
+# Campos que la API puede devolver (y seleccionar con ?campos=)
+CAMPOS = {
+    'id': Cliente.id,
+    'nombre': Cliente.nombre,
+    'telefono': Cliente.telefono,
+    'email': Cliente.email,
+    'tipo': Cliente.tipo
+}
 
 
 class ClienteService:
 
     @staticmethod
-    def obtener_todos():
-        return Cliente.query.all()
+    def obtener_todos(pagina=None, por_pagina=20, orden='id', direccion='asc'):
+        """Sin pagina retorna la lista completa; con pagina retorna un objeto Pagina."""
+        if pagina is None:
+            return Cliente.query.all()
+        return paginar(Cliente.query, COLUMNAS_ORDEN, pagina, por_pagina,
+                       orden, direccion, modelo=Cliente)
+
+    @staticmethod
+    def obtener_opciones():
+        """Clientes para el selector de la factura (id, nombre, tipo), en caché."""
+        def calcular():
+            rows = db.session.query(Cliente.id, Cliente.nombre, Cliente.tipo).order_by(Cliente.id)
+            return [dict(r._mapping) for r in rows]
+        return cacheado('clientes:opciones', calcular)
+
+    @staticmethod
+    def obtener_por_ids(ids, campos=None):
+        """Varios clientes en una consulta, como dicts con solo los campos pedidos."""
+        return filas_por_ids(db.session, CAMPOS, ids, campos)
 
     @staticmethod
     def obtener_por_id(cliente_id):
@@ -17,6 +53,7 @@ class ClienteService:
         cliente = Cliente(nombre=nombre, telefono=telefono, email=email, tipo=tipo)
         db.session.add(cliente)
         db.session.commit()
+        invalidar('clientes')
         return cliente
 
     @staticmethod
@@ -27,6 +64,7 @@ class ClienteService:
         for k, v in kwargs.items():
             setattr(cliente, k, v)
         db.session.commit()
+        invalidar('clientes')
         return cliente
 
     @staticmethod
@@ -36,4 +74,5 @@ class ClienteService:
             return False
         db.session.delete(cliente)
         db.session.commit()
+        invalidar('clientes')
         return True
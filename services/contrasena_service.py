@@ -0,0 +1,198 @@
+"""
+Hash de contraseñas fuera del hilo de la petición y límite de intentos de login.
+
+Los hashes (pbkdf2, scrypt) se calculan en un pool de CONTRASENA_HILOS hilos
+por worker. hashlib libera el GIL mientras calcula, así que un pico de
+logins al inicio del turno ocupa como máximo esos hilos y las demás
+peticiones siguen atendiéndose. Si el pool no entrega el resultado en
+CONTRASENA_ESPERA segundos se lanza ServicioOcupadoError y la ruta pide
+reintentar; el cálculo pendiente se cancela si todavía no empezó.
+
+Al iniciar sesión, una contraseña guardada en texto plano (usuarios
+anteriores) o con un método o costo distinto de CONTRASENA_METODO se vuelve
+a guardar con el método actual, sin que el usuario haga nada.
+
+Cada cuenta admite LOGIN_INTENTOS intentos fallidos en LOGIN_VENTANA
+segundos; después autenticar() lanza DemasiadosIntentosError sin calcular
+ningún hash, lo que acota la CPU que se puede gastar por cuenta. El
+registro de intentos está en la memoria de cada worker.
+
+Configuración (app.config):
+    CONTRASENA_METODO  método de werkzeug.security, p. ej. 'pbkdf2:sha256:600000'
+                       o 'scrypt' ('pbkdf2:sha256', con las iteraciones por defecto de werkzeug)
+    CONTRASENA_HILOS   hilos de hash por worker (2)
+    CONTRASENA_ESPERA  segundos máximos de espera por un hash (10)
+    LOGIN_INTENTOS     intentos fallidos permitidos por cuenta (5)
+    LOGIN_VENTANA      segundos en que se cuentan los intentos (300)
+"""
+
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as EsperaAgotada
+from functools import lru_cache
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+from inventario.database import db
+from inventario.usuarios import Usuario
+
+METODO_DEFECTO = 'pbkdf2:sha256'
+HILOS_DEFECTO = 2
+ESPERA_DEFECTO = 10
+INTENTOS_DEFECTO = 5
+VENTANA_DEFECTO = 300
+# Cuentas distintas recordadas por el límite de intentos
+CAPACIDAD_INTENTOS = 10_000
+# Prefijos de los hashes de werkzeug; cualquier otro valor guardado es texto plano
+PREFIJOS_HASH = ('pbkdf2:', 'scrypt:')
+
+
+class ServicioOcupadoError(RuntimeError):
+    """El pool de hash no respondió a tiempo."""
+
+
+class DemasiadosIntentosError(Exception):
+    """La cuenta superó los intentos fallidos permitidos."""
+
+    def __init__(self, segundos):
+        self.segundos = segundos
+        super().__init__(f'Demasiados intentos fallidos. Intente de nuevo en {segundos} segundos.')
+
+
+class LimiteIntentos:
+    """Intentos fallidos recientes por clave, con capacidad acotada (LRU). Seguro entre hilos."""
+
+    def __init__(self, intentos, ventana, capacidad=CAPACIDAD_INTENTOS):
+        self.intentos = intentos
+        self.ventana = ventana
+        self.capacidad = capacidad
+        self._fallos = OrderedDict()  # clave -> [tiempos de los fallos]
+        self._candado = threading.Lock()
+
+    def _recientes(self, clave, ahora):
+        fallos = [t for t in self._fallos.get(clave, ()) if t > ahora - self.ventana]
+        if fallos:
+            self._fallos[clave] = fallos
+        else:
+            self._fallos.pop(clave, None)
+        return fallos
+
+    def espera(self, clave):
+        """Segundos que faltan para volver a intentar (0 si puede intentar ya)."""
+        ahora = time.monotonic()
+        with self._candado:
+            fallos = self._recientes(clave, ahora)
+        if len(fallos) < self.intentos:
+            return 0
+        return max(int(fallos[-self.intentos] + self.ventana - ahora) + 1, 1)
+
+    def fallo(self, clave):
+        ahora = time.monotonic()
+        with self._candado:
+            self._recientes(clave, ahora)
+            self._fallos.setdefault(clave, []).append(ahora)
+            self._fallos.move_to_end(clave)
+            while len(self._fallos) > self.capacidad:
+                self._fallos.popitem(last=False)
+
+    def exito(self, clave):
+        with self._candado:
+            self._fallos.pop(clave, None)
+
+
+_ejecutores = {}
+_limites = {}
+_candado_globales = threading.Lock()
+
+
+def _config(clave, defecto):
+    return current_app.config.get(clave, defecto)
+
+
+def _ejecutor():
+    app = current_app._get_current_object()
+    with _candado_globales:
+        if id(app) not in _ejecutores:
+            _ejecutores[id(app)] = ThreadPoolExecutor(
+                max_workers=_config('CONTRASENA_HILOS', HILOS_DEFECTO), thread_name_prefix='contrasena')
+        return _ejecutores[id(app)]
+
+
+def obtener_limite():
+    app = current_app._get_current_object()
+    with _candado_globales:
+        if id(app) not in _limites:
+            _limites[id(app)] = LimiteIntentos(_config('LOGIN_INTENTOS', INTENTOS_DEFECTO),
+                                               _config('LOGIN_VENTANA', VENTANA_DEFECTO))
+        return _limites[id(app)]
+
+
+def _en_pool(funcion, *args):
+    futuro = _ejecutor().submit(funcion, *args)
+    try:
+        return futuro.result(timeout=_config('CONTRASENA_ESPERA', ESPERA_DEFECTO))
+    except EsperaAgotada:
+        futuro.cancel()
+        raise ServicioOcupadoError('El servidor está ocupado, intente de nuevo en unos segundos.')
+
+
+@lru_cache(maxsize=8)
+def _metodo_completo(metodo):
+    """Método con sus parámetros tal como queda en el hash ('pbkdf2:sha256' -> 'pbkdf2:sha256:1000000')."""
+    return generate_password_hash('', method=metodo).split('$', 1)[0]
+
+
+def es_hash(guardada):
+    return guardada.startswith(PREFIJOS_HASH)
+
+
+class ContrasenaService:
+
+    @staticmethod
+    def generar(contrasena):
+        """Hash de la contraseña con CONTRASENA_METODO, calculado en el pool."""
+        return _en_pool(generate_password_hash, contrasena, _config('CONTRASENA_METODO', METODO_DEFECTO))
+
+    @staticmethod
+    def necesita_rehash(guardada):
+        """True si la contraseña guardada es texto plano o usa otro método o costo."""
+        if not es_hash(guardada):
+            return True
+        metodo = _config('CONTRASENA_METODO', METODO_DEFECTO)
+        return guardada.split('$', 1)[0] != _metodo_completo(metodo)
+
+    @staticmethod
+    def verificar(guardada, contrasena):
+        """Compara la contraseña con la guardada (hash o texto plano anterior)."""
+        if not es_hash(guardada):
+            return hmac.compare_digest(guardada.encode(), contrasena.encode())
+        return _en_pool(check_password_hash, guardada, contrasena)
+
+    @staticmethod
+    def autenticar(email, contrasena):
+        """Usuario con ese email y contraseña, o None.
+
+        Lanza DemasiadosIntentosError si la cuenta superó LOGIN_INTENTOS (sin
+        calcular el hash) y ServicioOcupadoError si el pool no responde. Con
+        la contraseña correcta la vuelve a guardar si necesita_rehash.
+        """
+        limite = obtener_limite()
+        clave = email.strip().lower()
+        espera = limite.espera(clave)
+        if espera:
+            raise DemasiadosIntentosError(espera)
+
+        usuario = Usuario.query.filter_by(email=email).first()
+        if usuario is None or not ContrasenaService.verificar(usuario.password, contrasena):
+            limite.fallo(clave)
+            return None
+        limite.exito(clave)
+
+        if ContrasenaService.necesita_rehash(usuario.password):
+            try:
+                usuario.password = ContrasenaService.generar(contrasena)
+                db.session.commit()
+            except ServicioOcupadoError:
+                db.session.rollback()  # se vuelve a intentar en el próximo login
+        return usuario
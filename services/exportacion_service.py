@@ -0,0 +1,127 @@
+"""
+Exportación en streaming de productos, clientes y facturas.
+
+Las filas se leen con un cursor del lado del servidor (yield_per) y se
+codifican a medida que se envían, sin armar la respuesta completa en memoria
+ni escribir archivos temporales. Todas las consultas se ordenan por id, de
+modo que una descarga interrumpida se retoma con despues_de=<último id>.
+"""
+
+import zlib
+from datetime import timedelta
+from sqlalchemy import select
+from inventario.database import db
+from inventario.productos import Producto
+from inventario.clientes import Cliente
+from inventario.file_persistence import lineas_csv, lineas_ndjson, lineas_txt
+from models.factura import Factura, FacturaDetalle
+
+FORMATOS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'txt': 'text/plain'
+}
+
+TAMANO_LOTE = 1000
+TAMANO_FRAGMENTO = 64 * 1024
+
+
+def _recorrer(consulta, columnas):
+    resultado = db.session.execute(consulta.execution_options(yield_per=TAMANO_LOTE))
+    for fila in resultado:
+        yield dict(zip(columnas, fila))
+
+
+def filas_productos(categoria=None, despues_de=None):
+    columnas = ['id', 'nombre', 'categoria', 'descripcion', 'precio', 'stock', 'fecha_creacion']
+    consulta = select(*(getattr(Producto, c) for c in columnas)).order_by(Producto.id)
+    if categoria:
+        consulta = consulta.where(Producto.categoria == categoria)
+    if despues_de:
+        consulta = consulta.where(Producto.id > despues_de)
+    return columnas, _recorrer(consulta, columnas)
+
+
+def filas_clientes(despues_de=None):
+    columnas = ['id', 'nombre', 'telefono', 'email', 'tipo']
+    consulta = select(*(getattr(Cliente, c) for c in columnas)).order_by(Cliente.id)
+    if despues_de:
+        consulta = consulta.where(Cliente.id > despues_de)
+    return columnas, _recorrer(consulta, columnas)
+
+
+def _filtrar_fechas(consulta, desde, hasta):
+    if desde:
+        consulta = consulta.where(Factura.fecha >= desde)
+    if hasta:
+        # hasta es inclusivo: se incluye todo ese día
+        consulta = consulta.where(Factura.fecha < hasta + timedelta(days=1))
+    return consulta
+
+
+def filas_facturas(desde=None, hasta=None, despues_de=None):
+    columnas = ['id', 'fecha', 'cliente_id', 'cliente_nombre', 'estado', 'total']
+    consulta = (select(Factura.id, Factura.fecha, Factura.cliente_id, Cliente.nombre,
+                       Factura.estado, Factura.total)
+                .join(Cliente, Cliente.id == Factura.cliente_id)
+                .order_by(Factura.id))
+    consulta = _filtrar_fechas(consulta, desde, hasta)
+    if despues_de:
+        consulta = consulta.where(Factura.id > despues_de)
+    return columnas, _recorrer(consulta, columnas)
+
+
+def filas_detalles(desde=None, hasta=None, categoria=None, despues_de=None):
+    """Líneas de factura con la fecha de la factura y el nombre del producto."""
+    columnas = ['id', 'factura_id', 'fecha', 'producto_id', 'producto_nombre', 'categoria',
+                'cantidad', 'precio_unitario', 'subtotal']
+    consulta = (select(FacturaDetalle.id, FacturaDetalle.factura_id, Factura.fecha,
+                       FacturaDetalle.producto_id, Producto.nombre, Producto.categoria,
+                       FacturaDetalle.cantidad, FacturaDetalle.precio_unitario,
+                       FacturaDetalle.subtotal)
+                .join(Factura, Factura.id == FacturaDetalle.factura_id)
+                .join(Producto, Producto.id == FacturaDetalle.producto_id)
+                .order_by(FacturaDetalle.id))
+    consulta = _filtrar_fechas(consulta, desde, hasta)
+    if categoria:
+        consulta = consulta.where(Producto.categoria == categoria)
+    if despues_de:
+        consulta = consulta.where(FacturaDetalle.id > despues_de)
+    return columnas, _recorrer(consulta, columnas)
+
+
+def _serializable(filas):
+    for fila in filas:
+        yield {k: v.isoformat() if hasattr(v, 'isoformat') else v for k, v in fila.items()}
+
+
+def codificar(filas, columnas, formato):
+    """Convierte las filas en líneas de texto del formato pedido."""
+    if formato == 'csv':
+        return lineas_csv(filas, columnas)
+    if formato == 'ndjson':
+        return lineas_ndjson(_serializable(filas))
+    return lineas_txt(filas, delimiter='|')
+
+
+def agrupar(lineas, tamano=TAMANO_FRAGMENTO):
+    """Junta líneas en fragmentos de ~tamano bytes para no escribir al socket línea por línea."""
+    bloque, acumulado = [], 0
+    for linea in lineas:
+        datos = linea.encode('utf-8')
+        bloque.append(datos)
+        acumulado += len(datos)
+        if acumulado >= tamano:
+            yield b''.join(bloque)
+            bloque, acumulado = [], 0
+    if bloque:
+        yield b''.join(bloque)
+
+
+def comprimir_gzip(fragmentos, nivel=6):
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)  # 31 = formato gzip
+    for fragmento in fragmentos:
+        comprimido = compresor.compress(fragmento)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
@@ -1,49 +1,199 @@
+from collections import defaultdict
+from sqlalchemy import insert, update
+from sqlalchemy.orm import joinedload, selectinload
 from inventario.database import db
 from models.factura import Factura, FacturaDetalle
 from inventario.productos import Producto
+from inventario.clientes import Cliente
+from inventario.paginacion import paginar_keyset
+from services.resumen_service import aplicar_deltas
+from services.version_service import incrementar_al_confirmar
+from services.sincronizacion_service import registrar_cambios
+from services.reposicion_service import registrar_consumo
+from inventario.cache import invalidar
+
+
+class StockInsuficienteError(ValueError):
+    """La cantidad pedida de un producto supera su stock disponible."""
+
+    def __init__(self, producto, disponible, solicitado):
+        self.producto = producto
+        self.disponible = disponible
+        self.solicitado = solicitado
+        super().__init__(f'Stock insuficiente para "{producto}": '
+                         f'disponible {disponible}, solicitado {solicitado}.')
 
 
 class FacturaService:
 
     @staticmethod
-    def obtener_todas():
-        return Factura.query.order_by(Factura.fecha.desc()).all()
+    def opciones_carga(detalles=False, estrategia='selectin'):
+        """Opciones de carga para evitar una consulta por factura y por línea.
+
+        El cliente siempre se trae con JOIN. Con detalles=True las líneas se
+        cargan con selectinload (una consulta extra para todas las facturas) o
+        joinedload (en la misma consulta), junto con su producto.
+        """
+        opciones = [joinedload(Factura.cliente)]
+        if detalles:
+            cargar = joinedload if estrategia == 'joined' else selectinload
+            opciones.append(cargar(Factura.detalles).joinedload(FacturaDetalle.producto))
+        return opciones
 
     @staticmethod
-    def obtener_por_id(factura_id):
-        return Factura.query.get(factura_id)
+    def obtener_todas(cursor=None, por_pagina=None, direccion='desc', detalles=False, estrategia='selectin'):
+        """Sin por_pagina retorna la lista completa ordenada por fecha.
+
+        Con por_pagina usa paginación por cursor sobre (fecha, id), ya que la
+        tabla de facturas es la que más crece.
+        """
+        query = Factura.query.options(*FacturaService.opciones_carga(detalles, estrategia))
+        if por_pagina is None:
+            return query.order_by(Factura.fecha.desc()).all()
+        return paginar_keyset(query, Factura.fecha, Factura.id, cursor,
+                              por_pagina, direccion, modelo=Factura)
 
     @staticmethod
-    def crear(cliente_id, items):
+    def obtener_resumenes(cursor=None, por_pagina=20, direccion='desc'):
+        """Página de facturas para listados: solo columnas de la factura y el nombre del cliente.
+
+        No construye entidades Factura ni toca sus detalles. Retorna una Pagina de dicts.
         """
-        items: lista de dicts con {producto_id, cantidad}
-        Descuenta stock automáticamente.
+        query = (db.session.query(Factura.id, Factura.fecha, Factura.estado, Factura.total,
+                                  Factura.cliente_id, Cliente.nombre.label('cliente_nombre'))
+                 .outerjoin(Cliente, Cliente.id == Factura.cliente_id))
+        pagina = paginar_keyset(query, Factura.fecha, Factura.id, cursor,
+                                por_pagina, direccion, modelo=Factura)
+        return pagina.map(Factura.resumen_desde_fila)
+
+    @staticmethod
+    def obtener_por_id(factura_id, detalles=True, estrategia='selectin'):
+        return (Factura.query.options(*FacturaService.opciones_carga(detalles, estrategia))
+                .filter_by(id=factura_id).first())
+
+    @staticmethod
+    def obtener_por_ids(ids):
+        """Varias facturas con cliente y líneas, en tres consultas en total."""
+        if not ids:
+            return []
+        return (Factura.query.options(*FacturaService.opciones_carga(detalles=True))
+                .filter(Factura.id.in_(set(ids))).order_by(Factura.id).all())
+
+    @staticmethod
+    def registrar(cliente_id, items):
+        """Registra la factura en la transacción en curso, sin confirmarla (ver crear).
+
+        Lo usan crear (una factura por transacción) y la ingesta por lotes
+        (services/ingesta_service.py), que agrupa varias en un solo commit.
+        Si algún producto no alcanza lanza StockInsuficienteError; deshacer
+        la transacción o el savepoint queda a cargo de quien llama.
         """
+        cantidades = {}
+        for item in items:
+            producto_id = int(item['producto_id'])
+            cantidades[producto_id] = cantidades.get(producto_id, 0) + int(item['cantidad'])
+
+        productos = {
+            pid: (precio, nombre, categoria) for pid, precio, nombre, categoria in
+            db.session.query(Producto.id, Producto.precio, Producto.nombre, Producto.categoria)
+            .filter(Producto.id.in_(cantidades)).all()
+        }
+        lineas = [item for item in items if int(item['producto_id']) in productos]
+        if not lineas:
+            raise ValueError('La factura no tiene productos válidos.')
+
         factura = Factura(cliente_id=cliente_id)
         db.session.add(factura)
         db.session.flush()  # obtener factura.id antes del commit
 
-        for item in items:
-            producto = Producto.query.get(item['producto_id'])
-            if not producto:
+        # Antes del stock de producto: mismo orden de bloqueos que ReposicionService.recalcular
+        registrar_consumo(db.session.connection(), {pid: c for pid, c in cantidades.items() if pid in productos})
+
+        # El UPDATE de stock no pasa por el ORM: la diferencia del resumen se aplica aquí
+        deltas_resumen = defaultdict(lambda: [0, 0, 0.0])
+        # Orden fijo por id para que transacciones concurrentes tomen los bloqueos en el mismo orden
+        for producto_id in sorted(cantidades):
+            cantidad = cantidades[producto_id]
+            if producto_id not in productos or cantidad <= 0:
                 continue
-            cantidad = int(item['cantidad'])
-            subtotal = round(producto.precio * cantidad, 2)
-            detalle = FacturaDetalle(
-                factura_id=factura.id,
-                producto_id=producto.id,
-                cantidad=cantidad,
-                precio_unitario=producto.precio,
-                subtotal=subtotal
+            resultado = db.session.execute(
+                update(Producto)
+                .where(Producto.id == producto_id, Producto.stock >= cantidad)
+                .values(stock=Producto.stock - cantidad)
+                .execution_options(synchronize_session=False)
             )
-            db.session.add(detalle)
-            producto.stock = max(0, producto.stock - cantidad)
+            if resultado.rowcount != 1:
+                disponible = db.session.query(Producto.stock).filter_by(id=producto_id).scalar()
+                raise StockInsuficienteError(productos[producto_id][1], disponible or 0, cantidad)
+            precio, _, categoria = productos[producto_id]
+            deltas_resumen[categoria][1] -= cantidad
+            deltas_resumen[categoria][2] -= precio * cantidad
+        aplicar_deltas(db.session.connection(), deltas_resumen)
+        incrementar_al_confirmar(db.session, 'productos')
+        # Los terminales reciben el stock nuevo en el feed de cambios
+        registrar_cambios(db.session.connection(), [pid for pid in cantidades
+                                                    if pid in productos and cantidades[pid] > 0])
 
-        db.session.flush()
-        factura.calcular_total()
-        db.session.commit()
+        detalles = []
+        for item in lineas:
+            precio = productos[int(item['producto_id'])][0]
+            cantidad = int(item['cantidad'])
+            detalles.append({
+                'factura_id': factura.id,
+                'producto_id': int(item['producto_id']),
+                'cantidad': cantidad,
+                'precio_unitario': precio,
+                'subtotal': round(precio * cantidad, 2)
+            })
+        db.session.execute(insert(FacturaDetalle), detalles)
+        factura.total = sum(d['subtotal'] for d in detalles)
+        return factura
+
+    @staticmethod
+    def crear(cliente_id, items):
+        """
+        items: lista de dicts con {producto_id, cantidad}
+        Descuenta stock automáticamente con un UPDATE condicional por producto
+        (stock = stock - n WHERE stock >= n), de modo que dos ventas simultáneas
+        no pisan el stock de la otra. Si algún producto no alcanza se deshace
+        toda la factura con StockInsuficienteError.
+        """
+        try:
+            factura = FacturaService.registrar(cliente_id, items)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        invalidar('productos')  # cambió el stock mostrado en el formulario de factura
         return factura
 
+    @staticmethod
+    def crear_lote(facturas):
+        """Crea varias facturas en una llamada. facturas: lista de dicts con cliente_id e items.
+
+        Cada factura es una transacción propia: si una falla por stock, las demás
+        se crean igual. Retorna un resultado por factura, en el mismo orden, con
+        'ok' y el id/total creado o el error.
+        """
+        if not facturas:
+            return []
+        clientes = {cid for (cid,) in db.session.query(Cliente.id)
+                    .filter(Cliente.id.in_({f['cliente_id'] for f in facturas}))}
+        resultados = []
+        for datos in facturas:
+            if datos['cliente_id'] not in clientes:
+                resultados.append({'ok': False, 'error': f"El cliente {datos['cliente_id']} no existe."})
+                continue
+            try:
+                factura = FacturaService.crear(datos['cliente_id'], datos['items'])
+                resultados.append({'ok': True, 'id': factura.id, 'total': factura.total})
+            except StockInsuficienteError as ex:
+                resultados.append({'ok': False, 'error': str(ex), 'producto': ex.producto,
+                                   'disponible': ex.disponible, 'solicitado': ex.solicitado})
+            except ValueError as ex:
+                resultados.append({'ok': False, 'error': str(ex)})
+        return resultados
+
     @staticmethod
     def cambiar_estado(factura_id, estado):
         factura = Factura.query.get(factura_id)
@@ -0,0 +1,303 @@
+"""
+Ingesta de facturas en segundo plano con commits agrupados.
+
+Con FACTURAS_INGESTA activado, facturas.nueva valida el formulario, guarda
+la factura en una cola local (un archivo SQLite aparte, INGESTA_RUTA) y
+responde de inmediato con un número provisional. Encolar no toma el bloqueo
+de escritura de la base principal, así que no compite con las facturas que
+se están registrando.
+
+Un trabajador en segundo plano toma las pendientes en orden de llegada y las
+registra con FacturaService.registrar, hasta INGESTA_TAMANO_LOTE facturas
+por transacción; cada una va en su propio savepoint, de modo que una factura
+sin stock se rechaza sin deshacer las demás. El resultado de cada una se
+guarda en facturas_ingestadas en la misma transacción: si el proceso se
+detiene antes de marcar la cola, al reintentar no se duplica ninguna factura.
+
+Orden: antes de leer la cola, el lote incrementa la versión 'ingesta' en
+version_datos. Ese UPDATE bloquea la fila hasta el commit, así que aunque
+cada worker de la aplicación tenga su trabajador, los lotes se procesan de a
+uno y el stock de cada producto se descuenta en el orden de llegada de las
+facturas a la cola de la máquina.
+
+create_app arranca el trabajador con FACTURAS_INGESTA activo (iniciar_ingesta),
+así que lo que quedó pendiente en la cola al detenerse el proceso se
+registra al volver a arrancar. Si el hilo no sobrevive a un fork (servidor
+con la app precargada), encolar u obtener una pendiente lo vuelve a arrancar.
+
+Configuración (app.config):
+    FACTURAS_INGESTA     activa el modo de ingesta en facturas.nueva (False)
+    INGESTA_RUTA         archivo de la cola (instance/ingesta.db)
+    INGESTA_TAMANO_LOTE  facturas por transacción (50)
+    INGESTA_INTERVALO    segundos entre revisiones de la cola sin avisos (1.0)
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from inventario.cache import invalidar
+from inventario.database import db
+from models.ingesta import FacturaIngestada
+from services.factura_service import FacturaService
+from services.version_service import incrementar
+
+TAMANO_LOTE = 50
+INTERVALO = 1.0
+
+registro = logging.getLogger('inventario.ingesta')
+
+
+def numero_provisional(pendiente_id):
+    return f"P-{pendiente_id:06d}"
+
+
+class ColaFacturas:
+    """Cola durable en un archivo SQLite local, compartida por los procesos de la máquina.
+
+    Cada commit se sincroniza a disco (synchronous=FULL): una vez entregado
+    el número provisional la factura no se pierde aunque se corte la luz.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        with self._conexion() as conexion:
+            conexion.execute('CREATE TABLE IF NOT EXISTS pendientes ('
+                             'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                             'cliente_id INTEGER NOT NULL, items TEXT NOT NULL, '
+                             "estado TEXT NOT NULL DEFAULT 'pendiente', "
+                             'factura_id INTEGER, error TEXT, '
+                             'recibida_en REAL NOT NULL, procesada_en REAL)')
+            conexion.execute('CREATE INDEX IF NOT EXISTS ix_pendientes_estado_id ON pendientes (estado, id)')
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+            conexion = sqlite3.connect(self.ruta, timeout=5)
+            conexion.row_factory = sqlite3.Row
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=FULL')
+            self._local.conexion = conexion
+        return conexion
+
+    def encolar(self, cliente_id, items):
+        """Retorna el id de la factura encolada."""
+        with self._conexion() as conexion:
+            cursor = conexion.execute('INSERT INTO pendientes (cliente_id, items, recibida_en) VALUES (?, ?, ?)',
+                                      (cliente_id, json.dumps(items), time.time()))
+            return cursor.lastrowid
+
+    def pendientes(self, limite):
+        return self._conexion().execute("SELECT id, cliente_id, items FROM pendientes "
+                                        "WHERE estado = 'pendiente' ORDER BY id LIMIT ?", (limite,)).fetchall()
+
+    def marcar(self, resultados):
+        """resultados: lista de (id, factura_id o None, error o None)."""
+        ahora = time.time()
+        with self._conexion() as conexion:
+            conexion.executemany(
+                "UPDATE pendientes SET estado = CASE WHEN ? IS NULL THEN 'rechazada' ELSE 'procesada' END, "
+                "factura_id = ?, error = ?, procesada_en = ? WHERE id = ?",
+                [(factura_id, factura_id, error, ahora, pid) for pid, factura_id, error in resultados])
+
+    def obtener(self, pendiente_id):
+        fila = self._conexion().execute('SELECT * FROM pendientes WHERE id = ?', (pendiente_id,)).fetchone()
+        return dict(fila) if fila else None
+
+    def resumen(self):
+        return dict(self._conexion().execute('SELECT estado, COUNT(*) FROM pendientes GROUP BY estado').fetchall())
+
+    def purgar(self, segundos):
+        """Elimina las ya procesadas hace más de segundos. Retorna el mayor id eliminado (0 si ninguno)."""
+        limite = time.time() - segundos
+        with self._conexion() as conexion:
+            maximo = conexion.execute("SELECT MAX(id) FROM pendientes WHERE estado != 'pendiente' "
+                                      "AND procesada_en < ?", (limite,)).fetchone()[0] or 0
+            conexion.execute("DELETE FROM pendientes WHERE estado != 'pendiente' AND procesada_en < ?", (limite,))
+        return maximo
+
+
+class IngestaService:
+
+    @staticmethod
+    def cola():
+        return obtener_trabajador().cola
+
+    @staticmethod
+    def encolar(cliente_id, items):
+        """Encola una factura ya validada y avisa al trabajador. Retorna el número provisional."""
+        trabajador = obtener_trabajador()
+        pendiente_id = trabajador.cola.encolar(cliente_id, items)
+        trabajador.avisar()
+        return numero_provisional(pendiente_id)
+
+    @staticmethod
+    def obtener(pendiente_id):
+        """Estado de una factura de la cola como dict, o None."""
+        trabajador = obtener_trabajador()
+        trabajador.iniciar()  # quien consulta una pendiente espera que se procese
+        pendiente = trabajador.cola.obtener(pendiente_id)
+        if pendiente is None:
+            return None
+        def formato(marca):
+            return datetime.fromtimestamp(marca).strftime('%Y-%m-%d %H:%M:%S') if marca else ''
+        return {'id': pendiente['id'], 'numero_provisional': numero_provisional(pendiente['id']),
+                'estado': pendiente['estado'], 'factura_id': pendiente['factura_id'],
+                'error': pendiente['error'], 'recibida_en': formato(pendiente['recibida_en']),
+                'procesada_en': formato(pendiente['procesada_en'])}
+
+    @staticmethod
+    def procesar_lote(tamano=TAMANO_LOTE):
+        """Registra hasta tamano facturas de la cola en una transacción. Retorna (procesadas, rechazadas)."""
+        cola = IngestaService.cola()
+        if not cola.pendientes(1):
+            return 0, 0
+
+        resultados = []
+        try:
+            incrementar(db.session.connection(), 'ingesta')  # un lote a la vez (ver docstring del módulo)
+            # Se vuelve a leer con el bloqueo tomado; otro proceso pudo registrar parte de la cola
+            lote = cola.pendientes(tamano)
+            ya_registradas = {f.pendiente_id: f for f in FacturaIngestada.query.filter(
+                FacturaIngestada.pendiente_id.in_([p['id'] for p in lote]))}
+            for pendiente in lote:
+                anterior = ya_registradas.get(pendiente['id'])
+                if anterior is not None:
+                    resultados.append((anterior.pendiente_id, anterior.factura_id, anterior.error))
+                    continue
+                try:
+                    with db.session.begin_nested():
+                        factura = FacturaService.registrar(pendiente['cliente_id'], json.loads(pendiente['items']))
+                    resultado = (pendiente['id'], factura.id, None)
+                except Exception as ex:  # el savepoint ya deshizo solo esta factura
+                    resultado = (pendiente['id'], None, str(ex)[:300])
+                db.session.add(FacturaIngestada(pendiente_id=resultado[0], factura_id=resultado[1],
+                                                error=resultado[2]))
+                resultados.append(resultado)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        cola.marcar(resultados)
+        procesadas = sum(1 for _, factura_id, _ in resultados if factura_id is not None)
+        if procesadas:
+            invalidar('productos')
+        return procesadas, len(resultados) - procesadas
+
+    @staticmethod
+    def procesar_todo(tamano=TAMANO_LOTE):
+        """Procesa lotes hasta vaciar la cola. Retorna (procesadas, rechazadas)."""
+        total = [0, 0]
+        while True:
+            procesadas, rechazadas = IngestaService.procesar_lote(tamano)
+            if not procesadas and not rechazadas:
+                return tuple(total)
+            total[0] += procesadas
+            total[1] += rechazadas
+
+    @staticmethod
+    def purgar(dias=7):
+        """Elimina de la cola y de facturas_ingestadas lo procesado hace más de dias."""
+        maximo = IngestaService.cola().purgar(dias * 86400)
+        eliminadas = (FacturaIngestada.query.filter(FacturaIngestada.pendiente_id <= maximo)
+                      .delete(synchronize_session=False))
+        db.session.commit()
+        return eliminadas
+
+
+class TrabajadorIngesta:
+    """Hilo que vacía la cola: al recibir un aviso o cada INGESTA_INTERVALO segundos."""
+
+    def __init__(self, app, cola, tamano_lote=TAMANO_LOTE, intervalo=INTERVALO):
+        self.app = app
+        self.cola = cola
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self._aviso = threading.Event()
+        self._hilo = None
+        self._candado = threading.Lock()
+
+    def iniciar(self):
+        """Arranca el hilo si no está corriendo (p. ej. en un proceso nuevo o después de un fork)."""
+        with self._candado:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name='ingesta-facturas', daemon=True)
+                self._hilo.start()
+
+    def avisar(self):
+        self.iniciar()
+        self._aviso.set()
+
+    def _bucle(self):
+        while True:
+            self._aviso.wait(self.intervalo)
+            self._aviso.clear()
+            with self.app.app_context():
+                try:
+                    IngestaService.procesar_todo(self.tamano_lote)
+                except Exception:
+                    registro.exception('Error al procesar la cola de facturas; se reintentará.')
+                finally:
+                    db.session.remove()
+
+
+_trabajadores = {}
+_candado_trabajadores = threading.Lock()
+
+
+def obtener_trabajador(app=None):
+    app = app or current_app._get_current_object()
+    with _candado_trabajadores:
+        if id(app) not in _trabajadores:
+            cola = ColaFacturas(app.config.get('INGESTA_RUTA') or os.path.join(app.instance_path, 'ingesta.db'))
+            _trabajadores[id(app)] = TrabajadorIngesta(
+                app, cola, app.config.get('INGESTA_TAMANO_LOTE', TAMANO_LOTE),
+                app.config.get('INGESTA_INTERVALO', INTERVALO))
+        return _trabajadores[id(app)]
+
+
+def iniciar_ingesta(app):
+    """Arranca el trabajador de la app con FACTURAS_INGESTA activo.
+
+    Así las facturas que quedaron pendientes en la cola antes de reiniciar se
+    registran sin esperar a que llegue una nueva.
+    """
+    if app.config.get('FACTURAS_INGESTA'):
+        obtener_trabajador(app).iniciar()
+
+
+# ==================== CLI ====================
+
+ingesta_cli = AppGroup('ingesta', help='Cola de facturas recibidas en modo de ingesta.')
+
+
+@ingesta_cli.command('estado')
+def estado_comando():
+    """Muestra cuántas facturas hay en cada estado."""
+    resumen = IngestaService.cola().resumen()
+    for estado in ('pendiente', 'procesada', 'rechazada'):
+        click.echo(f"{estado:10} {resumen.get(estado, 0)}")
+
+
+@ingesta_cli.command('procesar')
+@click.option('--tamano-lote', type=int, default=None, help='Facturas por transacción.')
+def procesar_comando(tamano_lote):
+    """Registra ahora todas las facturas pendientes."""
+    procesadas, rechazadas = IngestaService.procesar_todo(
+        tamano_lote or current_app.config.get('INGESTA_TAMANO_LOTE', TAMANO_LOTE))
+    click.echo(f"Procesadas: {procesadas}, rechazadas: {rechazadas}")
+
+
+@ingesta_cli.command('purgar')
+@click.option('--dias', type=int, default=7, show_default=True)
+def purgar_comando(dias):
+    """Elimina de la cola las facturas procesadas hace más de --dias."""
+    click.echo(f"Registros eliminados: {IngestaService.purgar(dias)}")
@@ -1,29 +1,99 @@
 from inventario.database import db
 from inventario.productos import Producto
+from inventario.paginacion import paginar
+from inventario.busqueda import obtener_motor
+from inventario.cache import cacheado, invalidar
+from inventario.seleccion import filas_por_ids
+from services.resumen_service import ResumenService
+
+COLUMNAS_ORDEN = {
+    'id': Producto.id,
+    'nombre': Producto.nombre,
+    'categoria': Producto.categoria,
+    'precio': Producto.precio,
+    'stock': Producto.stock
+}
+
+# Campos que la API puede devolver (y seleccionar con ?campos=)
+CAMPOS = {
+    'id': Producto.id,
+    'nombre': Producto.nombre,
+    'categoria': Producto.categoria,
+    'descripcion': Producto.descripcion,
+    'precio': Producto.precio,
+    'stock': Producto.stock,
+    'fecha_creacion': Producto.fecha_creacion,
+    'actualizado_en': Producto.actualizado_en
+}
 
 
 class ProductoService:
 
     @staticmethod
-    def obtener_todos():
-        return Producto.query.all()
+    def obtener_todos(pagina=None, por_pagina=20, orden='id', direccion='asc'):
+        """Sin pagina retorna la lista completa; con pagina retorna un objeto Pagina."""
+        if pagina is None:
+            return Producto.query.all()
+        return paginar(Producto.query, COLUMNAS_ORDEN, pagina, por_pagina,
+                       orden, direccion, modelo=Producto)
 
     @staticmethod
     def obtener_por_id(producto_id):
         return Producto.query.get(producto_id)
 
     @staticmethod
-    def buscar_por_nombre(nombre):
-        return Producto.query.filter(Producto.nombre.ilike(f'%{nombre}%')).all()
+    def obtener_por_ids(ids, campos=None):
+        """Varios productos en una consulta, como dicts con solo los campos pedidos."""
+        return filas_por_ids(db.session, CAMPOS, ids, campos)
+
+    @staticmethod
+    def obtener_stock(ids):
+        """{id: stock} de los productos pedidos (los inexistentes se omiten)."""
+        if not ids:
+            return {}
+        return dict(db.session.query(Producto.id, Producto.stock).filter(Producto.id.in_(set(ids))))
+
+    @staticmethod
+    def buscar_por_nombre(nombre, pagina=None, por_pagina=20, orden='relevancia', direccion='asc'):
+        """Búsqueda indexada por nombre, descripción y categoría, ordenada por relevancia."""
+        return obtener_motor(db, Producto).buscar(nombre, pagina, por_pagina, orden,
+                                                  direccion, columnas=COLUMNAS_ORDEN)
 
     @staticmethod
-    def obtener_por_categoria(categoria):
-        return Producto.query.filter_by(categoria=categoria).all()
+    def obtener_por_categoria(categoria, pagina=None, por_pagina=20):
+        query = Producto.query.filter_by(categoria=categoria).order_by(Producto.id)
+        if pagina is not None:
+            query = query.limit(por_pagina).offset((max(pagina, 1) - 1) * por_pagina)
+        return query.all()
 
     @staticmethod
     def obtener_categorias():
-        rows = db.session.query(Producto.categoria).distinct().all()
-        return [r[0] for r in rows]
+        def calcular():
+            rows = db.session.query(Producto.categoria).distinct().all()
+            return [r[0] for r in rows]
+        return cacheado('productos:categorias', calcular)
+
+    @staticmethod
+    def obtener_opciones():
+        """Productos para el selector de la factura (id, nombre, precio, stock), en caché."""
+        def calcular():
+            rows = db.session.query(Producto.id, Producto.nombre, Producto.precio,
+                                    Producto.stock).order_by(Producto.id)
+            return [dict(r._mapping) for r in rows]
+        return cacheado('productos:opciones', calcular)
+
+    @staticmethod
+    def obtener_estadisticas():
+        """Conteo y valor (precio * stock) por categoría, leídos del resumen incremental."""
+        rows = ResumenService.obtener()
+        conteo = {r.categoria: r.productos for r in rows}
+        return {
+            'total_productos': sum(conteo.values()),
+            'total_unidades': sum(r.unidades for r in rows),
+            'valor_total': float(sum(r.valor for r in rows)),
+            'categorias': list(conteo),
+            'conteo_por_categoria': conteo
+        }
 
     @staticmethod
     def crear(nombre, categoria, descripcion, precio, stock):
@@ -31,6 +101,7 @@ class ProductoService:
                             descripcion=descripcion, precio=precio, stock=stock)
         db.session.add(producto)
         db.session.commit()
+        invalidar('productos')
         return producto
 
     @staticmethod
@@ -41,6 +112,7 @@ class ProductoService:
         for k, v in kwargs.items():
             setattr(producto, k, v)
         db.session.commit()
+        invalidar('productos')
         return producto
 
     @staticmethod
@@ -50,4 +122,5 @@ class ProductoService:
             return False
         db.session.delete(producto)
         db.session.commit()
+        invalidar('productos')
         return True
@@ -1,140 +1,239 @@
-from io import BytesIO
+"""
+Reportes PDF de productos y facturas.
+
+Las filas se leen de la base con un cursor (yield_per) y se reparten en una
+tabla por página con el encabezado repetido; reportlab recibe las tablas a
+medida que las necesita (ver _FlowablesPerezosos), así que el tiempo crece
+en forma lineal con las filas y la memoria de maquetación no depende del
+tamaño del reporte. El PDF se escribe en un SpooledTemporaryFile (o en el
+destino que se indique) en lugar de un BytesIO sin límite.
+"""
+
 from datetime import datetime
+from itertools import chain
+from tempfile import SpooledTemporaryFile
+from sqlalchemy import func, select
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import cm
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.enums import TA_CENTER
+from inventario.database import db
+from inventario.clientes import Cliente
+from models.factura import Factura
+from models.acumulado import VentaDiaria, VentaDiariaCategoria
+from services.exportacion_service import filas_productos
 
+# Filas por tabla: lo que cabe en una página A4 con los márgenes y fuente del reporte
+# (filas de 22 pt en un marco de 716 pt, contando el encabezado). En la primera
+# página el título ocupa el espacio de unas 5 filas.
+FILAS_POR_TABLA = 31
+FILAS_TITULO = 5
+# Hasta este tamaño el PDF se mantiene en memoria; más allá pasa a un archivo temporal
+MEMORIA_MAXIMA = 8 * 1024 * 1024
+TAMANO_LOTE = 1000
 
-def generar_reporte_productos(productos):
-    """Genera un PDF con el listado de productos del inventario."""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4,
-                            rightMargin=2*cm, leftMargin=2*cm,
-                            topMargin=2*cm, bottomMargin=2*cm)
-    styles = getSampleStyleSheet()
-    titulo_style = ParagraphStyle('titulo', parent=styles['Title'],
-                                  alignment=TA_CENTER, fontSize=16, spaceAfter=6)
-    sub_style = ParagraphStyle('sub', parent=styles['Normal'],
-                               alignment=TA_CENTER, fontSize=10, spaceAfter=12, textColor=colors.grey)
-
-    elementos = []
-    elementos.append(Paragraph("Ferretería Senguana", titulo_style))
-    elementos.append(Paragraph("Reporte de Inventario de Productos", sub_style))
-    elementos.append(Paragraph(f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M')}", sub_style))
-    elementos.append(Spacer(1, 0.5*cm))
-
-    # Encabezados
-    data = [["#", "Nombre", "Categoría", "Precio ($)", "Stock", "Descripción"]]
-    for p in productos:
-        data.append([
-            str(p.id),
-            p.nombre,
-            p.categoria,
-            f"{p.precio:.2f}",
-            str(p.stock),
-            (p.descripcion or '')[:40]
-        ])
-
-    tabla = Table(data, colWidths=[1*cm, 4.5*cm, 3*cm, 2.5*cm, 2*cm, 4.5*cm])
-    tabla.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (1, 1), (1, -1), 'LEFT'),
-        ('ALIGN', (5, 1), (5, -1), 'LEFT'),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f4ff')]),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dee2e6')),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('TOPPADDING', (0, 0), (-1, -1), 5),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-    ]))
-    elementos.append(tabla)
-    elementos.append(Spacer(1, 0.5*cm))
-
-    # Totales
-    valor_total = sum(p.precio * p.stock for p in productos)
-    resumen_data = [
-        ["Total de productos:", str(len(productos))],
-        ["Valor total del inventario:", f"${valor_total:.2f}"]
-    ]
-    resumen = Table(resumen_data, colWidths=[6*cm, 4*cm])
-    resumen.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (0, 0), (-1, -1), 3),
-    ]))
-    elementos.append(resumen)
-
-    doc.build(elementos)
-    buffer.seek(0)
-    return buffer
-
-
-def generar_reporte_facturas(facturas):
-    """Genera un PDF con el listado de facturas."""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4,
+# ==================== ESTILOS COMPARTIDOS ====================
+
+_estilos = getSampleStyleSheet()
+ESTILO_TITULO = ParagraphStyle('titulo', parent=_estilos['Title'],
+                               alignment=TA_CENTER, fontSize=16, spaceAfter=6)
+ESTILO_SUBTITULO = ParagraphStyle('sub', parent=_estilos['Normal'],
+                                  alignment=TA_CENTER, fontSize=10, spaceAfter=12, textColor=colors.grey)
+
+ESTILO_TABLA = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f4ff')]),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dee2e6')),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('TOPPADDING', (0, 0), (-1, -1), 5),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+])
+
+ESTILO_RESUMEN = TableStyle([
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+])
+
+ESTILO_TABLA_PRODUCTOS = TableStyle([('ALIGN', (1, 1), (1, -1), 'LEFT'),
+                                     ('ALIGN', (5, 1), (5, -1), 'LEFT')], parent=ESTILO_TABLA)
+ESTILO_TABLA_FACTURAS = TableStyle([('ALIGN', (2, 1), (2, -1), 'LEFT')], parent=ESTILO_TABLA)
+ESTILO_TABLA_VENTAS = TableStyle([('ALIGN', (1, 1), (-1, -1), 'RIGHT')], parent=ESTILO_TABLA)
+
+
+# ==================== CONSTRUCCIÓN POR PARTES ====================
+
+class _FlowablesPerezosos(list):
+    """Lista de flowables que se rellena desde un iterador a medida que reportlab la consume.
+
+    BaseDocTemplate.build solo usa len(), [0], del [0] e insert(0, ...), de
+    modo que basta con mantener unos pocos elementos cargados.
+    """
+
+    def __init__(self, iterador, reserva=2):
+        super().__init__()
+        self._iterador = iterador
+        self._reserva = reserva
+
+    def __len__(self):
+        while list.__len__(self) < self._reserva and self._iterador is not None:
+            siguiente = next(self._iterador, None)
+            if siguiente is None:
+                self._iterador = None
+            else:
+                self.append(siguiente)
+        return list.__len__(self)
+
+
+def _tablas(encabezados, filas, anchos, estilo, filas_por_tabla):
+    """Agrupa las filas en una tabla por página, cada una con su encabezado."""
+    bloque = [encabezados]
+    limite = max(filas_por_tabla - FILAS_TITULO, 1)
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) > limite:
+            yield Table(bloque, colWidths=anchos, style=estilo, repeatRows=1)
+            bloque = [encabezados]
+            limite = filas_por_tabla
+    if len(bloque) > 1:
+        yield Table(bloque, colWidths=anchos, style=estilo, repeatRows=1)
+
+
+def _encabezado(subtitulo):
+    yield Paragraph("Ferretería Senguana", ESTILO_TITULO)
+    yield Paragraph(subtitulo, ESTILO_SUBTITULO)
+    yield Paragraph(f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M')}", ESTILO_SUBTITULO)
+    yield Spacer(1, 0.5*cm)
+
+
+def _resumen(filas_resumen):
+    yield Spacer(1, 0.5*cm)
+    yield Table(filas_resumen(), colWidths=[6*cm, 4*cm], style=ESTILO_RESUMEN)
+
+
+def construir_pdf(flowables, destino=None):
+    """Arma el documento A4 a partir de un iterador de flowables.
+
+    destino puede ser una ruta o un archivo abierto en modo binario; sin
+    destino se usa un SpooledTemporaryFile, que se retorna posicionado al inicio.
+    """
+    salida = destino if destino is not None else SpooledTemporaryFile(max_size=MEMORIA_MAXIMA)
+    doc = SimpleDocTemplate(salida, pagesize=A4,
                             rightMargin=2*cm, leftMargin=2*cm,
                             topMargin=2*cm, bottomMargin=2*cm)
-    styles = getSampleStyleSheet()
-    titulo_style = ParagraphStyle('titulo', parent=styles['Title'],
-                                  alignment=TA_CENTER, fontSize=16, spaceAfter=6)
-    sub_style = ParagraphStyle('sub', parent=styles['Normal'],
-                               alignment=TA_CENTER, fontSize=10, spaceAfter=12, textColor=colors.grey)
-
-    elementos = []
-    elementos.append(Paragraph("Ferretería Senguana", titulo_style))
-    elementos.append(Paragraph("Reporte de Facturas", sub_style))
-    elementos.append(Paragraph(f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M')}", sub_style))
-    elementos.append(Spacer(1, 0.5*cm))
-
-    data = [["#", "Fecha", "Cliente", "Estado", "Total ($)"]]
-    for f in facturas:
-        data.append([
-            str(f.id),
-            f.fecha.strftime('%d/%m/%Y') if f.fecha else '',
-            f.cliente.nombre if f.cliente else '',
-            f.estado,
-            f"{f.total:.2f}"
-        ])
-
-    tabla = Table(data, colWidths=[1.5*cm, 3.5*cm, 5*cm, 3*cm, 3*cm])
-    tabla.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (2, 1), (2, -1), 'LEFT'),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f4ff')]),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dee2e6')),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('TOPPADDING', (0, 0), (-1, -1), 5),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-    ]))
-    elementos.append(tabla)
-    elementos.append(Spacer(1, 0.5*cm))
-
-    total_general = sum(f.total for f in facturas)
-    resumen_data = [
-        ["Total de facturas:", str(len(facturas))],
-        ["Monto total:", f"${total_general:.2f}"]
-    ]
-    resumen = Table(resumen_data, colWidths=[6*cm, 4*cm])
-    resumen.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (0, 0), (-1, -1), 3),
-    ]))
-    elementos.append(resumen)
-
-    doc.build(elementos)
-    buffer.seek(0)
-    return buffer
+    doc.build(_FlowablesPerezosos(iter(flowables)))
+    if destino is None:
+        salida.seek(0)
+    return salida
+
+
+def _recorrer(consulta):
+    return db.session.execute(consulta.execution_options(yield_per=TAMANO_LOTE))
+
+
+# ==================== REPORTES ====================
+
+def generar_reporte_productos(filas=None, totales=None, destino=None, filas_por_tabla=FILAS_POR_TABLA):
+    """Genera un PDF con el listado de productos del inventario.
+
+    filas: iterable de dicts de producto; por defecto se recorre la tabla con un cursor.
+    totales: dict con 'productos' y 'valor' (ResumenService.totales()); si no
+    se entrega se acumula mientras se recorren las filas.
+    """
+    if filas is None:
+        _, filas = filas_productos()
+    acumulado = {'productos': 0, 'valor': 0.0}
+
+    def celdas():
+        for p in filas:
+            acumulado['productos'] += 1
+            acumulado['valor'] += p['precio'] * p['stock']
+            yield [str(p['id']), p['nombre'], p['categoria'], f"{p['precio']:.2f}",
+                   str(p['stock']), (p['descripcion'] or '')[:40]]
+
+    def filas_resumen():
+        datos = totales or acumulado
+        return [["Total de productos:", str(datos['productos'])],
+                ["Valor total del inventario:", f"${datos['valor']:.2f}"]]
+
+    encabezados = ["#", "Nombre", "Categoría", "Precio ($)", "Stock", "Descripción"]
+    anchos = [1*cm, 4.5*cm, 3*cm, 2.5*cm, 2*cm, 4.5*cm]
+    return construir_pdf(chain(
+        _encabezado("Reporte de Inventario de Productos"),
+        _tablas(encabezados, celdas(), anchos, ESTILO_TABLA_PRODUCTOS, filas_por_tabla),
+        _resumen(filas_resumen)), destino)
+
+
+def generar_reporte_facturas(filas=None, destino=None, filas_por_tabla=FILAS_POR_TABLA):
+    """Genera un PDF con el listado de facturas, de la más reciente a la más antigua.
+
+    filas: iterable de filas con id, fecha, cliente_nombre, estado y total; por
+    defecto se recorre la tabla con un cursor sobre el índice (fecha, id).
+    """
+    if filas is None:
+        filas = _recorrer(
+            select(Factura.id, Factura.fecha, Cliente.nombre.label('cliente_nombre'),
+                   Factura.estado, Factura.total)
+            .outerjoin(Cliente, Cliente.id == Factura.cliente_id)
+            .order_by(Factura.fecha.desc(), Factura.id.desc()))
+    acumulado = {'facturas': 0, 'monto': 0.0}
+
+    def celdas():
+        for f in filas:
+            acumulado['facturas'] += 1
+            acumulado['monto'] += f.total or 0
+            yield [str(f.id), f.fecha.strftime('%d/%m/%Y') if f.fecha else '',
+                   f.cliente_nombre or '', f.estado, f"{f.total:.2f}"]
+
+    def filas_resumen():
+        return [["Total de facturas:", str(acumulado['facturas'])],
+                ["Monto total:", f"${acumulado['monto']:.2f}"]]
+
+    encabezados = ["#", "Fecha", "Cliente", "Estado", "Total ($)"]
+    anchos = [1.5*cm, 3.5*cm, 5*cm, 3*cm, 3*cm]
+    return construir_pdf(chain(
+        _encabezado("Reporte de Facturas"),
+        _tablas(encabezados, celdas(), anchos, ESTILO_TABLA_FACTURAS, filas_por_tabla),
+        _resumen(filas_resumen)), destino)
+
+
+def generar_reporte_ventas(destino=None, filas_por_tabla=FILAS_POR_TABLA):
+    """Genera un PDF con las ventas de cada día, del más reciente al más antiguo.
+
+    Lee solo los acumulados diarios (services/acumulado_service.py), no las
+    facturas: el costo depende de los días, no de las líneas vendidas. Los
+    días que todavía no se acumularon no aparecen.
+    """
+    filas = _recorrer(select(VentaDiaria.dia, VentaDiaria.facturas, VentaDiaria.unidades,
+                             VentaDiaria.ingresos).order_by(VentaDiaria.dia.desc()))
+    acumulado = {'dias': 0, 'facturas': 0, 'ingresos': 0.0}
+
+    def celdas():
+        for v in filas:
+            acumulado['dias'] += 1
+            acumulado['facturas'] += v.facturas
+            acumulado['ingresos'] += v.ingresos
+            yield [v.dia.strftime('%d/%m/%Y'), str(v.facturas), str(v.unidades), f"{v.ingresos:.2f}"]
+
+    def filas_resumen():
+        resumen = [["Días con ventas:", str(acumulado['dias'])],
+                   ["Total de facturas:", str(acumulado['facturas'])],
+                   ["Ingresos totales:", f"${acumulado['ingresos']:.2f}"]]
+        por_categoria = (db.session.query(VentaDiariaCategoria.categoria, func.sum(VentaDiariaCategoria.ingresos))
+                         .group_by(VentaDiariaCategoria.categoria)
+                         .order_by(func.sum(VentaDiariaCategoria.ingresos).desc()))
+        return resumen + [[f"{categoria}:", f"${ingresos:.2f}"] for categoria, ingresos in por_categoria]
+
+    encabezados = ["Día", "Facturas", "Unidades", "Ingresos ($)"]
+    anchos = [4*cm, 3*cm, 3*cm, 4*cm]
+    return construir_pdf(chain(
+        _encabezado("Reporte de Ventas por Día"),
+        _tablas(encabezados, celdas(), anchos, ESTILO_TABLA_VENTAS, filas_por_tabla),
+        _resumen(filas_resumen)), destino)
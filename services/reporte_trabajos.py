@@ -0,0 +1,212 @@
+"""
+Reportes PDF generados en segundo plano y guardados según la huella de los datos.
+
+La huella de cada reporte combina la versión de datos de las entidades que
+muestra (services/version_service.py), el número de filas y el id máximo.
+El PDF se guarda como <tipo>-<huella>.pdf en REPORTES_DIRECTORIO: mientras
+los datos no cambien, todas las peticiones (de cualquier worker) reciben el
+archivo ya generado sin volver a construir el documento.
+
+Si el archivo no existe se encola un trabajo en un pool de hilos. La ruta
+espera hasta REPORTES_ESPERA segundos (los reportes pequeños se sirven en
+la misma petición); si no alcanza, responde con una página que consulta el
+estado del trabajo hasta que el PDF está listo.
+
+Configuración (app.config):
+    REPORTES_DIRECTORIO  carpeta de los PDF (instance/reportes)
+    REPORTES_HILOS       hilos de generación por worker (2)
+    REPORTES_ESPERA      segundos que la petición espera al trabajo (2.0)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as EsperaAgotada
+from flask import current_app, jsonify, render_template, send_file, url_for
+from sqlalchemy import func
+from inventario.database import db
+from inventario.productos import Producto
+from models.factura import Factura
+from services.version_service import VersionService
+
+
+def _huella(modelo, *entidades):
+    versiones = VersionService.obtener(*entidades)
+    filas, id_maximo = db.session.query(func.count(modelo.id), func.max(modelo.id)).one()
+    return '-'.join([*(str(versiones[e]) for e in entidades), str(filas), str(id_maximo or 0)])
+
+
+def _generar_productos(destino):
+    # reportlab se importa al generar el primer PDF, no al arrancar el worker
+    from services.reporte_service import generar_reporte_productos
+    from services.resumen_service import ResumenService
+    generar_reporte_productos(totales=ResumenService.totales(), destino=destino)
+
+
+def _generar_facturas(destino):
+    from services.reporte_service import generar_reporte_facturas
+    generar_reporte_facturas(destino=destino)
+
+
+def _generar_ventas(destino):
+    from services.reporte_service import generar_reporte_ventas
+    generar_reporte_ventas(destino=destino)
+
+
+# tipo -> (cálculo de la huella, generación del PDF, nombre de descarga)
+REPORTES = {
+    'productos': (lambda: _huella(Producto, 'productos'), _generar_productos,
+                  'reporte_productos.pdf'),
+    # El reporte de facturas muestra el nombre del cliente: depende también de 'clientes'
+    'facturas': (lambda: _huella(Factura, 'facturas', 'clientes'), _generar_facturas,
+                 'reporte_facturas.pdf'),
+    # Solo lee los acumulados diarios: cambia cuando se ejecutan los acumulados
+    'ventas': (lambda: str(VersionService.obtener('acumulados')['acumulados']), _generar_ventas,
+               'reporte_ventas.pdf'),
+}
+
+
+class Trabajo:
+
+    def __init__(self, tipo, huella, ruta):
+        self.tipo = tipo
+        self.huella = huella
+        self.ruta = ruta
+        self.estado = 'pendiente'  # pendiente, generando, listo, error
+        self.error = None
+        self.segundos = None
+        self.futuro = None
+
+    @property
+    def listo(self):
+        return self.estado == 'listo'
+
+    def esperar(self, segundos):
+        if self.futuro is not None and not self.listo:
+            try:
+                self.futuro.result(timeout=segundos)
+            except EsperaAgotada:
+                pass
+        return self.listo
+
+    def to_dict(self):
+        return {'tipo': self.tipo, 'huella': self.huella, 'estado': self.estado,
+                'error': self.error, 'segundos': self.segundos}
+
+
+class GestorReportes:
+
+    def __init__(self, app, directorio, hilos=2):
+        self.app = app
+        self.directorio = directorio
+        self._ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='reporte')
+        self._trabajos = {}  # (tipo, huella) -> Trabajo
+        self._candado = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+
+    def ruta(self, tipo, huella):
+        return os.path.join(self.directorio, f'{tipo}-{huella}.pdf')
+
+    def solicitar(self, tipo):
+        """Trabajo del reporte con los datos actuales; lo encola si el PDF no existe. Requiere app context."""
+        huella = REPORTES[tipo][0]()
+        with self._candado:
+            trabajo = self._trabajos.get((tipo, huella))
+            if trabajo is not None and trabajo.estado != 'error':
+                return trabajo
+            trabajo = Trabajo(tipo, huella, self.ruta(tipo, huella))
+            if os.path.exists(trabajo.ruta):
+                trabajo.estado = 'listo'
+            else:
+                trabajo.futuro = self._ejecutor.submit(self._ejecutar, trabajo)
+            # Solo se recuerda el último trabajo de cada tipo
+            for clave in [c for c in self._trabajos if c[0] == tipo]:
+                del self._trabajos[clave]
+            self._trabajos[(tipo, huella)] = trabajo
+            return trabajo
+
+    def obtener(self, tipo, huella):
+        """Trabajo conocido por este worker, o uno ya terminado por otro (el PDF existe)."""
+        with self._candado:
+            trabajo = self._trabajos.get((tipo, huella))
+        if trabajo is None and os.path.exists(self.ruta(tipo, huella)):
+            trabajo = Trabajo(tipo, huella, self.ruta(tipo, huella))
+            trabajo.estado = 'listo'
+        return trabajo
+
+    def _ejecutar(self, trabajo):
+        trabajo.estado = 'generando'
+        inicio = time.perf_counter()
+        temporal = f'{trabajo.ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with self.app.app_context():
+            try:
+                REPORTES[trabajo.tipo][1](temporal)
+                os.replace(temporal, trabajo.ruta)  # publicación atómica para los demás workers
+                self._eliminar_anteriores(trabajo)
+                trabajo.estado = 'listo'
+            except Exception as e:
+                trabajo.estado = 'error'
+                trabajo.error = str(e)
+                if os.path.exists(temporal):
+                    os.remove(temporal)
+            finally:
+                trabajo.segundos = round(time.perf_counter() - inicio, 3)
+                db.session.remove()
+
+    def _eliminar_anteriores(self, trabajo):
+        actual = os.path.basename(trabajo.ruta)
+        for nombre in os.listdir(self.directorio):
+            if nombre.startswith(f'{trabajo.tipo}-') and nombre.endswith('.pdf') and nombre != actual:
+                try:
+                    os.remove(os.path.join(self.directorio, nombre))
+                except OSError:
+                    pass  # otro worker ya lo eliminó
+
+
+_gestores = {}
+_candado_gestores = threading.Lock()
+
+
+def obtener_gestor(app=None):
+    app = app or current_app._get_current_object()
+    with _candado_gestores:
+        if id(app) not in _gestores:
+            _gestores[id(app)] = GestorReportes(
+                app,
+                app.config.get('REPORTES_DIRECTORIO') or os.path.join(app.instance_path, 'reportes'),
+                app.config.get('REPORTES_HILOS', 2))
+        return _gestores[id(app)]
+
+
+# ==================== RESPUESTAS PARA LAS RUTAS ====================
+
+def _enviar(tipo, trabajo):
+    return send_file(trabajo.ruta, mimetype='application/pdf',
+                     download_name=REPORTES[tipo][2], as_attachment=False)
+
+
+def responder_reporte(tipo, endpoint_estado, endpoint_descarga):
+    """PDF si está listo (o se genera dentro de REPORTES_ESPERA); si no, la página de espera."""
+    trabajo = obtener_gestor().solicitar(tipo)
+    if trabajo.esperar(current_app.config.get('REPORTES_ESPERA', 2.0)):
+        return _enviar(tipo, trabajo)
+    return render_template('reporte_espera.html', trabajo=trabajo,
+                           url_estado=url_for(endpoint_estado, huella=trabajo.huella),
+                           url_descarga=url_for(endpoint_descarga, huella=trabajo.huella))
+
+
+def responder_estado(tipo, huella, endpoint_descarga):
+    trabajo = obtener_gestor().obtener(tipo, huella)
+    if trabajo is None:
+        return jsonify({'tipo': tipo, 'huella': huella, 'estado': 'desconocido'}), 404
+    datos = trabajo.to_dict()
+    if trabajo.listo:
+        datos['url'] = url_for(endpoint_descarga, huella=huella)
+    return jsonify(datos)
+
+
+def responder_descarga(tipo, huella):
+    trabajo = obtener_gestor().obtener(tipo, huella)
+    if trabajo is None or not trabajo.listo:
+        return jsonify({'tipo': tipo, 'huella': huella, 'estado': 'no disponible'}), 404
+    return _enviar(tipo, trabajo)
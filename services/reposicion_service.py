@@ -0,0 +1,242 @@
+"""
+Puntos de reorden y alertas de stock bajo.
+
+Para cada producto, reposicion_producto guarda el consumo diario promedio
+(unidades vendidas en los últimos REPOSICION_VENTANA días, dividido por la
+ventana), el punto de reorden y el stock:
+
+    punto_reorden = consumo_diario * REPOSICION_DIAS + REPOSICION_MINIMO
+    margen        = stock - punto_reorden
+
+REPOSICION_DIAS cubre el plazo de reposición más un margen de seguridad y
+REPOSICION_MINIMO es el stock mínimo de un producto sin ventas. Un producto
+está bajo su punto de reorden si margen < 0; esos productos se leen del
+índice sobre margen, así que el panel no recorre el catálogo ni las facturas.
+
+Mantenimiento:
+- `flask reposicion recalcular` (cada noche, después de `flask acumulados
+  ejecutar`) rehace la tabla desde las ventas de la ventana, leídas de los
+  acumulados diarios y de las facturas de los días siguientes (ver
+  ventas_por_producto en services/analitica_service.py).
+- FacturaService.registrar llama a registrar_consumo() con las cantidades
+  vendidas: descuenta el stock y suma las unidades al consumo del período.
+- Los cambios de stock por el ORM (alta, edición, baja de productos) se
+  copian en un listener after_flush; la importación masiva llama a
+  sincronizar_stock() explícitamente.
+
+Entre dos recálculos la ventana no se desplaza y las facturas anuladas o
+eliminadas siguen contando como consumo; el recálculo nocturno corrige ambas
+cosas. El recálculo borra y vuelve a llenar la tabla en una transacción; en
+MySQL el DELETE bloquea todas las filas. FacturaService.registrar llama a
+registrar_consumo() antes de descontar el stock de producto, el mismo orden
+en que el recálculo toma los bloqueos (reposicion_producto y luego
+producto): una venta concurrente espera al recálculo y suma su consumo sobre
+las filas nuevas, o el recálculo espera a que la venta confirme y la lee.
+
+Configuración (app.config):
+    REPOSICION_VENTANA   días de historia para el consumo promedio (30)
+    REPOSICION_DIAS      días de cobertura del punto de reorden (14)
+    REPOSICION_MINIMO    stock mínimo de un producto sin ventas (5)
+    REPOSICION_ALERTAS   productos bajo el punto de reorden en el panel (10)
+"""
+
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, event, func, inspect, literal, select
+from sqlalchemy.orm import Session
+from inventario.database import db
+from inventario.productos import Producto
+from models.reposicion import ReposicionProducto
+from services.analitica_service import ventas_por_producto
+
+VENTANA_DEFECTO = 30
+DIAS_DEFECTO = 14
+MINIMO_DEFECTO = 5
+ALERTAS_DEFECTO = 10
+
+
+def _parametros():
+    """(ventana, dias, minimo) de la configuración."""
+    config = current_app.config
+    return (max(int(config.get('REPOSICION_VENTANA', VENTANA_DEFECTO)), 1),
+            int(config.get('REPOSICION_DIAS', DIAS_DEFECTO)),
+            int(config.get('REPOSICION_MINIMO', MINIMO_DEFECTO)))
+
+
+def _actualizar_puntos(conexion, condicion):
+    """Recalcula consumo, punto de reorden y margen de las filas a partir de sus columnas.
+
+    Va en una sentencia aparte de la que cambia stock y unidades: MySQL
+    evalúa las asignaciones de un UPDATE en orden con los valores nuevos.
+    """
+    _, dias, minimo = _parametros()
+    tabla = ReposicionProducto.__table__
+    consumo = tabla.c.unidades_periodo * 1.0 / tabla.c.dias_periodo
+    conexion.execute(tabla.update().where(condicion).values(
+        consumo_diario=consumo,
+        punto_reorden=consumo * dias + minimo,
+        margen=tabla.c.stock - (consumo * dias + minimo)))
+
+
+def registrar_consumo(conexion, cantidades):
+    """Descuenta del stock y suma al consumo las cantidades vendidas {producto_id: cantidad}.
+
+    Llamar antes de descontar el stock de producto (ver docstring del módulo).
+    """
+    cantidades = {pid: c for pid, c in cantidades.items() if c > 0}
+    if not cantidades:
+        return
+    tabla = ReposicionProducto.__table__
+    conexion.execute(
+        tabla.update().where(tabla.c.producto_id == bindparam('id_producto'))
+        .values(stock=tabla.c.stock - bindparam('cantidad'),
+                unidades_periodo=tabla.c.unidades_periodo + bindparam('cantidad')),
+        [{'id_producto': pid, 'cantidad': c} for pid, c in sorted(cantidades.items())])
+    _actualizar_puntos(conexion, tabla.c.producto_id.in_(cantidades))
+
+
+def sincronizar_stock(conexion, ids=None, marca=None):
+    """Copia el stock de producto a reposicion_producto y agrega las filas que falten.
+
+    Con ids, solo esos productos; con marca, los de actualizado_en >= marca
+    (importación en MySQL, sin RETURNING).
+    """
+    if ids is not None:
+        ids = set(ids)
+        if not ids:
+            return
+        productos = Producto.id.in_(ids)
+    else:
+        productos = Producto.actualizado_en >= marca
+    ventana, dias, minimo = _parametros()
+    tabla = ReposicionProducto.__table__
+    conexion.execute(tabla.update()
+                     .where(tabla.c.producto_id.in_(select(Producto.id).where(productos)))
+                     .values(stock=select(Producto.stock).where(Producto.id == tabla.c.producto_id)
+                             .scalar_subquery()))
+    conexion.execute(tabla.update()
+                     .where(tabla.c.producto_id.in_(select(Producto.id).where(productos)))
+                     .values(margen=tabla.c.stock - tabla.c.punto_reorden))
+    # Productos nuevos: sin consumo todavía
+    conexion.execute(tabla.insert().from_select(
+        ['producto_id', 'stock', 'unidades_periodo', 'dias_periodo', 'consumo_diario',
+         'punto_reorden', 'margen', 'recalculado_en'],
+        select(Producto.id, Producto.stock, literal(0), literal(ventana), literal(0.0),
+               literal(float(minimo)), Producto.stock - minimo, literal(datetime.utcnow()))
+        .where(productos, Producto.id.not_in(select(tabla.c.producto_id)))))
+
+
+def eliminar(conexion, ids):
+    tabla = ReposicionProducto.__table__
+    conexion.execute(tabla.delete().where(tabla.c.producto_id.in_(set(ids))))
+
+
+def _despues_de_flush(session, flush_context):
+    cambiados, eliminados = set(), set()
+    for producto in session.new:
+        if isinstance(producto, Producto):
+            cambiados.add(producto.id)
+    for producto in session.dirty:
+        if isinstance(producto, Producto) and inspect(producto).attrs.stock.history.has_changes():
+            cambiados.add(producto.id)
+    for producto in session.deleted:
+        if isinstance(producto, Producto):
+            eliminados.add(producto.id)
+    if cambiados:
+        sincronizar_stock(session.connection(), ids=cambiados)
+    if eliminados:
+        eliminar(session.connection(), eliminados)
+
+
+class ReposicionService:
+
+    @staticmethod
+    def registrar_eventos():
+        """Registrar después de VersionService.registrar_eventos() (ver docstring del módulo)."""
+        if not event.contains(Session, 'after_flush', _despues_de_flush):
+            event.listen(Session, 'after_flush', _despues_de_flush)
+
+    @staticmethod
+    def recalcular():
+        """Rehace reposicion_producto con el consumo de la ventana que termina hoy. Retorna los productos."""
+        ventana, dias, minimo = _parametros()
+        hoy = datetime.utcnow().date()
+        ventas = ventas_por_producto(hoy - timedelta(days=ventana - 1), hoy)
+        vendidas = (select(ventas.c.producto_id, func.sum(ventas.c.unidades).label('unidades'))
+                    .group_by(ventas.c.producto_id).subquery())
+        unidades = func.coalesce(vendidas.c.unidades, 0)
+        consumo = unidades * (1.0 / ventana)
+        punto = consumo * dias + minimo
+        tabla = ReposicionProducto.__table__
+        try:
+            conexion = db.session.connection()
+            conexion.execute(tabla.delete())
+            resultado = conexion.execute(tabla.insert().from_select(
+                ['producto_id', 'stock', 'unidades_periodo', 'dias_periodo', 'consumo_diario',
+                 'punto_reorden', 'margen', 'recalculado_en'],
+                select(Producto.id, Producto.stock, unidades, literal(ventana), consumo, punto,
+                       Producto.stock - punto, literal(datetime.utcnow()))
+                .outerjoin(vendidas, vendidas.c.producto_id == Producto.id)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return resultado.rowcount
+
+    @staticmethod
+    def asegurar():
+        """Calcula la tabla si está vacía pero hay productos (p. ej. tabla recién creada)."""
+        vacio = db.session.query(ReposicionProducto.producto_id).first() is None
+        if vacio and db.session.query(Producto.id).first() is not None:
+            ReposicionService.recalcular()
+
+    @staticmethod
+    def bajo_punto_reorden(limite=None):
+        """Productos con stock bajo su punto de reorden, los de mayor faltante primero.
+
+        Retorna dicts con id, nombre, stock, punto_reorden, consumo_diario y
+        dias_cobertura (stock / consumo diario; None si el producto no tiene ventas).
+        """
+        if limite is None:
+            limite = current_app.config.get('REPOSICION_ALERTAS', ALERTAS_DEFECTO)
+        filas = (db.session.query(ReposicionProducto.producto_id, Producto.nombre, ReposicionProducto.stock,
+                                  ReposicionProducto.punto_reorden, ReposicionProducto.consumo_diario)
+                 .join(Producto, Producto.id == ReposicionProducto.producto_id)
+                 .filter(ReposicionProducto.margen < 0)
+                 .order_by(ReposicionProducto.margen, ReposicionProducto.producto_id)
+                 .limit(limite))
+        return [{
+            'id': producto_id,
+            'nombre': nombre,
+            'stock': stock,
+            'punto_reorden': round(punto, 1),
+            'consumo_diario': round(consumo, 2),
+            'dias_cobertura': round(max(stock, 0) / consumo, 1) if consumo > 0 else None
+        } for producto_id, nombre, stock, punto, consumo in filas]
+
+
+# ==================== CLI ====================
+
+reposicion_cli = AppGroup('reposicion', help='Puntos de reorden y alertas de stock bajo.')
+
+
+@reposicion_cli.command('recalcular')
+def recalcular_comando():
+    """Recalcula consumo y punto de reorden de todos los productos (para cron, cada noche)."""
+    click.echo(f"Productos recalculados: {ReposicionService.recalcular()}")
+
+
+@reposicion_cli.command('listar')
+@click.option('--limite', type=click.IntRange(1), default=50, show_default=True)
+def listar_comando(limite):
+    """Lista los productos bajo su punto de reorden."""
+    productos = ReposicionService.bajo_punto_reorden(limite)
+    if not productos:
+        click.echo('Ningún producto está bajo su punto de reorden.')
+        return
+    for p in productos:
+        cobertura = f"{p['dias_cobertura']} días" if p['dias_cobertura'] is not None else 'sin ventas'
+        click.echo(f"{p['id']:>8}  {p['nombre'][:40]:40}  stock {p['stock']:>6}  "
+                   f"punto {p['punto_reorden']:>8}  cobertura {cobertura}")
@@ -0,0 +1,183 @@
+"""
+Valorización del inventario por categoría mantenida de forma incremental.
+
+Cada flush que inserta, modifica o elimina productos aplica la diferencia
+(productos, unidades, valor) sobre la tabla resumen_categoria, así que leer
+los totales cuesta O(categorías) en lugar de O(productos). Los cambios que no
+pasan por el ORM (descuento de stock en FacturaService.crear, importación
+masiva) aplican sus diferencias explícitamente con aplicar_deltas o reconstruir.
+"""
+
+from collections import defaultdict
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from inventario.database import db, insertar_o_sumar
+from inventario.productos import Producto
+from models.resumen import ResumenCategoria
+
+# Diferencia de valor tolerada por redondeo de punto flotante al verificar
+TOLERANCIA_VALOR = 0.01
+
+
+def _valor_anterior(producto, atributo):
+    """Valor del atributo antes de los cambios pendientes; None si no se conoce."""
+    historial = inspect(producto).attrs[atributo].history
+    if historial.deleted:
+        return historial.deleted[0]
+    if historial.unchanged:
+        return historial.unchanged[0]
+    return None
+
+
+def _sumar(deltas, categoria, productos, unidades, valor):
+    d = deltas[categoria]
+    d[0] += productos
+    d[1] += unidades
+    d[2] += valor
+
+
+def _deltas_de_sesion(session):
+    """Calcula las diferencias por categoría de los productos pendientes de flush.
+
+    Retorna (deltas, reconstruir). reconstruir es True si algún valor anterior
+    no estaba cargado y no se puede calcular la diferencia.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    for producto in session.new:
+        if isinstance(producto, Producto):
+            stock = producto.stock or 0
+            categoria = producto.categoria if producto.categoria is not None else 'General'
+            _sumar(deltas, categoria, 1, stock, (producto.precio or 0) * stock)
+
+    for producto in session.deleted:
+        if isinstance(producto, Producto):
+            categoria = _valor_anterior(producto, 'categoria')
+            stock = _valor_anterior(producto, 'stock')
+            precio = _valor_anterior(producto, 'precio')
+            if None in (categoria, stock, precio):
+                return deltas, True
+            _sumar(deltas, categoria, -1, -stock, -precio * stock)
+
+    for producto in session.dirty:
+        if not isinstance(producto, Producto) or not session.is_modified(producto):
+            continue
+        anterior = [_valor_anterior(producto, a) for a in ('categoria', 'stock', 'precio')]
+        if None in anterior:
+            return deltas, True
+        categoria, stock, precio = anterior
+        _sumar(deltas, categoria, -1, -stock, -precio * stock)
+        _sumar(deltas, producto.categoria, 1, producto.stock, producto.precio * producto.stock)
+    return deltas, False
+
+
+def aplicar_deltas(conexion, deltas):
+    """Suma las diferencias {categoria: [productos, unidades, valor]} a resumen_categoria."""
+    tabla = ResumenCategoria.__table__
+    for categoria, (productos, unidades, valor) in deltas.items():
+        if not productos and not unidades and not valor:
+            continue
+        insertar_o_sumar(conexion, tabla, {'categoria': categoria},
+                         {'productos': productos, 'unidades': unidades, 'valor': valor})
+    if any(productos < 0 for productos, _, _ in deltas.values()):
+        conexion.execute(tabla.delete().where(tabla.c.productos <= 0))
+
+
+def _reconstruir(conexion):
+    tabla = ResumenCategoria.__table__
+    conexion.execute(tabla.delete())
+    conexion.execute(tabla.insert().from_select(
+        ['categoria', 'productos', 'unidades', 'valor'],
+        db.select(Producto.categoria, func.count(Producto.id),
+                  func.coalesce(func.sum(Producto.stock), 0),
+                  func.coalesce(func.sum(Producto.precio * Producto.stock), 0))
+        .group_by(Producto.categoria)
+    ))
+
+
+def _despues_de_flush(session, flush_context):
+    deltas, reconstruir = _deltas_de_sesion(session)
+    if reconstruir:
+        _reconstruir(session.connection())
+    elif deltas:
+        aplicar_deltas(session.connection(), deltas)
+
+
+class ResumenService:
+
+    @staticmethod
+    def registrar_eventos():
+        if not event.contains(Session, 'after_flush', _despues_de_flush):
+            event.listen(Session, 'after_flush', _despues_de_flush)
+
+    @staticmethod
+    def obtener():
+        """Filas de resumen_categoria ordenadas por categoría."""
+        return ResumenCategoria.query.order_by(ResumenCategoria.categoria).all()
+
+    @staticmethod
+    def totales():
+        """Totales generales (productos, unidades, valor) sumando las categorías."""
+        fila = db.session.query(
+            func.coalesce(func.sum(ResumenCategoria.productos), 0),
+            func.coalesce(func.sum(ResumenCategoria.unidades), 0),
+            func.coalesce(func.sum(ResumenCategoria.valor), 0)
+        ).one()
+        return {'productos': int(fila[0]), 'unidades': int(fila[1]), 'valor': float(fila[2])}
+
+    @staticmethod
+    def reconstruir(commit=True):
+        """Recalcula el resumen completo desde la tabla producto."""
+        _reconstruir(db.session.connection())
+        if commit:
+            db.session.commit()
+
+    @staticmethod
+    def asegurar():
+        """Reconstruye el resumen si está vacío pero hay productos (p. ej. tabla recién creada)."""
+        vacio = db.session.query(ResumenCategoria.categoria).first() is None
+        if vacio and db.session.query(Producto.id).first() is not None:
+            ResumenService.reconstruir()
+
+    @staticmethod
+    def verificar():
+        """Compara el resumen con un recálculo desde producto. Retorna la lista de diferencias."""
+        reales = {
+            categoria: (productos, int(unidades or 0), float(valor or 0))
+            for categoria, productos, unidades, valor in db.session.query(
+                Producto.categoria, func.count(Producto.id), func.sum(Producto.stock),
+                func.sum(Producto.precio * Producto.stock)
+            ).group_by(Producto.categoria)
+        }
+        guardados = {r.categoria: (r.productos, r.unidades, r.valor) for r in ResumenService.obtener()}
+        diferencias = []
+        for categoria in sorted(set(reales) | set(guardados)):
+            real = reales.get(categoria, (0, 0, 0.0))
+            guardado = guardados.get(categoria, (0, 0, 0.0))
+            if (real[0] != guardado[0] or real[1] != guardado[1]
+                    or abs(real[2] - guardado[2]) > TOLERANCIA_VALOR):
+                diferencias.append({'categoria': categoria, 'esperado': real, 'guardado': guardado})
+        return diferencias
+
+
+resumen_cli = AppGroup('resumen', help='Resumen de inventario por categoría.')
+
+
+@resumen_cli.command('reconstruir')
+def reconstruir_comando():
+    """Recalcula resumen_categoria desde la tabla producto."""
+    ResumenService.reconstruir()
+    click.echo('Resumen reconstruido.')
+
+
+@resumen_cli.command('verificar')
+def verificar_comando():
+    """Informa las categorías cuyo resumen no coincide con los productos."""
+    diferencias = ResumenService.verificar()
+    if not diferencias:
+        click.echo('El resumen es consistente.')
+        return
+    for d in diferencias:
+        click.echo(f"{d['categoria']}: esperado {d['esperado']}, guardado {d['guardado']}")
+    raise SystemExit(1)
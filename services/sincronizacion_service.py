@@ -0,0 +1,183 @@
+"""
+Sincronización por deltas del catálogo de productos para terminales sin conexión.
+
+Cada alta, modificación o baja de un producto agrega una fila a
+cambios_producto con una secuencia creciente. Un terminal descarga el
+catálogo una vez (desde=0) y luego pide solo los cambios posteriores a la
+última secuencia recibida: el costo depende de los cambios, no del tamaño
+del catálogo. Las bajas se entregan como lápidas.
+
+- Las escrituras del ORM se registran en un listener after_flush.
+- Las escrituras con Core (descuento de stock en FacturaService.crear,
+  importación masiva) llaman a registrar_cambios() explícitamente.
+
+En MySQL dos transacciones pueden confirmar en otro orden que el de sus
+secuencias: mientras la de la secuencia 10 sigue abierta, la 11 ya es
+visible. Para que un cursor no salte la 10, el feed se detiene en el primer
+hueco de la secuencia si el cambio que le sigue tiene menos de
+SINCRONIZACION_ESPERA segundos; pasado ese tiempo el hueco se da por una
+transacción revertida (o por una compactación) y se entrega lo que sigue.
+La espera debe superar la duración de la transacción de escritura más
+larga. En SQLite las escrituras ya van de a una y no quedan huecos abiertos.
+
+Configuración (app.config):
+    SINCRONIZACION_ESPERA  segundos que el feed espera a que se llene un hueco (10)
+"""
+
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, func, literal, select
+from sqlalchemy.orm import Session
+from inventario.database import db
+from inventario.productos import Producto
+from inventario.seleccion import filas_por_ids
+from models.cambio import CambioProducto
+from services.producto_service import CAMPOS
+
+LIMITE_DEFECTO = 500
+LIMITE_MAXIMO = 5000
+ESPERA_DEFECTO = 10
+
+
+def registrar_cambios(conexion, ids, operacion='upsert'):
+    """Agrega un cambio por cada id de producto."""
+    ids = sorted(set(ids))
+    if not ids:
+        return
+    ahora = datetime.utcnow()
+    conexion.execute(CambioProducto.__table__.insert(),
+                     [{'producto_id': i, 'operacion': operacion, 'fecha': ahora} for i in ids])
+
+
+def registrar_cambios_desde(conexion, marca):
+    """Agrega un cambio por cada producto con actualizado_en >= marca.
+
+    Para escrituras masivas donde no se conocen los ids (importación en MySQL,
+    sin RETURNING). Puede incluir productos de otras transacciones; un cambio
+    de más solo hace que el terminal reciba una fila que ya tenía.
+    """
+    tabla = CambioProducto.__table__
+    conexion.execute(tabla.insert().from_select(
+        ['producto_id', 'operacion', 'fecha'],
+        select(Producto.id, literal('upsert'), literal(datetime.utcnow()))
+        .where(Producto.actualizado_en >= marca)))
+
+
+def _hasta_hueco_reciente(filas, desde, limite_fecha):
+    """Las filas anteriores al primer hueco de secuencia cuyo cambio siguiente es posterior a limite_fecha.
+
+    Retorna (filas, cortado).
+    """
+    anterior = desde
+    for i, fila in enumerate(filas):
+        if fila.secuencia != anterior + 1 and fila.fecha > limite_fecha:
+            return filas[:i], True
+        anterior = fila.secuencia
+    return filas, False
+
+
+def _despues_de_flush(session, flush_context):
+    cambios = {'upsert': set(), 'eliminado': set()}
+    for obj in session.new:
+        if isinstance(obj, Producto):
+            cambios['upsert'].add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Producto) and session.is_modified(obj):
+            cambios['upsert'].add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Producto):
+            cambios['eliminado'].add(obj.id)
+    for operacion, ids in cambios.items():
+        if ids:
+            registrar_cambios(session.connection(), ids, operacion)
+
+
+class SincronizacionService:
+
+    @staticmethod
+    def registrar_eventos():
+        if not event.contains(Session, 'after_flush', _despues_de_flush):
+            event.listen(Session, 'after_flush', _despues_de_flush)
+
+    @staticmethod
+    def secuencia_actual():
+        return db.session.query(func.max(CambioProducto.secuencia)).scalar() or 0
+
+    @staticmethod
+    def cambios_desde(desde=0, limite=LIMITE_DEFECTO, campos=None):
+        """Cambios de productos con secuencia mayor que desde.
+
+        Lee hasta limite filas del registro en orden de secuencia (un rango de
+        la clave primaria) y entrega una vez cada producto, con sus datos
+        actuales (solo los campos pedidos), 'secuencia' y 'eliminado': False,
+        o una lápida {'id', 'secuencia', 'eliminado': True} si ya no existe.
+
+        Se detiene antes de un hueco reciente de la secuencia (ver docstring
+        del módulo); los cambios siguientes llegan en una llamada posterior.
+
+        Retorna {'cambios': [...], 'cursor': n, 'mas': bool}; el terminal
+        guarda 'cursor' y lo envía como desde en la siguiente llamada.
+        """
+        limite = min(max(int(limite), 1), LIMITE_MAXIMO)
+        filas = (db.session.query(CambioProducto.secuencia, CambioProducto.producto_id, CambioProducto.fecha)
+                 .filter(CambioProducto.secuencia > desde)
+                 .order_by(CambioProducto.secuencia)
+                 .limit(limite + 1).all())
+        mas = len(filas) > limite
+        espera = timedelta(seconds=current_app.config.get('SINCRONIZACION_ESPERA', ESPERA_DEFECTO))
+        filas, cortado = _hasta_hueco_reciente(filas[:limite], desde, datetime.utcnow() - espera)
+        mas = mas and not cortado
+
+        ultimas = {}  # producto_id -> última secuencia en este tramo
+        for secuencia, producto_id, _ in filas:
+            ultimas.pop(producto_id, None)
+            ultimas[producto_id] = secuencia
+        productos = {p['id']: p for p in filas_por_ids(db.session, CAMPOS, list(ultimas), campos)}
+        cambios = []
+        for producto_id, secuencia in ultimas.items():
+            producto = productos.get(producto_id)
+            if producto is None:
+                cambios.append({'id': producto_id, 'secuencia': secuencia, 'eliminado': True})
+            else:
+                cambios.append({**producto, 'secuencia': secuencia, 'eliminado': False})
+        cursor = filas[-1].secuencia if filas else max(desde, 0)
+        return {'cambios': cambios, 'cursor': cursor, 'mas': mas}
+
+    @staticmethod
+    def compactar():
+        """Elimina los cambios superados por uno posterior del mismo producto.
+
+        El feed entrega los datos actuales de cada producto, así que para
+        cualquier cursor los productos recibidos no cambian (solo hay menos
+        filas que recorrer). Retorna las filas eliminadas.
+        """
+        tabla = CambioProducto.__table__
+        # Tabla derivada: MySQL no permite leer en una subconsulta la tabla del DELETE
+        ultimas = (select(func.max(tabla.c.secuencia).label('secuencia'))
+                   .group_by(tabla.c.producto_id).subquery())
+        ultimas = select(ultimas.c.secuencia)
+        resultado = db.session.execute(tabla.delete().where(tabla.c.secuencia.not_in(ultimas)))
+        db.session.commit()
+        return resultado.rowcount
+
+
+# ==================== CLI ====================
+
+sincronizacion_cli = AppGroup('sincronizacion', help='Registro de cambios de productos para los terminales.')
+
+
+@sincronizacion_cli.command('estado')
+def estado_comando():
+    """Muestra la secuencia actual y el tamaño del registro de cambios."""
+    filas = db.session.query(func.count(CambioProducto.secuencia)).scalar()
+    lapidas = db.session.query(func.count(CambioProducto.secuencia)).filter_by(operacion='eliminado').scalar()
+    click.echo(f"Secuencia actual: {SincronizacionService.secuencia_actual()}")
+    click.echo(f"Cambios registrados: {filas} ({lapidas} bajas)")
+
+
+@sincronizacion_cli.command('compactar')
+def compactar_comando():
+    """Deja solo el último cambio de cada producto."""
+    click.echo(f"Cambios eliminados: {SincronizacionService.compactar()}")
@@ -0,0 +1,99 @@
+"""
+Versión de datos por entidad ('productos', 'clientes', 'facturas', ...).
+
+Un listener after_flush anota en la sesión cada entidad con objetos nuevos,
+modificados o eliminados; las escrituras hechas con Core (descuento de
+stock, importación masiva) las anotan con incrementar_al_confirmar(). Las
+versiones anotadas se incrementan en un listener after_commit, en una
+transacción corta propia, cuando confirma la transacción de afuera (no al
+liberar un savepoint). Así una factura no retiene la fila de versión
+mientras dura su transacción y las ventas de productos distintos no se
+esperan entre sí. Si la transacción se deshace no se incrementa nada.
+
+Entre el commit y el incremento un lector puede ver los datos nuevos con la
+versión anterior y guardarlos en caché con esa clave; el incremento la deja
+sin uso, así que el desfase dura lo que tarda esa transacción corta.
+
+incrementar() actualiza la versión dentro de la transacción en curso y
+retiene la fila hasta el commit. Solo lo usan los procesos que necesitan
+ejecutarse de a uno ('acumulados', 'ingesta'), nunca el camino de las
+ventas. Las filas de cada entidad se crean en la migración 004.
+"""
+
+import logging
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from inventario.database import db, insertar_o_sumar
+from inventario.productos import Producto
+from inventario.clientes import Cliente
+from models.factura import Factura, FacturaDetalle
+from models.version import VersionDatos
+
+ENTIDADES = {
+    Producto: 'productos',
+    Cliente: 'clientes',
+    Factura: 'facturas',
+    FacturaDetalle: 'facturas'
+}
+# Clave de session.info con las entidades a incrementar al confirmar
+PENDIENTES = 'versiones_pendientes'
+
+registro = logging.getLogger('inventario.versiones')
+
+
+def incrementar(conexion, *entidades):
+    """Suma 1 a la versión de cada entidad en la transacción de conexion (creando la fila si no existe)."""
+    tabla = VersionDatos.__table__
+    for entidad in sorted(set(entidades)):
+        insertar_o_sumar(conexion, tabla, {'entidad': entidad}, {'version': 1})
+
+
+def incrementar_al_confirmar(session, *entidades):
+    """Anota las entidades para incrementar su versión cuando la sesión confirme."""
+    session.info.setdefault(PENDIENTES, set()).update(entidades)
+
+
+def _despues_de_flush(session, flush_context):
+    entidades = {ENTIDADES[type(obj)] for obj in session.new | session.deleted if type(obj) in ENTIDADES}
+    entidades.update(ENTIDADES[type(obj)] for obj in session.dirty
+                     if type(obj) in ENTIDADES and session.is_modified(obj))
+    if entidades:
+        incrementar_al_confirmar(session, *entidades)
+
+
+def _despues_de_commit(session):
+    if session.in_nested_transaction():
+        return  # un savepoint: se incrementa cuando confirme la transacción de afuera
+    entidades = session.info.pop(PENDIENTES, None)
+    if not entidades:
+        return
+    try:
+        with session.get_bind().begin() as conexion:
+            incrementar(conexion, *entidades)
+    except Exception:
+        # Los datos ya están confirmados; la versión se pone al día con la próxima escritura
+        registro.exception('No se pudo incrementar la versión de %s', ', '.join(sorted(entidades)))
+
+
+def _despues_de_rollback(session, transaccion_anterior):
+    # Deshacer un savepoint no descarta lo anotado por el resto de la transacción
+    if transaccion_anterior.parent is None:
+        session.info.pop(PENDIENTES, None)
+
+
+class VersionService:
+
+    @staticmethod
+    def registrar_eventos():
+        for nombre, funcion in (('after_flush', _despues_de_flush),
+                                ('after_commit', _despues_de_commit),
+                                ('after_soft_rollback', _despues_de_rollback)):
+            if not event.contains(Session, nombre, funcion):
+                event.listen(Session, nombre, funcion)
+
+    @staticmethod
+    def obtener(*entidades):
+        """Versiones actuales {entidad: version}; 0 si la entidad nunca cambió."""
+        filas = dict(db.session.query(VersionDatos.entidad, VersionDatos.version)
+                     .filter(VersionDatos.entidad.in_(entidades)))
+        return {entidad: filas.get(entidad, 0) for entidad in entidades}
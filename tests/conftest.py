@@ -0,0 +1,52 @@
+"""
+Fixtures compartidas por las pruebas.
+
+La app se importa una vez por sesión apuntando a una base SQLite en un
+archivo temporal (DATABASE_URL), nunca a instance/inventario.db. Se usa un
+archivo y no :memory: para que varios hilos compartan la base como en
+producción.
+"""
+
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    directorio = tmp_path_factory.mktemp('inventario')
+    os.environ['DATABASE_URL'] = f"sqlite:///{directorio / 'pruebas.db'}"
+    import app as modulo_app
+    from conexion.esquema import inicializar_esquema
+
+    aplicacion = modulo_app.app
+    aplicacion.config.update(TESTING=True,
+                             REPORTES_DIRECTORIO=str(directorio / 'reportes'),
+                             INGESTA_RUTA=str(directorio / 'ingesta.db'))
+    with aplicacion.app_context():
+        inicializar_esquema()
+    return aplicacion
+
+
+@pytest.fixture
+def contar_sql(app):
+    """Cuenta las sentencias SQL que ejecuta una llamada (ver inventario.database.contar_consultas).
+
+    Uso:
+        assert contar_sql(lambda: cliente.get('/facturas/')) == 2
+    """
+    from inventario.database import contar_consultas, db
+
+    with app.app_context():
+        engine = db.engine
+
+    def contar(funcion):
+        with contar_consultas(engine) as consultas:
+            funcion()
+        return consultas['total']
+    return contar
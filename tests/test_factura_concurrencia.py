@@ -0,0 +1,57 @@
+"""Ventas simultáneas del mismo producto: el stock no pierde actualizaciones ni queda negativo."""
+
+import threading
+
+from inventario.clientes import Cliente
+from inventario.database import db
+from inventario.productos import Producto
+from models.factura import FacturaDetalle
+from services.factura_service import FacturaService, StockInsuficienteError
+
+HILOS = 8
+VENTAS_POR_HILO = 10
+STOCK_INICIAL = 25
+
+
+def test_ventas_concurrentes_no_pierden_stock(app):
+    with app.app_context():
+        producto = Producto('Producto concurrente', 'Pruebas', 'stock compartido', 2.5, STOCK_INICIAL)
+        cliente = Cliente('Cliente concurrente', '0999999999', 'concurrente@ejemplo.com', 'Particular')
+        db.session.add_all([producto, cliente])
+        db.session.commit()
+        producto_id, cliente_id = producto.id, cliente.id
+
+    barrera = threading.Barrier(HILOS)
+    resultados = []  # list.append es atómico
+
+    def vender():
+        with app.app_context():
+            barrera.wait()  # todos los hilos empiezan a vender a la vez
+            for _ in range(VENTAS_POR_HILO):
+                try:
+                    FacturaService.crear(cliente_id, [{'producto_id': producto_id, 'cantidad': 1}])
+                    resultados.append('vendida')
+                except Exception as e:
+                    resultados.append(e)
+
+    hilos = [threading.Thread(target=vender) for _ in range(HILOS)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    vendidas = resultados.count('vendida')
+    rechazos = [r for r in resultados if r != 'vendida']
+    with app.app_context():
+        stock_final = db.session.get(Producto, producto_id).stock
+        unidades_facturadas = (db.session.query(db.func.sum(FacturaDetalle.cantidad))
+                               .filter(FacturaDetalle.producto_id == producto_id).scalar() or 0)
+
+    assert len(resultados) == HILOS * VENTAS_POR_HILO
+    assert all(isinstance(r, StockInsuficienteError) for r in rechazos), rechazos
+    assert stock_final >= 0
+    assert vendidas + stock_final == STOCK_INICIAL
+    assert unidades_facturadas == vendidas
+    # La demanda supera al stock: todo se vende y el resto se rechaza
+    assert vendidas == STOCK_INICIAL
+    assert len(rechazos) == HILOS * VENTAS_POR_HILO - STOCK_INICIAL
@@ -0,0 +1,77 @@
+"""Número de consultas del listado, el detalle y el reporte de facturas.
+
+Se mide con pocas facturas y con más facturas y líneas: el número de
+consultas debe ser el mismo (sin N+1) e igual al esperado.
+"""
+
+import pytest
+
+from inventario.clientes import Cliente
+from inventario.database import db
+from inventario.productos import Producto
+from services.factura_service import FacturaService
+from services.reporte_service import generar_reporte_facturas
+
+# Página de resúmenes (facturas JOIN cliente) y el total para la paginación
+CONSULTAS_LISTADO = 2
+# Factura JOIN cliente y, con selectinload, todas sus líneas JOIN producto
+CONSULTAS_DETALLE = 2
+# Un solo recorrido con cursor sobre facturas LEFT JOIN cliente
+CONSULTAS_REPORTE = 1
+
+
+@pytest.fixture
+def cliente_web(app, monkeypatch):
+    # Sin login: la carga del usuario no es parte de lo que se mide
+    monkeypatch.setitem(app.config, 'LOGIN_DISABLED', True)
+    return app.test_client()
+
+
+def _crear_facturas(app, facturas, lineas):
+    """Crea facturas de `lineas` productos distintos cada una. Retorna sus ids."""
+    with app.app_context():
+        productos = [Producto(f'Producto consultas {i}', 'Pruebas', 'consultas', 1.0 + i, 10_000)
+                     for i in range(lineas)]
+        clientes = [Cliente(f'Cliente consultas {i}', '0999999999', f'consultas{i}@ejemplo.com', 'Empresa')
+                    for i in range(3)]
+        db.session.add_all(productos + clientes)
+        db.session.commit()
+        items = [{'producto_id': p.id, 'cantidad': 2} for p in productos]
+        return [FacturaService.crear(clientes[i % len(clientes)].id, items).id for i in range(facturas)]
+
+
+def _respuesta(cliente_web, url):
+    def pedir():
+        respuesta = cliente_web.get(url)
+        assert respuesta.status_code == 200
+    return pedir
+
+
+def test_listado_de_facturas_no_crece_con_las_facturas(app, cliente_web, contar_sql):
+    _crear_facturas(app, facturas=3, lineas=2)
+    _respuesta(cliente_web, '/facturas/')()  # calentamiento (caché, plantillas)
+    pocas = contar_sql(_respuesta(cliente_web, '/facturas/'))
+    _crear_facturas(app, facturas=25, lineas=4)
+    muchas = contar_sql(_respuesta(cliente_web, '/facturas/'))
+    assert pocas == muchas == CONSULTAS_LISTADO
+
+
+def test_detalle_de_factura_no_crece_con_las_lineas(app, cliente_web, contar_sql):
+    (corta,) = _crear_facturas(app, facturas=1, lineas=2)
+    (larga,) = _crear_facturas(app, facturas=1, lineas=8)
+    _respuesta(cliente_web, f'/facturas/{corta}')()
+    pocas = contar_sql(_respuesta(cliente_web, f'/facturas/{corta}'))
+    muchas = contar_sql(_respuesta(cliente_web, f'/facturas/{larga}'))
+    assert pocas == muchas == CONSULTAS_DETALLE
+
+
+def test_reporte_de_facturas_no_crece_con_las_facturas(app, contar_sql, tmp_path):
+    def generar():
+        with app.app_context():
+            generar_reporte_facturas(destino=str(tmp_path / 'facturas.pdf'))
+
+    _crear_facturas(app, facturas=3, lineas=2)
+    pocas = contar_sql(generar)
+    _crear_facturas(app, facturas=30, lineas=3)
+    muchas = contar_sql(generar)
+    assert pocas == muchas == CONSULTAS_REPORTE
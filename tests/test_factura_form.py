@@ -0,0 +1,38 @@
+"""Validación de facturas recibidas por la API con datos mal formados."""
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from forms.factura_form import validar_factura_json
+from inventario.database import db
+from inventario.usuarios import Usuario
+
+
+@pytest.mark.parametrize('items', [5, 'abc', {'producto_id': 1, 'cantidad': 1}])
+def test_items_que_no_son_lista(items):
+    errores, datos = validar_factura_json({'cliente_id': 1, 'items': items})
+    assert 'items debe ser una lista.' in errores
+    assert 'items' not in datos
+
+
+def test_items_que_no_son_objetos():
+    errores, datos = validar_factura_json(
+        {'cliente_id': 1, 'items': [5, 'x', [1, 2], {'producto_id': 3, 'cantidad': 2}]})
+    assert errores == ['Ítem inválido: 5.', "Ítem inválido: 'x'.", 'Ítem inválido: [1, 2].']
+    assert datos['items'] == [{'producto_id': 3, 'cantidad': 2}]
+
+
+def test_lote_con_items_invalidos_responde_error_por_factura(app):
+    with app.app_context():
+        if not Usuario.query.filter_by(email='api@ejemplo.com').first():
+            db.session.add(Usuario('API', 'api@ejemplo.com',
+                                   generate_password_hash('clave', method='pbkdf2:sha256:1000')))
+            db.session.commit()
+    cliente = app.test_client()
+    assert cliente.post('/login', data={'email': 'api@ejemplo.com', 'password': 'clave'}).status_code == 302
+
+    respuesta = cliente.post('/api/v1/facturas/lote', json={'facturas': [{'cliente_id': 1, 'items': 5}]})
+    assert respuesta.status_code == 422
+    cuerpo = respuesta.get_json()
+    assert cuerpo['rechazadas'] == 1
+    assert 'items debe ser una lista.' in cuerpo['resultados'][0]['error']
@@ -0,0 +1,36 @@
+"""Ingesta: un trabajador nuevo registra las facturas que quedaron en la cola antes de reiniciar."""
+
+import time
+
+from inventario.clientes import Cliente
+from inventario.database import db
+from inventario.productos import Producto
+from services.ingesta_service import ColaFacturas, IngestaService, TrabajadorIngesta
+
+ESPERA_MAXIMA = 10
+
+
+def test_un_trabajador_nuevo_procesa_la_cola_pendiente(app):
+    with app.app_context():
+        producto = Producto('Producto encolado', 'Pruebas', 'ingesta', 3.0, 10)
+        cliente = Cliente('Cliente encolado', '0966666666', 'encolado@ejemplo.com', 'Particular')
+        db.session.add_all([producto, cliente])
+        db.session.commit()
+        producto_id, cliente_id = producto.id, cliente.id
+
+    # Encolada por un proceso anterior que se detuvo sin procesarla (nadie avisa)
+    pendiente_id = ColaFacturas(app.config['INGESTA_RUTA']).encolar(
+        cliente_id, [{'producto_id': producto_id, 'cantidad': 2}])
+
+    trabajador = TrabajadorIngesta(app, ColaFacturas(app.config['INGESTA_RUTA']), intervalo=0.1)
+    trabajador.iniciar()
+
+    limite = time.monotonic() + ESPERA_MAXIMA
+    with app.app_context():
+        while IngestaService.cola().obtener(pendiente_id)['estado'] == 'pendiente':
+            assert time.monotonic() < limite, 'el trabajador no procesó la cola'
+            time.sleep(0.05)
+        pendiente = IngestaService.cola().obtener(pendiente_id)
+        assert pendiente['estado'] == 'procesada', pendiente['error']
+        assert pendiente['factura_id'] is not None
+        assert db.session.get(Producto, producto_id).stock == 8
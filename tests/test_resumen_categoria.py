@@ -0,0 +1,39 @@
+"""Diferencias por categoría y versiones: la fila se crea o se suma con una sola sentencia."""
+
+from inventario.database import db
+from models.resumen import ResumenCategoria
+from services.resumen_service import aplicar_deltas
+from services.version_service import VersionService, incrementar
+
+
+def _fila(categoria):
+    fila = db.session.get(ResumenCategoria, categoria)
+    return None if fila is None else (fila.productos, fila.unidades, round(fila.valor, 2))
+
+
+def test_aplicar_deltas_crea_suma_y_elimina_la_categoria(app):
+    with app.app_context():
+        conexion = db.session.connection()
+        aplicar_deltas(conexion, {'Deltas': [2, 10, 25.0]})
+        assert _fila('Deltas') == (2, 10, 25.0)
+
+        aplicar_deltas(conexion, {'Deltas': [1, 5, 12.5]})
+        assert _fila('Deltas') == (3, 15, 37.5)
+
+        aplicar_deltas(conexion, {'Deltas': [-3, -15, -37.5]})
+        assert _fila('Deltas') is None
+
+        # La categoría vuelve a aparecer después de eliminada
+        aplicar_deltas(conexion, {'Deltas': [1, 4, 8.0]})
+        assert _fila('Deltas') == (1, 4, 8.0)
+        db.session.rollback()
+
+
+def test_incrementar_crea_y_suma_la_version(app):
+    with app.app_context():
+        conexion = db.session.connection()
+        assert VersionService.obtener('pruebas') == {'pruebas': 0}
+        incrementar(conexion, 'pruebas')
+        incrementar(conexion, 'pruebas', 'pruebas')
+        assert VersionService.obtener('pruebas') == {'pruebas': 2}
+        db.session.rollback()
@@ -0,0 +1,48 @@
+"""Feed de cambios: un hueco reciente en la secuencia detiene el cursor hasta que se llena o vence."""
+
+from datetime import datetime, timedelta
+
+from inventario.database import db
+from inventario.productos import Producto
+from models.cambio import CambioProducto
+from services.sincronizacion_service import SincronizacionService
+
+
+def test_el_cursor_no_salta_un_hueco_reciente(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SINCRONIZACION_ESPERA', 60)
+    with app.app_context():
+        producto = Producto('Producto feed', 'Pruebas', 'feed', 1.0, 3)
+        db.session.add(producto)
+        db.session.commit()
+        desde = SincronizacionService.secuencia_actual()
+        ahora = datetime.utcnow()
+        # desde + 1 es una transacción que todavía no confirma
+        db.session.add(CambioProducto(secuencia=desde + 2, producto_id=producto.id, fecha=ahora))
+        db.session.commit()
+
+        feed = SincronizacionService.cambios_desde(desde)
+        assert feed['cambios'] == [] and feed['cursor'] == desde and not feed['mas']
+
+        # Al confirmar, el hueco se llena y el cursor avanza sobre ambos cambios
+        db.session.add(CambioProducto(secuencia=desde + 1, producto_id=producto.id, fecha=ahora))
+        db.session.commit()
+        feed = SincronizacionService.cambios_desde(desde)
+        assert [c['id'] for c in feed['cambios']] == [producto.id]
+        assert feed['cursor'] == desde + 2
+
+
+def test_un_hueco_vencido_se_salta(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SINCRONIZACION_ESPERA', 60)
+    with app.app_context():
+        producto = Producto('Producto revertido', 'Pruebas', 'feed', 1.0, 3)
+        db.session.add(producto)
+        db.session.commit()
+        desde = SincronizacionService.secuencia_actual()
+        # desde + 1 pertenecía a una transacción revertida hace más de la espera
+        db.session.add(CambioProducto(secuencia=desde + 2, producto_id=producto.id,
+                                      fecha=datetime.utcnow() - timedelta(seconds=120)))
+        db.session.commit()
+
+        feed = SincronizacionService.cambios_desde(desde)
+        assert [c['id'] for c in feed['cambios']] == [producto.id]
+        assert feed['cursor'] == desde + 2
@@ -0,0 +1,75 @@
+"""Versiones de datos: se incrementan al confirmar, fuera de la transacción que escribe."""
+
+from sqlalchemy import select
+
+from conexion.migraciones import ENTIDADES_004
+from inventario.clientes import Cliente
+from inventario.database import contar_consultas, db
+from inventario.productos import Producto
+from models.version import VersionDatos
+from services.factura_service import FacturaService
+from services.version_service import VersionService
+
+
+def _versiones_confirmadas():
+    """Versiones leídas por otra conexión (solo ve lo confirmado)."""
+    with db.engine.connect() as conexion:
+        return dict(conexion.execute(select(VersionDatos.entidad, VersionDatos.version)).all())
+
+
+def test_las_filas_de_version_vienen_sembradas(app):
+    with app.app_context():
+        assert set(ENTIDADES_004) <= set(_versiones_confirmadas())
+
+
+def test_la_version_sube_al_confirmar_y_no_dentro_de_la_transaccion(app):
+    with app.app_context():
+        antes = _versiones_confirmadas()
+        db.session.add(Producto('Producto versionado', 'Pruebas', 'versión', 1.0, 5))
+        with contar_consultas() as consultas:
+            db.session.flush()
+        # La transacción abierta no tomó la fila de versión
+        assert not any('version_datos' in s for s in consultas['sentencias'])
+        db.session.commit()
+        assert _versiones_confirmadas()['productos'] == antes['productos'] + 1
+
+
+def test_una_transaccion_deshecha_no_sube_la_version(app):
+    with app.app_context():
+        antes = _versiones_confirmadas()
+        db.session.add(Cliente('Cliente deshecho', '0988888888', 'deshecho@ejemplo.com', 'Particular'))
+        db.session.flush()
+        db.session.rollback()
+        assert _versiones_confirmadas() == antes
+
+
+def test_una_factura_sube_productos_y_facturas(app):
+    with app.app_context():
+        producto = Producto('Producto facturado', 'Pruebas', 'versión', 2.0, 5)
+        cliente = Cliente('Cliente versionado', '0977777777', 'versionado@ejemplo.com', 'Particular')
+        db.session.add_all([producto, cliente])
+        db.session.commit()
+        antes = VersionService.obtener('productos', 'facturas')
+
+        FacturaService.crear(cliente.id, [{'producto_id': producto.id, 'cantidad': 1}])
+        assert VersionService.obtener('productos', 'facturas') == {
+            'productos': antes['productos'] + 1, 'facturas': antes['facturas'] + 1}
+
+
+def test_un_savepoint_no_sube_la_version_antes_del_commit(app):
+    with app.app_context():
+        antes = _versiones_confirmadas()
+        with db.session.begin_nested():
+            db.session.add(Cliente('Cliente en savepoint', '0955555555', 'savepoint@ejemplo.com', 'Particular'))
+        assert _versiones_confirmadas() == antes
+        try:
+            with db.session.begin_nested():
+                db.session.add(Producto('Producto deshecho', 'Pruebas', 'savepoint', 1.0, 1))
+                db.session.flush()
+                raise ValueError
+        except ValueError:
+            pass
+        db.session.commit()
+        despues = _versiones_confirmadas()
+        # El savepoint deshecho no descarta lo anotado por el primero
+        assert despues['clientes'] == antes['clientes'] + 1